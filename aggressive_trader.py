@@ -11,6 +11,9 @@ from datetime import datetime
 import logging
 import os
 
+from candle_resampler import ResampledCandleFeed
+from order_book_store import estimate_market_fill
+
 class AggressiveTrader:
     def __init__(self):
         """初始化激进版交易系统"""
@@ -32,6 +35,8 @@ class AggressiveTrader:
         })
         
         self.symbol = 'BTC/USDT:USDT'
+        # 只拉取1分钟K线，本地合成5m/15m并原地更新未收盘K线
+        self.candles = ResampledCandleFeed(self.exchange, self.symbol, {'15m': 100, '5m': 100, '1m': 30})
         self.contract_multiplier = 0.01
         
         # 🎯 激进参数配置
@@ -132,11 +137,9 @@ class AggressiveTrader:
         """分析市场"""
         try:
             # 获取多种时间框架数据
-            ohlcv_15m = self.exchange.fetch_ohlcv(self.symbol, '15m', limit=100)
-            ohlcv_5m = self.exchange.fetch_ohlcv(self.symbol, '5m', limit=100)
-            
-            closes_15m = np.array([c[4] for c in ohlcv_15m])
-            closes_5m = np.array([c[4] for c in ohlcv_5m])
+            candles = self.candles.refresh_all()
+            closes_15m = candles['15m'].closes
+            closes_5m = candles['5m'].closes
             
             current_price = closes_15m[-1]
             
@@ -365,18 +368,23 @@ class AggressiveTrader:
                        min(contracts, self.params['max_position_size']))
         contracts = round(contracts * 100) / 100
         
+        # 按盘口深度估算市价单成交均价，止盈止损以此为基准
+        side = 'buy' if signal['direction'] == 'LONG' else 'sell'
+        entry_price, slippage_pct = estimate_market_fill(self.exchange, self.symbol, side, contracts, current_price)
+        
         # 计算止盈止损
         if signal['direction'] == 'LONG':
-            stop_loss_price = current_price * (1 - stop_loss_pct / 100)
-            take_profit_price = current_price * (1 + take_profit_pct / 100)
+            stop_loss_price = entry_price * (1 - stop_loss_pct / 100)
+            take_profit_price = entry_price * (1 + take_profit_pct / 100)
         else:
-            stop_loss_price = current_price * (1 + stop_loss_pct / 100)
-            take_profit_price = current_price * (1 - take_profit_pct / 100)
+            stop_loss_price = entry_price * (1 + stop_loss_pct / 100)
+            take_profit_price = entry_price * (1 - take_profit_pct / 100)
         
         trade_params = {
             'contracts': contracts,
             'leverage': leverage,
-            'entry_price': current_price,
+            'entry_price': entry_price,
+            'expected_slippage_pct': slippage_pct,
             'stop_loss_price': stop_loss_price,
             'take_profit_price': take_profit_price,
             'stop_loss_pct': stop_loss_pct,
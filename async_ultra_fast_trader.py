@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+超快交易系统 (异步版) - K线、持仓、行情并发获取
+每轮耗时约等于最慢的一次请求，而不是所有请求之和
+
+异步客户端直连交易所，不经过数据中心。数据中心在线时 (create_exchange 返回 HubExchange)
+数据已经在本机推送，不再另外并发请求交易所，直接运行同步版的主循环读取推送数据。
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+import ccxt.async_support as ccxt_async
+
+from market_data_hub import HubExchange, okx_config
+from markets_cache import load_markets_cached
+from ultra_fast_trader import UltraFastTrader
+
+
+class AsyncUltraFastTrader(UltraFastTrader):
+    """复用 UltraFastTrader 的分析与信号逻辑，只替换数据获取部分"""
+
+    def __init__(self):
+        super().__init__()
+        self.use_hub = isinstance(self.exchange, HubExchange)
+        if self.use_hub:
+            print('📡 数据中心在线: 读取推送数据，不另外并发请求交易所')
+            return
+        self.async_exchange = ccxt_async.okx(okx_config(self.config))
+        load_markets_cached(self.async_exchange)
+        print('⚡ 异步模式: K线/成交/持仓/行情并发获取')
+
+    async def tick(self):
+        """执行一轮检查: 三个请求同时发出，K线到达后立即开始分析"""
+        candles_task = asyncio.create_task(self.candles.refresh_all_async(self.async_exchange))
+        positions_task = asyncio.create_task(self.async_exchange.fetch_positions([self.symbol]))
+        ticker_task = asyncio.create_task(self.async_exchange.fetch_ticker(self.symbol))
+        trades_task = asyncio.create_task(self.trade_bars.poll_async(self.async_exchange))
+        tasks = (candles_task, positions_task, ticker_task, trades_task)
+
+        try:
+            candles = await candles_task
+            await trades_task
+
+            # 行情已返回则用最新成交价，否则不等待，直接用K线收盘价
+            last_price = None
+            if ticker_task.done() and not ticker_task.exception():
+                last_price = ticker_task.result().get('last')
+
+            analysis = self.analyze_candles(candles, last_price)
+            if analysis:
+                self.print_analysis(analysis)
+
+                # 检查持仓
+                positions = await positions_task
+                self.report_positions_and_signal(analysis, positions)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run_async(self):
+        """运行异步主循环"""
+        print('\n🚀 启动超快交易系统 (异步)...')
+        print('='*50)
+        print('⚡ 10秒频率，并发获取数据')
+        print('='*50)
+
+        iteration = 0
+        try:
+            while self.state['running']:
+                try:
+                    iteration += 1
+                    start_time = time.time()
+
+                    print(f'\n⚡ 第{iteration}次检查 ({datetime.now().strftime("%H:%M:%S.%f")[:-3]})')
+                    print('-'*30)
+
+                    await self.tick()
+
+                    # 计算执行时间
+                    execution_time = time.time() - start_time
+                    sleep_time = max(0.1, self.params['check_interval'] - execution_time)
+
+                    print(f'⏱️  执行时间: {execution_time:.2f}秒')
+                    print(f'💤 下次检查: {sleep_time:.1f}秒后')
+
+                    await asyncio.sleep(sleep_time)
+
+                except Exception as e:
+                    self.logger.error(f"主循环错误: {e}")
+                    await asyncio.sleep(self.params['check_interval'])
+        finally:
+            await self.async_exchange.close()
+
+        print('\n✅ 超快交易系统已停止')
+
+    def run(self):
+        if self.use_hub:
+            return super().run()
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            print('\n🛑 用户中断，停止系统')
+            self.state['running'] = False
+
+
+if __name__ == '__main__':
+    trader = AsyncUltraFastTrader()
+    trader.run()
@@ -12,6 +12,8 @@ import logging
 import os
 import requests
 
+from order_book_store import estimate_market_fill
+
 class AutonomousTraderWithNotify:
     def __init__(self):
         """初始化交易系统"""
@@ -255,18 +257,23 @@ class AutonomousTraderWithNotify:
                        min(contracts, self.params['max_position_size']))
         contracts = round(contracts * 100) / 100
         
+        # 按盘口深度估算市价单成交均价，止盈止损以此为基准
+        side = 'buy' if signal['direction'] == 'LONG' else 'sell'
+        entry_price, slippage_pct = estimate_market_fill(self.exchange, self.symbol, side, contracts, current_price)
+        
         # 计算止盈止损价格
         if signal['direction'] == 'LONG':
-            stop_loss_price = current_price * (1 - stop_loss_pct / 100)
-            take_profit_price = current_price * (1 + take_profit_pct / 100)
+            stop_loss_price = entry_price * (1 - stop_loss_pct / 100)
+            take_profit_price = entry_price * (1 + take_profit_pct / 100)
         else:
-            stop_loss_price = current_price * (1 + stop_loss_pct / 100)
-            take_profit_price = current_price * (1 - take_profit_pct / 100)
+            stop_loss_price = entry_price * (1 + stop_loss_pct / 100)
+            take_profit_price = entry_price * (1 - take_profit_pct / 100)
         
         trade_params = {
             'contracts': contracts,
             'leverage': leverage,
-            'entry_price': current_price,
+            'entry_price': entry_price,
+            'expected_slippage_pct': slippage_pct,
             'stop_loss_price': stop_loss_price,
             'take_profit_price': take_profit_price,
             'stop_loss_pct': stop_loss_pct,
@@ -12,6 +12,10 @@ import numpy as np
 from typing import Dict, List, Optional, Tuple
 import threading
 
+from cached_exchange import CachedExchange
+from indicator_memo import default_memo
+from streaming_indicators import PriceStructureIndicators
+
 class AutonomousTradingSystem:
     def __init__(self):
         """初始化自主交易系统"""
@@ -21,15 +25,15 @@ class AutonomousTradingSystem:
         with open('config/final_config.json', 'r') as f:
             self.config = json.load(f)
         
-        # 初始化交易所
-        self.exchange = ccxt.okx({
+        # 初始化交易所 (短时间内重复的行情/持仓/余额查询走缓存)
+        self.exchange = CachedExchange(ccxt.okx({
             'apiKey': self.config['exchange']['api_key'],
             'secret': self.config['exchange']['secret'],
             'password': self.config['exchange']['passphrase'],
             'enableRateLimit': True,
             'proxies': self.config['exchange']['proxies'],
             'options': {'defaultType': 'swap'}
-        })
+        }))
         
         self.symbol = 'BTC/USDT:USDT'
         self.contract_multiplier = 0.01  # 1张合约 = 0.01 BTC
@@ -89,16 +93,14 @@ class AutonomousTradingSystem:
         try:
             # 获取K线数据
             ohlcv = self.exchange.fetch_ohlcv(self.symbol, '15m', limit=100)
-            closes = np.array([c[4] for c in ohlcv])
-            
-            # 计算技术指标
-            sma_20 = np.mean(closes[-20:])
-            sma_50 = np.mean(closes[-50:])
-            current_price = closes[-1]
+            current_price = ohlcv[-1][4]
             
-            # 计算波动率
-            returns = np.diff(closes) / closes[:-1]
-            volatility = np.std(returns) * np.sqrt(365 * 24 * 4)  # 年化波动率
+            # 均线、20根支撑阻力、年化波动率: 已收盘部分增量维护 (单调队列求极值)，只重算未收盘K线
+            _, structure = default_memo.get(self.symbol, '15m', ohlcv, PriceStructureIndicators,
+                                            sr_window=20, vol_window=len(ohlcv))
+            sma_20 = structure['sma_20']
+            sma_50 = structure['sma_50']
+            volatility = structure['volatility']
             
             # 判断趋势
             if current_price > sma_20 > sma_50:
@@ -116,9 +118,9 @@ class AutonomousTradingSystem:
             else:
                 vol_level = 'high'
             
-            # 计算支撑阻力
-            support = np.min(closes[-20:])
-            resistance = np.max(closes[-20:])
+            # 支撑阻力
+            support = structure['support']
+            resistance = structure['resistance']
             
             analysis = {
                 'timestamp': datetime.now().isoformat(),
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+向量化回测核心
+各回测脚本原先逐根K线用 df.iloc[i] / df['col'].iloc[i] 取值再走一遍持仓状态机，一年5分钟K线要跑几分钟。
+这里把入场/离场规则先算成整列的信号数组，再对纯 NumPy 数组做一次状态机推进:
+    - 空仓时用入场信号的位置表 searchsorted 直接跳到下一次入场
+    - 持仓时按块向量化查找第一根触发 强平 / 止损 / 止盈 / 离场信号 的K线 (同一根K线内按此优先级)
+    - 开仓数量、杠杆、止损止盈价和平仓结算由 PositionModel 决定，每笔交易只调用一次
+    - 传入对齐好的 PerpBars 时按标记价格计算资金费用、强平 (亏掉全部保证金) 和浮动盈亏
+按K线收盘价成交: 第 i 根K线开仓后从第 i+1 根开始检查离场；reenter_same_bar 决定平仓的那根K线能否再开仓。
+
+用法:
+    from backtest_core import run_backtest, PositionModel, SpotModel
+
+    side = np.where(rsi < 30, 1, np.where(rsi > 70, -1, 0))
+    result = run_backtest(close, side, model=PositionModel(fraction=0.1, leverage=10,
+                                                           stop_loss=0.03, take_profit=0.06))
+    for t in range(len(result)):
+        print(result.entry_index[t], result.exit_index[t], result.pnl[t], EXIT_REASONS[result.exit_reason[t]])
+"""
+
+import logging
+import numpy as np
+from typing import Optional, Tuple
+
+from perp_history import PerpBars, funding_payments, liquidation_prices
+
+logger = logging.getLogger(__name__)
+
+EXIT_OPEN = 0           # 回测结束时仍持仓
+EXIT_SIGNAL = 1
+EXIT_STOP = 2
+EXIT_TAKE = 3
+EXIT_LIQUIDATION = 4
+EXIT_REASONS = ('持仓中', '离场信号', '止损', '止盈', '强平')
+
+FIRST_BLOCK = 32        # 离场查找的首块长度，之后逐块翻倍
+MAX_BLOCK = 8192
+
+
+class PositionModel:
+    """保证金式仓位模型: 数量 = 资金 × fraction × leverage / 价格，平仓盈亏计入资金
+
+    stop_loss / take_profit 为相对开仓价的比例 (None 为不设)。
+    子类可以重写 open/settle 实现动态杠杆、ATR 止损等规则。
+    """
+
+    def __init__(self, fraction: float = 1.0, leverage: float = 1.0,
+                 stop_loss: Optional[float] = None, take_profit: Optional[float] = None):
+        self.fraction = fraction
+        self.leverage = leverage
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+
+    def open(self, i: int, side: int, price: float, capital: float) -> Tuple[float, float, float, float]:
+        """第 i 根K线以 price 开仓，返回 (数量, 杠杆, 止损价, 止盈价)，不设止损止盈时为 NaN"""
+        size = capital * self.fraction * self.leverage / price
+        stop = price * (1 - side * self.stop_loss) if self.stop_loss is not None else np.nan
+        take = price * (1 + side * self.take_profit) if self.take_profit is not None else np.nan
+        return size, self.leverage, stop, take
+
+    def settle(self, side: int, entry_price: float, exit_price: float, size: float,
+               capital: float) -> Tuple[float, float]:
+        """平仓结算，返回 (盈亏, 平仓后资金)"""
+        pnl = side * (exit_price - entry_price) * size
+        return pnl, capital + pnl
+
+
+class SpotModel(PositionModel):
+    """现货式全仓买卖: 数量 = 资金 / 价格 × fraction，平仓后资金 = 数量 × 价格 × (1 - fee_rate)"""
+
+    def __init__(self, fraction: float = 1.0, fee_rate: float = 0.0,
+                 stop_loss: Optional[float] = None, take_profit: Optional[float] = None):
+        super().__init__(fraction, 1.0, stop_loss, take_profit)
+        self.fee_rate = fee_rate
+
+    def open(self, i: int, side: int, price: float, capital: float) -> Tuple[float, float, float, float]:
+        _, leverage, stop, take = super().open(i, side, price, capital)
+        return capital / price * self.fraction, leverage, stop, take
+
+    def settle(self, side: int, entry_price: float, exit_price: float, size: float,
+               capital: float) -> Tuple[float, float]:
+        balance = size * exit_price * (1 - self.fee_rate)
+        return balance - capital, balance
+
+
+class BacktestResult:
+    """逐笔交易 (按开仓顺序) 与逐K线资金，K线下标均为原数组中的位置
+
+    exit_index 为 -1、exit_reason 为 EXIT_OPEN 的最后一笔是回测结束时仍未平仓的持仓；
+    capital / equity 覆盖 [start, end)，为每根K线处理完后的已实现资金 和 资金 + 浮动盈亏 (按标记价格)；
+    final_capital 为逐笔累加的最终已实现资金。
+    """
+
+    def __init__(self, trades: dict, capital: np.ndarray, equity: np.ndarray, start: int,
+                 final_capital: float):
+        self.entry_index = trades['entry_index']
+        self.exit_index = trades['exit_index']
+        self.side = trades['side']
+        self.entry_price = trades['entry_price']
+        self.exit_price = trades['exit_price']
+        self.size = trades['size']
+        self.leverage = trades['leverage']
+        self.pnl = trades['pnl']
+        self.funding = trades['funding']
+        self.exit_reason = trades['exit_reason']
+        self.capital_after = trades['capital_after']
+        self.capital = capital
+        self.equity = equity
+        self.start = start
+        self.final_capital = final_capital
+
+    def __len__(self) -> int:
+        return len(self.entry_index)
+
+    @property
+    def open_trade(self) -> Optional[int]:
+        """未平仓那笔交易的序号，没有时为 None"""
+        if len(self) and self.exit_reason[-1] == EXIT_OPEN:
+            return len(self) - 1
+        return None
+
+
+def _first_exit(close: np.ndarray, exits: Optional[np.ndarray], low: Optional[np.ndarray],
+                high: Optional[np.ndarray], begin: int, end: int, side: int,
+                stop: float, take: float, liq: float) -> Tuple[int, int]:
+    """[begin, end) 内第一根触发离场的K线及原因，没有时为 (-1, EXIT_OPEN)"""
+    has_stop, has_take, has_liq = stop == stop, take == take, liq == liq
+    block = FIRST_BLOCK
+    i = begin
+    while i < end:
+        j = min(end, i + block)
+        c = close[i:j]
+        hit = exits[i:j].copy() if exits is not None else np.zeros(j - i, dtype=bool)
+        if side > 0:
+            if has_stop:
+                hit |= c <= stop
+            if has_take:
+                hit |= c >= take
+            if has_liq:
+                hit |= low[i:j] <= liq
+        else:
+            if has_stop:
+                hit |= c >= stop
+            if has_take:
+                hit |= c <= take
+            if has_liq:
+                hit |= high[i:j] >= liq
+        k = int(hit.argmax())
+        if hit[k]:
+            k += i
+            price = close[k]
+            if has_liq and (low[k] <= liq if side > 0 else high[k] >= liq):
+                return k, EXIT_LIQUIDATION
+            if has_stop and (price <= stop if side > 0 else price >= stop):
+                return k, EXIT_STOP
+            if has_take and (price >= take if side > 0 else price <= take):
+                return k, EXIT_TAKE
+            return k, EXIT_SIGNAL
+        i = j
+        block = min(block * 2, MAX_BLOCK)
+    return -1, EXIT_OPEN
+
+
+def run_backtest(close, entries, exits=None, model: Optional[PositionModel] = None,
+                 initial_capital: float = 10000.0, start: int = 0, end: Optional[int] = None,
+                 reenter_same_bar: bool = True, perp: Optional[PerpBars] = None) -> BacktestResult:
+    """按信号数组回测单一持仓
+
+    entries: 每根K线的入场方向 (1 做多 / -1 做空 / 0 无)，布尔数组视为只做多
+    exits:   布尔数组，为 True 时平掉任意方向的持仓 (None 为只靠止损止盈离场)
+    perp:    PerpBars，给出时持仓期间按标记价格结算资金费用并检查逐仓强平
+
+    强平时 exit_price 记为强平价，但按破产价 entry·(1 - side/杠杆) 结算: 逐仓强平后剩余的维持保证金
+    归交易所 (强平费/风险准备金)，该笔亏损恰好是全部保证金 数量 × 开仓价 / 杠杆，而不是只亏到强平价。
+    """
+    close = np.asarray(getattr(close, 'values', close), dtype=np.float64)
+    n = len(close)
+    end = n if end is None else min(end, n)
+    model = model or PositionModel()
+    sides = np.asarray(getattr(entries, 'values', entries))
+    sides = sides.astype(np.int8) if sides.dtype == bool else np.sign(np.nan_to_num(sides)).astype(np.int8)
+    if exits is not None:
+        exits = np.asarray(getattr(exits, 'values', exits), dtype=bool)
+
+    mark = close
+    low = high = funding_rate = None
+    if perp is not None:
+        mark, low, high = perp.mark_close, perp.mark_low, perp.mark_high
+        funding_rate = perp.funding_rate
+
+    entry_positions = np.flatnonzero(sides[start:end]) + start
+    trades = {name: [] for name in ('entry_index', 'exit_index', 'side', 'entry_price', 'exit_price', 'size',
+                                    'leverage', 'pnl', 'funding', 'exit_reason', 'capital_after')}
+    flows = np.zeros(max(end - start, 0))
+    unrealized = np.zeros(max(end - start, 0))
+    capital = float(initial_capital)
+    i = start
+
+    while True:
+        p = int(np.searchsorted(entry_positions, i))
+        if p >= len(entry_positions):
+            break
+        e = int(entry_positions[p])
+        side = int(sides[e])
+        entry_price = float(close[e])
+        size, leverage, stop, take = model.open(e, side, entry_price, capital)
+        liq = float(liquidation_prices(side, entry_price, leverage)) if perp is not None else np.nan
+
+        k, reason = _first_exit(close, exits, low, high, e + 1, end, side, stop, take, liq)
+        held_end = end if k < 0 else k
+        unrealized[e - start:held_end - start] = side * (mark[e:held_end] - entry_price) * size
+
+        # 资金费用: 开仓之后到平仓那根K线 (含) 内的每次结算
+        funding = 0.0
+        if funding_rate is not None:
+            last = end if k < 0 else k + 1
+            settled = np.flatnonzero(funding_rate[e + 1:last]) + e + 1
+            if len(settled):
+                payments = funding_payments(side * size * mark[settled], funding_rate[settled])
+                np.add.at(flows, settled - start, payments)
+                funding = float(payments.sum())
+                capital += funding
+
+        if k < 0:
+            exit_price, pnl = np.nan, 0.0
+        else:
+            exit_price = float(close[k])
+            settle_price = exit_price
+            if reason == EXIT_LIQUIDATION:
+                exit_price, settle_price = liq, entry_price * (1 - side / leverage)
+            before = capital
+            pnl, capital = model.settle(side, entry_price, settle_price, size, capital)
+            flows[k - start] += capital - before
+
+        for name, value in (('entry_index', e), ('exit_index', k), ('side', side), ('entry_price', entry_price),
+                            ('exit_price', exit_price), ('size', size), ('leverage', leverage), ('pnl', pnl),
+                            ('funding', funding), ('exit_reason', reason), ('capital_after', capital)):
+            trades[name].append(value)
+        if k < 0:
+            break
+        i = k if reenter_same_bar else k + 1
+
+    dtypes = {'entry_index': np.int64, 'exit_index': np.int64, 'side': np.int8, 'exit_reason': np.int8}
+    trades = {name: np.asarray(values, dtype=dtypes.get(name, np.float64)) for name, values in trades.items()}
+    realized = initial_capital + np.cumsum(flows)
+    return BacktestResult(trades, realized, realized + unrealized, start, capital)
@@ -14,14 +14,38 @@ import sys
 # 添加项目路径
 sys.path.append('/Users/anth6iu/freqtrade-trading')
 
+from candle_store import CandleStore
+from csv_binary import load_csv_cached
+from indicator_cache import cached_indicators
+from backtest_core import run_backtest, SpotModel, EXIT_OPEN
+
 def load_historical_data():
     """加载历史数据"""
+    # 优先使用本地K线仓库 (python candle_store.py sync --timeframe 5m --days 365)
+    df = CandleStore().load_dataframe('BTC/USDT:USDT', '5m')
+    if not df.empty:
+        df = df.reset_index()
+        df['date'] = df['timestamp']
+        print(f"从K线仓库加载数据: {len(df)} 行")
+        print(f"时间范围: {df['timestamp'].min()} 到 {df['timestamp'].max()}")
+        return df
+    
     data_file = '/Users/anth6iu/freqtrade-trading/okx_btc_perpetual_5m.csv'
     
     if not os.path.exists(data_file):
         print(f"数据文件不存在: {data_file}")
         return None
-    
+
+    # 二进制缓存: 首次 (或CSV变化后) 转换一次，之后内存映射读取不再解析CSV
+    try:
+        df = load_csv_cached(data_file)
+        df['date'] = df['timestamp']
+        print(f"从二进制缓存加载数据: {len(df)} 行")
+        print(f"时间范围: {df['timestamp'].min()} 到 {df['timestamp'].max()}")
+        return df
+    except Exception as e:
+        print(f"二进制缓存不可用，改为解析CSV: {e}")
+
     try:
         # 直接使用date列作为时间戳，忽略timestamp列
         df = pd.read_csv(data_file, parse_dates=['date'])
@@ -91,82 +115,66 @@ def simulate_trades_with_strategy(df, strategy_type='optimized'):
     balance = 10000  # 初始资金
     trade_history = []
     
-    # 技术指标计算
-    df['rsi'] = calculate_rsi(df['close'])
-    df['sma20'] = df['close'].rolling(window=20).mean()
-    df['sma50'] = df['close'].rolling(window=50).mean()
+    # 技术指标计算 (磁盘缓存，数据和参数不变时不再重算；MACD 沿用 adjust=False)
+    values = cached_indicators(df, ema_periods=(), sma_periods=(20, 50), macd_adjust=False)
+    df['rsi'] = np.array(values['rsi'])
+    df['sma20'] = np.array(values['sma_20'])
+    df['sma50'] = np.array(values['sma_50'])
     
     if strategy_type == 'optimized':
         # 优化策略的额外指标
-        df['macd'], df['macd_signal'] = calculate_macd(df['close'])
-        df['bb_upper'], df['bb_middle'], df['bb_lower'] = calculate_bollinger_bands(df['close'])
-        df['volume_sma'] = df['volume'].rolling(window=20).mean()
-        df['volume_ratio'] = df['volume'] / df['volume_sma']
-    
-    for i in range(50, len(df) - 1):  # 跳过前50个数据点用于指标计算
-        current_price = df['close'].iloc[i]
-        current_time = df['timestamp'].iloc[i]
-        
-        # 买入信号
-        buy_signal = False
-        if strategy_type == 'simple':
-            # 简单RSI策略
-            if df['rsi'].iloc[i] < 30 and position == 0:
-                buy_signal = True
-        else:
-            # 优化策略
-            if (df['rsi'].iloc[i] < 30 and 
-                position == 0 and
-                df['volume_ratio'].iloc[i] > 1.2 and
-                df['close'].iloc[i] < df['bb_lower'].iloc[i] * 1.02):  # 价格接近布林带下轨
-                buy_signal = True
-        
-        # 卖出信号
-        sell_signal = False
-        if position > 0:
-            if strategy_type == 'simple':
-                if df['rsi'].iloc[i] > 70:
-                    sell_signal = True
-            else:
-                if (df['rsi'].iloc[i] > 70 or
-                    df['close'].iloc[i] > df['bb_upper'].iloc[i] * 0.98):  # 价格接近布林带上轨
-                    sell_signal = True
-        
-        # 执行买入
-        if buy_signal and balance > 0:
-            position = balance / current_price  # 全仓买入
+        for col in ('macd', 'macd_signal', 'bb_upper', 'bb_middle', 'bb_lower', 'volume_sma', 'volume_ratio'):
+            df[col] = np.array(values[col])
+    
+    # 买卖信号整列计算
+    rsi = df['rsi'].to_numpy()
+    close = df['close'].to_numpy()
+    if strategy_type == 'simple':
+        # 简单RSI策略
+        buy_signal = rsi < 30
+        sell_signal = rsi > 70
+    else:
+        # 优化策略: 价格接近布林带下轨买入，接近上轨卖出
+        buy_signal = (rsi < 30) & (df['volume_ratio'].to_numpy() > 1.2) & (close < df['bb_lower'].to_numpy() * 1.02)
+        sell_signal = (rsi > 70) | (close > df['bb_upper'].to_numpy() * 0.98)
+    
+    # 全仓买入、全部卖出，跳过前50个数据点用于指标计算
+    result = run_backtest(close, buy_signal, sell_signal, model=SpotModel(), initial_capital=balance,
+                          start=50, end=len(df) - 1, reenter_same_bar=False)
+    balance = result.final_capital
+    
+    timestamps = df['timestamp']
+    for t in range(len(result)):
+        entry_time = timestamps.iloc[result.entry_index[t]]
+        trades.append({
+            'type': 'buy',
+            'timestamp': entry_time,
+            'price': result.entry_price[t],
+            'position': result.size[t],
+            'balance': 0
+        })
+        if result.exit_reason[t] == EXIT_OPEN:
+            position = result.size[t]
             balance = 0
-            trades.append({
-                'type': 'buy',
-                'timestamp': current_time,
-                'price': current_price,
-                'position': position,
-                'balance': balance
-            })
+            break
         
-        # 执行卖出
-        elif sell_signal and position > 0:
-            balance = position * current_price
-            trade_pnl = (current_price - trades[-1]['price']) / trades[-1]['price'] * 100
-            
-            trade_history.append({
-                'entry_time': trades[-1]['timestamp'],
-                'exit_time': current_time,
-                'entry_price': trades[-1]['price'],
-                'exit_price': current_price,
-                'position': position,
-                'pnl_percent': trade_pnl,
-                'duration_minutes': (current_time - trades[-1]['timestamp']).total_seconds() / 60
-            })
-            
-            trades.append({
-                'type': 'sell',
-                'timestamp': current_time,
-                'price': current_price,
-                'position': 0,
-                'balance': balance
-            })
-            position = 0
+        exit_time = timestamps.iloc[result.exit_index[t]]
+        trade_history.append({
+            'entry_time': entry_time,
+            'exit_time': exit_time,
+            'entry_price': result.entry_price[t],
+            'exit_price': result.exit_price[t],
+            'position': result.size[t],
+            'pnl_percent': (result.exit_price[t] - result.entry_price[t]) / result.entry_price[t] * 100,
+            'duration_minutes': (exit_time - entry_time).total_seconds() / 60
+        })
+        trades.append({
+            'type': 'sell',
+            'timestamp': exit_time,
+            'price': result.exit_price[t],
+            'position': 0,
+            'balance': result.capital_after[t]
+        })
     
     # 最后强制平仓
     if position > 0 and len(df) > 0:
@@ -182,31 +190,6 @@ def simulate_trades_with_strategy(df, strategy_type='optimized'):
     
     return trades, trade_history, balance
 
-def calculate_rsi(prices, period=14):
-    """计算RSI指标"""
-    delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-def calculate_macd(prices, fast=12, slow=26, signal=9):
-    """计算MACD指标"""
-    exp1 = prices.ewm(span=fast, adjust=False).mean()
-    exp2 = prices.ewm(span=slow, adjust=False).mean()
-    macd = exp1 - exp2
-    macd_signal = macd.ewm(span=signal, adjust=False).mean()
-    return macd, macd_signal
-
-def calculate_bollinger_bands(prices, window=20, num_std=2):
-    """计算布林带"""
-    middle = prices.rolling(window=window).mean()
-    std = prices.rolling(window=window).std()
-    upper = middle + (std * num_std)
-    lower = middle - (std * num_std)
-    return upper, middle, lower
-
 def create_candlestick_chart(df, trades, output_file='backtest_chart.html'):
     """创建K线图并标注交易点"""
     # 创建子图
@@ -10,6 +10,9 @@ from datetime import datetime, timedelta
 import json
 import os
 
+import indicators
+from backtest_core import run_backtest, SpotModel, EXIT_OPEN
+
 def prepare_okx_data_for_backtest():
     """准备OKX数据用于回测"""
     print("准备OKX BTC永续合约数据用于回测...")
@@ -52,62 +55,47 @@ def run_backtest_with_data(data_df):
     # 简单策略: RSI策略
     print("应用RSI策略...")
     
-    # 计算RSI
-    def calculate_rsi(prices, period=14):
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
-    
     # 计算指标
-    data_df['rsi'] = calculate_rsi(data_df['close'])
-    data_df['sma_20'] = data_df['close'].rolling(window=20).mean()
-    data_df['sma_50'] = data_df['close'].rolling(window=50).mean()
+    data_df['rsi'] = indicators.rsi(data_df['close'], 14)
+    data_df['sma_20'] = indicators.rolling_mean(data_df['close'], 20)
+    data_df['sma_50'] = indicators.rolling_mean(data_df['close'], 50)
     
     # 生成交易信号
     data_df['buy_signal'] = (data_df['rsi'] < 30) & (data_df['sma_20'] > data_df['sma_50'])
     data_df['sell_signal'] = (data_df['rsi'] > 70) | (data_df['sma_20'] < data_df['sma_50'])
     
-    # 模拟交易
+    # 模拟交易: 使用95%的资金买入 (留5%作为保证金)，卖出扣除0.5%手续费
     initial_balance = 10000
-    balance = initial_balance
-    position = 0
-    trades = []
+    model = SpotModel(fraction=0.95, fee_rate=0.005)
+    result = run_backtest(data_df['close'], data_df['buy_signal'], data_df['sell_signal'], model=model,
+                          initial_capital=initial_balance, reenter_same_bar=False)
     
-    for i in range(len(data_df)):
-        row = data_df.iloc[i]
-        
-        # 买入信号
-        if row['buy_signal'] and position == 0:
-            position = balance / row['close'] * 0.95  # 使用95%的资金，留5%作为保证金
-            balance = 0
-            trades.append({
-                'type': 'buy',
-                'timestamp': row['timestamp'],
-                'price': row['close'],
-                'position': position,
-                'balance': balance
-            })
-        
-        # 卖出信号
-        elif row['sell_signal'] and position > 0:
-            balance = position * row['close'] * 0.995  # 扣除0.5%手续费
-            position = 0
+    timestamps = data_df['timestamp'].tolist()
+    trades = []
+    for t in range(len(result)):
+        trades.append({
+            'type': 'buy',
+            'timestamp': timestamps[result.entry_index[t]],
+            'price': result.entry_price[t],
+            'position': result.size[t],
+            'balance': 0
+        })
+        if result.exit_reason[t] != EXIT_OPEN:
             trades.append({
                 'type': 'sell',
-                'timestamp': row['timestamp'],
-                'price': row['close'],
-                'position': position,
-                'balance': balance
+                'timestamp': timestamps[result.exit_index[t]],
+                'price': result.exit_price[t],
+                'position': 0,
+                'balance': result.capital_after[t]
             })
     
     # 计算最终结果
-    if position > 0:
-        final_balance = position * data_df.iloc[-1]['close'] * 0.995
+    open_trade = result.open_trade
+    if open_trade is not None:
+        _, final_balance = model.settle(1, result.entry_price[open_trade], float(data_df['close'].iloc[-1]),
+                                        result.size[open_trade], result.final_capital)
     else:
-        final_balance = balance
+        final_balance = result.final_capital
     
     total_return = (final_balance - initial_balance) / initial_balance * 100
     
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+带缓存的交易所客户端
+按接口设置缓存有效期 (行情1秒、持仓2秒、余额5秒)，同一时刻的重复请求合并为一次，
+下单/平仓/设置杠杆后自动清除受影响的缓存，并统计命中次数以衡量节省的 REST 请求
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 各接口缓存有效期 (秒)
+DEFAULT_TTLS = {
+    'fetch_ticker': 1.0,
+    'fetch_positions': 2.0,
+    'fetch_balance': 5.0,
+    'fetch_open_orders': 2.0,
+}
+
+# 会改变账户状态的调用
+ORDER_METHODS = {
+    'create_order',
+    'create_market_order',
+    'create_market_buy_order',
+    'create_market_sell_order',
+    'create_limit_order',
+    'create_limit_buy_order',
+    'create_limit_sell_order',
+    'cancel_order',
+    'cancel_all_orders',
+    'edit_order',
+    'set_leverage',
+    'set_margin_mode',
+}
+
+# 下单后需要失效的接口
+INVALIDATED_BY_ORDERS = {'fetch_positions', 'fetch_balance', 'fetch_open_orders'}
+
+
+class _InFlight:
+    """正在进行中的请求，其它线程等待它的结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CachedExchange:
+    """ccxt 客户端的缓存包装，未列出的方法和属性原样转发
+
+    注意: 缓存命中时返回的是同一个对象，调用方不应修改它。
+    用法:
+        exchange = CachedExchange(ccxt.okx({...}))
+        exchange.fetch_ticker(symbol)   # 1秒内重复调用只请求一次
+        print(exchange.stats)
+    """
+
+    _OWN = {'_exchange', '_ttls', '_cache', '_inflight', '_lock', '_generation', 'stats'}
+
+    def __init__(self, exchange, ttls: Optional[Dict[str, float]] = None):
+        self._exchange = exchange
+        self._ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self._cache = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'invalidations': 0}
+
+    def __getattr__(self, name):
+        if name in self._OWN:
+            raise AttributeError(name)
+        attr = getattr(self._exchange, name)
+        if name in self._ttls:
+            return lambda *args, **kwargs: self._cached_call(name, attr, args, kwargs)
+        if name in ORDER_METHODS:
+            return lambda *args, **kwargs: self._order_call(attr, args, kwargs)
+        return attr
+
+    def __setattr__(self, name, value):
+        if name in self._OWN:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._exchange, name, value)
+
+    def _cached_call(self, name, method, args, kwargs):
+        key = (name, repr(args), repr(sorted(kwargs.items())))
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self._ttls[name]:
+                self.stats['hits'] += 1
+                return entry[1]
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                inflight = _InFlight()
+                self._inflight[key] = inflight
+                owner = True
+                generation = self._generation
+                self.stats['misses'] += 1
+            else:
+                owner = False
+                self.stats['coalesced'] += 1
+
+        if not owner:
+            inflight.done.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.result
+
+        try:
+            inflight.result = method(*args, **kwargs)
+            with self._lock:
+                # 请求期间发生过下单时，结果可能已过期，不写入缓存
+                if generation == self._generation:
+                    self._cache[key] = (time.monotonic(), inflight.result)
+            return inflight.result
+        except Exception as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.done.set()
+
+    def _order_call(self, method, args, kwargs):
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self.invalidate(*INVALIDATED_BY_ORDERS)
+
+    def invalidate(self, *names: str) -> None:
+        """清除指定接口的缓存，不传参数时清除全部"""
+        with self._lock:
+            for key in list(self._cache):
+                if not names or key[0] in names:
+                    del self._cache[key]
+            self._generation += 1
+            self.stats['invalidations'] += 1
+
+    @property
+    def saved_requests(self) -> int:
+        """缓存命中和合并请求共节省的 REST 调用次数"""
+        return self.stats['hits'] + self.stats['coalesced']
+
+    def hit_rate(self) -> float:
+        total = self.stats['hits'] + self.stats['coalesced'] + self.stats['misses']
+        return self.saved_requests / total if total else 0.0
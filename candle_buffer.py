@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+K线环形缓冲区 - 增量更新，零拷贝读取
+首次获取完整K线后，每次只用 since= 拉取最新(可能未收盘)的K线
+"""
+
+import time
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TIMEFRAME_UNITS = {
+    's': 1000,
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """把 '1m' / '15m' / '4h' / '1d' 之类的周期转换为毫秒"""
+    amount, unit = timeframe[:-1], timeframe[-1]
+    if unit not in TIMEFRAME_UNITS or not amount.isdigit():
+        raise ValueError(f"不支持的时间周期: {timeframe}")
+    return int(amount) * TIMEFRAME_UNITS[unit]
+
+
+class CandleRingBuffer:
+    """定长K线环形缓冲区
+
+    数据按列存放，每根K线同时写入 i 和 i+capacity 两个位置，
+    因此任意时刻最近 N 根K线在内存中都是连续的，
+    closes/highs/lows/volumes 返回的都是视图而不是拷贝。
+    注意: 视图会随下一次更新而变化，需要保留时请自行 copy()。
+    """
+
+    COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity 必须大于0")
+        self.capacity = capacity
+        self._timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.zeros((len(self.COLUMNS), 2 * capacity), dtype=np.float64)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """最新一根K线的开盘时间 (毫秒)"""
+        if not self._size:
+            return None
+        return int(self._timestamps[self._start + self._size - 1])
+
+    def _write(self, pos: int, candle) -> None:
+        self._timestamps[pos] = self._timestamps[pos + self.capacity] = int(candle[0])
+        for col in range(len(self.COLUMNS)):
+            value = candle[col + 1]
+            self._values[col, pos] = self._values[col, pos + self.capacity] = float(value) if value is not None else np.nan
+
+    def append(self, candle) -> None:
+        """追加一根新K线 [timestamp, open, high, low, close, volume]"""
+        if self._size < self.capacity:
+            self._write(self._size, candle)
+            self._size += 1
+        else:
+            # 覆盖最旧的一根
+            self._write(self._start, candle)
+            self._start = (self._start + 1) % self.capacity
+
+    def replace_last(self, candle) -> None:
+        """原地更新最新一根 (未收盘) K线"""
+        if not self._size:
+            self.append(candle)
+            return
+        self._write((self._start + self._size - 1) % self.capacity, candle)
+
+    def update(self, ohlcv: List[list]) -> int:
+        """合并交易所返回的K线，返回新增的K线数量
+
+        时间戳相同的视为未收盘K线的更新，更早的K线直接忽略。
+        """
+        added = 0
+        for candle in ohlcv:
+            last_ts = self.last_timestamp
+            ts = int(candle[0])
+            if last_ts is not None and ts == last_ts:
+                self.replace_last(candle)
+            elif last_ts is None or ts > last_ts:
+                self.append(candle)
+                added += 1
+        return added
+
+    def clear(self) -> None:
+        self._start = 0
+        self._size = 0
+
+    def seed(self, ohlcv: List[list]) -> None:
+        """用完整的历史K线重新初始化"""
+        self.clear()
+        self.update(ohlcv[-self.capacity:])
+
+    def _view(self, col: int) -> np.ndarray:
+        return self._values[col, self._start:self._start + self._size]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[self._start:self._start + self._size]
+
+    @property
+    def opens(self) -> np.ndarray:
+        return self._view(0)
+
+    @property
+    def highs(self) -> np.ndarray:
+        return self._view(1)
+
+    @property
+    def lows(self) -> np.ndarray:
+        return self._view(2)
+
+    @property
+    def closes(self) -> np.ndarray:
+        return self._view(3)
+
+    @property
+    def volumes(self) -> np.ndarray:
+        return self._view(4)
+
+    def to_ohlcv(self) -> List[list]:
+        """导出为 ccxt 格式的K线列表 (拷贝)"""
+        return [[int(ts)] + [float(v) for v in self._values[:, self._start + i]]
+                for i, ts in enumerate(self.timestamps)]
+
+
+class CandleFeed:
+    """按时间周期维护K线缓冲区的行情源
+
+    用法:
+        feed = CandleFeed(exchange, 'BTC/USDT:USDT', {'15m': 50, '5m': 30})
+        closes_15m = feed.refresh('15m').closes
+    """
+
+    def __init__(self, exchange, symbol: str, timeframes: Dict[str, int]):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.buffers = {tf: CandleRingBuffer(capacity) for tf, capacity in timeframes.items()}
+        self.stats = {'seed_requests': 0, 'incremental_requests': 0, 'candles_received': 0}
+
+    def request_params(self, timeframe: str) -> Tuple[Dict, bool]:
+        """下一次 fetch_ohlcv 的参数，返回 (参数, 是否为完整重新获取)"""
+        buffer = self.buffers[timeframe]
+        tf_ms = timeframe_to_ms(timeframe)
+        last_ts = buffer.last_timestamp
+
+        if last_ts is not None:
+            # 需要的K线: 最新那根(可能已收盘) + 此后新产生的
+            missing = int((time.time() * 1000 - last_ts) // tf_ms) + 1
+            if missing < buffer.capacity:
+                return {'since': last_ts, 'limit': missing + 1}, False
+            logger.info(f"{timeframe} K线断档 {missing} 根，重新初始化缓冲区")
+
+        return {'limit': buffer.capacity}, True
+
+    def _record(self, ohlcv: List[list], reseed: bool) -> None:
+        self.stats['seed_requests' if reseed else 'incremental_requests'] += 1
+        self.stats['candles_received'] += len(ohlcv)
+
+    def fetch_updates(self, timeframe: str) -> Tuple[List[list], bool]:
+        """拉取指定周期需要合并的K线，返回 (K线列表, 是否为完整重新获取)"""
+        params, reseed = self.request_params(timeframe)
+        ohlcv = self.exchange.fetch_ohlcv(self.symbol, timeframe, **params)
+        self._record(ohlcv, reseed)
+        return ohlcv, reseed
+
+    async def fetch_updates_async(self, exchange, timeframe: str) -> Tuple[List[list], bool]:
+        """与 fetch_updates 相同，使用 ccxt.async_support 客户端"""
+        params, reseed = self.request_params(timeframe)
+        ohlcv = await exchange.fetch_ohlcv(self.symbol, timeframe, **params)
+        self._record(ohlcv, reseed)
+        return ohlcv, reseed
+
+    def refresh(self, timeframe: str) -> CandleRingBuffer:
+        """增量刷新指定周期，首次调用或断档过久时重新完整获取"""
+        buffer = self.buffers[timeframe]
+        ohlcv, reseed = self.fetch_updates(timeframe)
+        if reseed:
+            buffer.seed(ohlcv)
+        else:
+            buffer.update(ohlcv)
+        return buffer
+
+    def refresh_all(self) -> Dict[str, CandleRingBuffer]:
+        return {tf: self.refresh(tf) for tf in self.buffers}
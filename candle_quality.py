@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+K线数据质量检查 - 去重、时间网格校验、缺口检测与修补
+所有步骤都是整列数组运算，没有逐行的 Python 判断，下载、落盘和回测读取都走同一套检查。
+
+检查内容:
+    invalid     时间戳或价格为 NaN、价格非正、最高价低于最低价的行 (丢弃)
+    misaligned  时间戳不在周期网格上的行 (丢弃)；网格的起点取多数K线的偏移，
+                因此按 UTC+8 对齐的 OKX 日线/12小时线也能正确检查
+    duplicates  重复时间戳 (保留最后一条，即最新获取的数据)
+    gaps        相邻K线间隔超过一个周期的缺失段 [开始, 结束)
+
+用法:
+    clean, report = clean_ohlcv(ohlcv, '5m')                   # (N, 6) → 干净、严格递增的 (M, 6)
+    clean, report = clean_ohlcv(ohlcv, '5m', fill=True)        # 缺口用前收盘价的平盘K线补齐
+    clean, report = refetch_gaps(exchange, symbol, '5m', clean, report['gaps'])   # 只重新下载缺失段
+    print(format_report(report))
+"""
+
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from candle_buffer import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+def dedupe_index(timestamps) -> np.ndarray:
+    """按时间戳去重并排序，返回保留行的下标 (同一时间戳保留最后出现的一行)"""
+    timestamps = np.asarray(timestamps)
+    _, last_idx = np.unique(timestamps[::-1], return_index=True)
+    return len(timestamps) - 1 - last_idx
+
+
+def find_gaps(timestamps, timeframe: str, start_ms: Optional[int] = None,
+              end_ms: Optional[int] = None) -> List[Tuple[int, int]]:
+    """严格递增的时间戳中缺失的时间段 [开始, 结束)
+
+    start_ms / end_ms 给出时，首根之前和末根之后的缺失也计入。
+    """
+    tf_ms = timeframe_to_ms(timeframe)
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if len(timestamps) == 0:
+        return [(int(start_ms), int(end_ms))] if start_ms is not None and end_ms is not None \
+            and end_ms > start_ms else []
+
+    gap_idx = np.flatnonzero(np.diff(timestamps) > tf_ms)
+    gaps = list(zip((timestamps[gap_idx] + tf_ms).tolist(), timestamps[gap_idx + 1].tolist()))
+    if start_ms is not None:
+        # start_ms 之后第一个网格点 (网格与已有K线对齐)
+        first = int(timestamps[0]) - (int(timestamps[0]) - int(start_ms)) // tf_ms * tf_ms
+        if timestamps[0] > first:
+            gaps.insert(0, (first, int(timestamps[0])))
+    if end_ms is not None and int(timestamps[-1]) + tf_ms < end_ms:
+        gaps.append((int(timestamps[-1]) + tf_ms, int(end_ms)))
+    return gaps
+
+
+def fill_gaps(data: np.ndarray, timeframe: str) -> Tuple[np.ndarray, int]:
+    """把严格递增的 (N, 6) K线补成连续网格，缺失处为前收盘价的平盘K线 (成交量0)，返回 (K线, 补齐根数)"""
+    tf_ms = timeframe_to_ms(timeframe)
+    if len(data) < 2:
+        return data, 0
+    timestamps = data[:, 0].astype(np.int64)
+    grid = np.arange(timestamps[0], timestamps[-1] + 1, tf_ms, dtype=np.int64)
+    if len(grid) == len(timestamps):
+        return data, 0
+
+    # 每个网格点对应的最近一根已有K线
+    source = np.searchsorted(timestamps, grid, side='right') - 1
+    exists = timestamps[source] == grid
+    filled = np.empty((len(grid), data.shape[1]), dtype=np.float64)
+    filled[:, 0] = grid
+    filled[exists, 1:] = data[source[exists], 1:]
+    previous_close = data[source[~exists], 4]
+    filled[~exists, 1:5] = previous_close[:, None]
+    filled[~exists, 5:] = 0.0
+    return filled, int((~exists).sum())
+
+
+def clean_ohlcv(ohlcv, timeframe: str, fill: bool = False,
+                start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Tuple[np.ndarray, Dict]:
+    """清洗 ccxt 格式或 (N, 6) 的K线，返回 (严格递增的 (M, 6) 数组, 检查报告)"""
+    tf_ms = timeframe_to_ms(timeframe)
+    data = np.asarray(ohlcv, dtype=np.float64)
+    data = data.reshape(-1, 6) if data.size else np.empty((0, 6), dtype=np.float64)
+    report = {'timeframe': timeframe, 'rows': len(data), 'invalid': 0, 'misaligned': 0,
+              'duplicates': 0, 'gaps': [], 'missing': 0, 'filled': 0}
+
+    prices = data[:, 1:5]
+    valid = ~np.isnan(data[:, :5]).any(axis=1) & (prices > 0).all(axis=1) & (data[:, 2] >= data[:, 3])
+    report['invalid'] = int((~valid).sum())
+    data = data[valid]
+
+    timestamps = data[:, 0].astype(np.int64)
+    offsets = timestamps % tf_ms
+    aligned = np.ones(len(timestamps), dtype=bool)
+    if len(offsets):
+        values, counts = np.unique(offsets, return_counts=True)
+        aligned = offsets == values[np.argmax(counts)]
+    report['misaligned'] = int((~aligned).sum())
+    data, timestamps = data[aligned], timestamps[aligned]
+
+    keep = dedupe_index(timestamps)
+    report['duplicates'] = len(timestamps) - len(keep)
+    data = data[keep]
+
+    report['gaps'] = find_gaps(data[:, 0].astype(np.int64), timeframe, start_ms, end_ms)
+    report['missing'] = sum((b - a + tf_ms - 1) // tf_ms for a, b in report['gaps'])
+    if fill:
+        data, report['filled'] = fill_gaps(data, timeframe)
+    return data, report
+
+
+def refetch_gaps(exchange, symbol: str, timeframe: str, data: np.ndarray,
+                 gaps: List[Tuple[int, int]], **downloader_kwargs) -> Tuple[np.ndarray, Dict]:
+    """只重新下载缺失段并合并，返回 (清洗后的K线, 合并后的检查报告)"""
+    from history_downloader import ParallelCandleDownloader
+
+    downloader = ParallelCandleDownloader(exchange, **downloader_kwargs)
+    parts = [data]
+    for gap_start, gap_end in gaps:
+        try:
+            parts.append(downloader.download(symbol, timeframe, gap_start, gap_end))
+        except Exception as e:
+            logger.error(f"补齐 {symbol} {timeframe} 缺口 {gap_start}-{gap_end} 失败: {e}")
+    merged = np.concatenate([np.asarray(p, dtype=np.float64).reshape(-1, 6) for p in parts])
+    refetched = len(merged) - len(data)
+    data, report = clean_ohlcv(merged, timeframe)
+    report['refetched'] = refetched
+    return data, report
+
+
+def format_report(report: Dict) -> str:
+    """一行文字的检查结果"""
+    text = (f"{report['timeframe']} 共{report['rows']}行: 无效{report['invalid']}, "
+            f"未对齐{report['misaligned']}, 重复{report['duplicates']}, "
+            f"缺口{len(report['gaps'])}段/{report['missing']}根")
+    if report.get('filled'):
+        text += f", 已补平盘K线{report['filled']}根"
+    return text
+
+
+def log_report(report: Dict, label: str = '') -> None:
+    """有问题时按 warning 输出，否则 debug"""
+    problems = report['invalid'] or report['misaligned'] or report['duplicates'] or report['gaps']
+    message = f"K线检查{' ' + label if label else ''}: {format_report(report)}"
+    if problems:
+        logger.warning(message)
+    else:
+        logger.debug(message)
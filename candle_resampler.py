@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+多时间框架K线合成
+实盘: 只拉取一个1分钟K线流，在本地增量合成 5m/15m/1h/4h/1d，未收盘的高周期K线原地更新
+回测: 只下载最小周期的历史数据，向量化合成其它周期
+"""
+
+import asyncio
+import logging
+import numpy as np
+from typing import Dict, List, Optional
+
+from candle_buffer import CandleFeed, CandleRingBuffer, timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+def resample_ohlcv(ohlcv, timeframe: str, drop_partial_first: bool = True) -> np.ndarray:
+    """把低周期K线向量化合成为高周期K线
+
+    ohlcv: ccxt 格式的K线列表或 (N, 6) 数组，时间戳为毫秒
+    返回 (M, 6) 的 float64 数组，第0列为高周期K线的开盘时间。
+    重复时间戳保留最后一条；若第一个周期的数据不完整则默认丢弃，
+    最后一个周期可能是未收盘的K线，与交易所返回的一致。
+    高周期按 UTC 零点对齐。
+    """
+    data = np.asarray(ohlcv, dtype=np.float64)
+    if data.size == 0:
+        return np.empty((0, 6), dtype=np.float64)
+
+    timestamps = data[:, 0].astype(np.int64)
+    # 排序去重 (保留最后一条)
+    _, last_idx = np.unique(timestamps[::-1], return_index=True)
+    keep = len(timestamps) - 1 - last_idx
+    data = data[keep]
+    timestamps = timestamps[keep]
+
+    tf_ms = timeframe_to_ms(timeframe)
+    buckets = timestamps // tf_ms * tf_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+
+    result = np.empty((len(starts), 6), dtype=np.float64)
+    result[:, 0] = buckets[starts]
+    result[:, 1] = data[starts, 1]
+    result[:, 2] = np.maximum.reduceat(data[:, 2], starts)
+    result[:, 3] = np.minimum.reduceat(data[:, 3], starts)
+    result[:, 4] = data[ends, 4]
+    result[:, 5] = np.add.reduceat(data[:, 5], starts)
+
+    if drop_partial_first and len(result) and timestamps[0] != buckets[0]:
+        result = result[1:]
+    return result
+
+
+def resample_multi(ohlcv, timeframes: List[str]) -> Dict[str, np.ndarray]:
+    """一次性从同一份基础K线合成多个周期"""
+    return {tf: resample_ohlcv(ohlcv, tf) for tf in timeframes}
+
+
+class _FormingBar:
+    """单个高周期的未收盘K线状态
+
+    closed 是本周期内已收盘基础K线的聚合 [open, high, low, volume]，
+    forming 是当前未收盘的基础K线，两者合并得到高周期的实时K线，
+    因此同一根基础K线反复更新时不会重复累计成交量。
+    """
+
+    def __init__(self, tf_ms: int):
+        self.tf_ms = tf_ms
+        self.bucket = None
+        self.closed = None
+        self.forming = None
+
+    def reset(self, bucket: int, closed: Optional[list] = None, forming: Optional[list] = None):
+        self.bucket = bucket
+        self.closed = closed
+        self.forming = forming
+
+    def _fold_forming(self):
+        """把已收盘的基础K线并入 closed"""
+        f = self.forming
+        if f is None:
+            return
+        if self.closed is None:
+            self.closed = [f[1], f[2], f[3], f[5]]
+        else:
+            self.closed = [self.closed[0], max(self.closed[1], f[2]),
+                           min(self.closed[2], f[3]), self.closed[3] + f[5]]
+        self.forming = None
+
+    def push(self, candle) -> list:
+        """合并一根基础K线，返回当前高周期K线 [ts, o, h, l, c, v]"""
+        ts = int(candle[0])
+        bucket = ts // self.tf_ms * self.tf_ms
+        if self.forming is not None and ts > int(self.forming[0]):
+            self._fold_forming()
+        if bucket != self.bucket:
+            self.reset(bucket)
+        self.forming = candle
+        return self.current()
+
+    def current(self) -> list:
+        f = self.forming
+        if self.closed is None:
+            return [self.bucket, f[1], f[2], f[3], f[4], f[5]]
+        o, h, l, v = self.closed
+        return [self.bucket, o, max(h, f[2]), min(l, f[3]), f[4], v + f[5]]
+
+
+class MultiTimeframeResampler:
+    """从一个基础周期增量合成多个高周期的环形缓冲区"""
+
+    def __init__(self, timeframes: Dict[str, int], base_timeframe: str = '1m'):
+        self.base_timeframe = base_timeframe
+        base_ms = timeframe_to_ms(base_timeframe)
+        self.buffers = {tf: CandleRingBuffer(capacity) for tf, capacity in timeframes.items()}
+        if base_timeframe not in self.buffers:
+            self.buffers[base_timeframe] = CandleRingBuffer(60)
+        self._bars = {}
+        for tf in self.buffers:
+            if tf == base_timeframe:
+                continue
+            tf_ms = timeframe_to_ms(tf)
+            if tf_ms % base_ms:
+                raise ValueError(f"{tf} 不是基础周期 {base_timeframe} 的整数倍")
+            self._bars[tf] = _FormingBar(tf_ms)
+
+    @property
+    def base(self) -> CandleRingBuffer:
+        return self.buffers[self.base_timeframe]
+
+    def seed(self, history: Dict[str, List[list]]) -> None:
+        """初始化所有周期
+
+        history 必须包含基础周期；高周期若由交易所直接提供则用于回填历史，
+        否则从基础周期向量化合成。高周期最后一根(未收盘)K线会扣除
+        基础周期未收盘K线的成交量，之后交由增量逻辑维护。
+        """
+        base_ohlcv = history[self.base_timeframe]
+        self.base.seed(base_ohlcv)
+        base_forming = list(base_ohlcv[-1]) if base_ohlcv else None
+
+        for tf, bar in self._bars.items():
+            buffer = self.buffers[tf]
+            ohlcv = history.get(tf)
+            if ohlcv is None:
+                ohlcv = resample_ohlcv(base_ohlcv, tf, drop_partial_first=False).tolist()
+            buffer.seed(ohlcv)
+            bar.reset(None)
+            if not ohlcv or base_forming is None:
+                continue
+
+            last = list(ohlcv[-1])
+            bucket = int(last[0])
+            if int(base_forming[0]) // bar.tf_ms * bar.tf_ms != bucket:
+                continue
+            if last[0] == base_forming[0]:
+                # 未收盘的基础K线是本周期第一根
+                bar.reset(bucket, None, base_forming)
+            else:
+                bar.reset(bucket, [last[1], last[2], last[3], max(last[5] - base_forming[5], 0.0)], base_forming)
+
+    def update(self, base_ohlcv: List[list]) -> None:
+        """合并新的基础周期K线 (可包含未收盘K线的重复更新)"""
+        for candle in base_ohlcv:
+            last_ts = self.base.last_timestamp
+            if last_ts is not None and int(candle[0]) < last_ts:
+                continue
+            self.base.update([candle])
+            for tf, bar in self._bars.items():
+                self.buffers[tf].update([bar.push(candle)])
+
+
+class ResampledCandleFeed(CandleFeed):
+    """只拉取基础周期K线、本地合成其它周期的行情源
+
+    每次 refresh_all() 只有一次 REST 请求；首次启动时高周期各完整获取一次用于回填历史。
+    用法:
+        feed = ResampledCandleFeed(exchange, symbol, {'15m': 50, '5m': 30, '1m': 20})
+        buffers = feed.refresh_all()
+        closes_15m = buffers['15m'].closes
+    """
+
+    def __init__(self, exchange, symbol: str, timeframes: Dict[str, int], base_timeframe: str = '1m'):
+        super().__init__(exchange, symbol, {})
+        self.base_timeframe = base_timeframe
+        self.resampler = MultiTimeframeResampler(timeframes, base_timeframe)
+        self.buffers = self.resampler.buffers
+
+    def refresh_all(self) -> Dict[str, CandleRingBuffer]:
+        ohlcv, reseed = self.fetch_updates(self.base_timeframe)
+        if reseed:
+            history = {self.base_timeframe: ohlcv}
+            for tf, buffer in self.buffers.items():
+                if tf != self.base_timeframe:
+                    history[tf] = self.exchange.fetch_ohlcv(self.symbol, tf, limit=buffer.capacity)
+                    self.stats['seed_requests'] += 1
+            self.resampler.seed(history)
+        else:
+            self.resampler.update(ohlcv)
+        return self.buffers
+
+    async def refresh_all_async(self, exchange) -> Dict[str, CandleRingBuffer]:
+        """与 refresh_all 相同，使用 ccxt.async_support 客户端，首次回填时各周期并发获取"""
+        ohlcv, reseed = await self.fetch_updates_async(exchange, self.base_timeframe)
+        if reseed:
+            higher = [tf for tf in self.buffers if tf != self.base_timeframe]
+            results = await asyncio.gather(*[
+                exchange.fetch_ohlcv(self.symbol, tf, limit=self.buffers[tf].capacity) for tf in higher
+            ])
+            self.stats['seed_requests'] += len(higher)
+            history = dict(zip(higher, results))
+            history[self.base_timeframe] = ohlcv
+            self.resampler.seed(history)
+        else:
+            self.resampler.update(ohlcv)
+        return self.buffers
+
+    def refresh(self, timeframe: str) -> CandleRingBuffer:
+        return self.refresh_all()[timeframe]
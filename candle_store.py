@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+本地K线归档 - 按交易对/周期/日期分区的列式存储
+每个日分区两个文件: <日期>.ts.npy (int64 毫秒时间戳) 和 <日期>.ohlcv.npy (float64, 5×N 按列存放)
+读取时内存映射，同步时只下载缺失的时间段
+
+用法:
+    python candle_store.py sync --symbol BTC/USDT:USDT --timeframe 5m --days 30
+    python candle_store.py info --symbol BTC/USDT:USDT --timeframe 5m
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from candle_buffer import timeframe_to_ms
+from candle_quality import clean_ohlcv, dedupe_index, find_gaps, format_report, log_report
+from history_downloader import ParallelCandleDownloader
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = 'data/candles'
+DAY_MS = 24 * 60 * 60 * 1000
+COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+HOLE_RETRY_MS = DAY_MS          # 交易所无数据的空洞过期后重新请求
+HOLE_MAX_ATTEMPTS = 3           # 连续几次请求都为空后视为永久空洞，不再重试
+
+
+class CandleStore:
+    """本地列式K线仓库"""
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+
+    # ---------- 路径 ----------
+
+    def series_dir(self, symbol: str, timeframe: str) -> str:
+        safe_symbol = symbol.replace('/', '-').replace(':', '_')
+        return os.path.join(self.root, safe_symbol, timeframe)
+
+    def _partition_paths(self, series_dir: str, day: str) -> Tuple[str, str]:
+        return (os.path.join(series_dir, f'{day}.ts.npy'),
+                os.path.join(series_dir, f'{day}.ohlcv.npy'))
+
+    @staticmethod
+    def _day_key(ts_ms: int) -> str:
+        return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+    def partitions(self, symbol: str, timeframe: str) -> List[str]:
+        """已有的日分区 (升序)"""
+        series_dir = self.series_dir(symbol, timeframe)
+        if not os.path.isdir(series_dir):
+            return []
+        return sorted(name[:-len('.ts.npy')] for name in os.listdir(series_dir) if name.endswith('.ts.npy'))
+
+    def _load_meta(self, symbol: str, timeframe: str) -> Dict:
+        path = os.path.join(self.series_dir(symbol, timeframe), 'meta.json')
+        if not os.path.exists(path):
+            return {'holes': []}
+        with open(path, 'r') as f:
+            meta = json.load(f)
+        # 旧格式的空洞只有 [开始, 结束]，视为已过期，下次同步时重新确认
+        meta['holes'] = [hole if isinstance(hole, dict) else
+                         {'start': hole[0], 'end': hole[1], 'checked_ms': 0, 'attempts': 1}
+                         for hole in meta.get('holes', [])]
+        return meta
+
+    def _save_meta(self, symbol: str, timeframe: str, meta: Dict) -> None:
+        series_dir = self.series_dir(symbol, timeframe)
+        os.makedirs(series_dir, exist_ok=True)
+        tmp = os.path.join(series_dir, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, os.path.join(series_dir, 'meta.json'))
+
+    # ---------- 写入 ----------
+
+    def write(self, symbol: str, timeframe: str, ohlcv) -> int:
+        """合并写入K线 (ccxt 格式或 (N, 6) 数组)，同一时间戳以新数据为准，返回写入的K线数
+
+        写入前先做数据检查: 无效行和不在周期网格上的行直接丢弃。
+        """
+        data, report = clean_ohlcv(ohlcv, timeframe)
+        if report['invalid'] or report['misaligned']:
+            logger.warning(f"{symbol} {timeframe} 写入时丢弃无效K线{report['invalid']}根, "
+                           f"未对齐K线{report['misaligned']}根")
+        if data.size == 0:
+            return 0
+        timestamps = data[:, 0].astype(np.int64)
+        series_dir = self.series_dir(symbol, timeframe)
+        os.makedirs(series_dir, exist_ok=True)
+
+        days = timestamps // DAY_MS
+        for day in np.unique(days):
+            mask = days == day
+            new_ts = timestamps[mask]
+            new_values = data[mask, 1:].T
+            day_key = self._day_key(int(day) * DAY_MS)
+            ts_path, values_path = self._partition_paths(series_dir, day_key)
+
+            if os.path.exists(ts_path):
+                old_ts = np.load(ts_path)
+                old_values = np.load(values_path)
+                new_ts = np.concatenate([old_ts, new_ts])
+                new_values = np.concatenate([old_values, new_values], axis=1)
+
+            # 去重 (后写入的优先) 并排序
+            keep = dedupe_index(new_ts)
+            self._atomic_save(ts_path, new_ts[keep])
+            self._atomic_save(values_path, np.ascontiguousarray(new_values[:, keep]))
+
+        return len(timestamps)
+
+    @staticmethod
+    def _atomic_save(path: str, array: np.ndarray) -> None:
+        tmp = path + '.tmp.npy'
+        np.save(tmp, array)
+        os.replace(tmp, path)
+
+    # ---------- 读取 ----------
+
+    def load(self, symbol: str, timeframe: str,
+             start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """读取 [start_ms, end_ms) 范围的K线，返回 {'timestamp', 'open', ..., 'volume'} 数组字典
+
+        单个分区直接返回内存映射视图，跨分区时拼接为一份连续数组。
+        """
+        series_dir = self.series_dir(symbol, timeframe)
+        start_key = self._day_key(start_ms) if start_ms is not None else None
+        end_key = self._day_key(end_ms - 1) if end_ms is not None else None
+
+        ts_parts, value_parts = [], []
+        for day_key in self.partitions(symbol, timeframe):
+            if (start_key and day_key < start_key) or (end_key and day_key > end_key):
+                continue
+            ts_path, values_path = self._partition_paths(series_dir, day_key)
+            ts_parts.append(np.load(ts_path, mmap_mode='r'))
+            value_parts.append(np.load(values_path, mmap_mode='r'))
+
+        if not ts_parts:
+            timestamps = np.empty(0, dtype=np.int64)
+            values = np.empty((len(COLUMNS), 0), dtype=np.float64)
+        elif len(ts_parts) == 1:
+            timestamps, values = ts_parts[0], value_parts[0]
+        else:
+            timestamps = np.concatenate(ts_parts)
+            values = np.concatenate(value_parts, axis=1)
+
+        lo = 0 if start_ms is None else int(np.searchsorted(timestamps, start_ms, side='left'))
+        hi = len(timestamps) if end_ms is None else int(np.searchsorted(timestamps, end_ms, side='left'))
+        result = {'timestamp': timestamps[lo:hi]}
+        for i, col in enumerate(COLUMNS):
+            result[col] = values[i, lo:hi]
+        return result
+
+    def load_dataframe(self, symbol: str, timeframe: str,
+                       start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> pd.DataFrame:
+        """读取为以 timestamp 为索引的 DataFrame (与各回测脚本的格式一致)"""
+        arrays = self.load(symbol, timeframe, start_ms, end_ms)
+        df = pd.DataFrame({col: np.asarray(arrays[col]) for col in COLUMNS},
+                          index=pd.to_datetime(np.asarray(arrays['timestamp']), unit='ms'))
+        df.index.name = 'timestamp'
+        return df
+
+    # ---------- 同步 ----------
+
+    def _first_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
+        """本地最早一根K线的时间，没有数据时为 None"""
+        for day_key in self.partitions(symbol, timeframe):
+            timestamps = np.load(self._partition_paths(self.series_dir(symbol, timeframe), day_key)[0],
+                                 mmap_mode='r')
+            if len(timestamps):
+                return int(timestamps[0])
+        return None
+
+    @staticmethod
+    def _active_holes(holes: List[Dict], now_ms: int) -> List[Tuple[int, int]]:
+        """仍然有效的空洞 (未过期，或已达到最大重试次数)，按开始时间排序"""
+        return sorted((hole['start'], hole['end']) for hole in holes
+                      if hole['attempts'] >= HOLE_MAX_ATTEMPTS or now_ms - hole['checked_ms'] < HOLE_RETRY_MS)
+
+    @staticmethod
+    def _record_hole(holes: List[Dict], start_ms: int, end_ms: int, now_ms: int) -> List[Dict]:
+        """记录一段无数据的时间，与重叠或相邻的空洞合并，重试次数在合并前的基础上加一"""
+        merged = {'start': start_ms, 'end': end_ms, 'checked_ms': now_ms, 'attempts': 1}
+        kept = []
+        for hole in holes:
+            if hole['start'] <= end_ms and hole['end'] >= start_ms:
+                merged['start'] = min(merged['start'], hole['start'])
+                merged['end'] = max(merged['end'], hole['end'])
+                merged['attempts'] = max(merged['attempts'], hole['attempts'] + 1)
+            else:
+                kept.append(hole)
+        return sorted(kept + [merged], key=lambda hole: hole['start'])
+
+    def missing_ranges(self, symbol: str, timeframe: str,
+                       start_ms: int, end_ms: int) -> List[Tuple[int, int]]:
+        """找出 [start_ms, end_ms) 内本地缺失的时间段 (扣除已确认交易所无数据、尚未过期的空洞)
+
+        最后一根已存K线总会被重新获取，因为它可能是当时未收盘的K线。
+        """
+        tf_ms = timeframe_to_ms(timeframe)
+        start_ms = start_ms // tf_ms * tf_ms
+        timestamps = np.asarray(self.load(symbol, timeframe, start_ms, end_ms)['timestamp'])
+
+        if len(timestamps) == 0:
+            ranges = [(start_ms, end_ms)]
+        else:
+            ranges = find_gaps(timestamps, timeframe, start_ms) + [(int(timestamps[-1]), end_ms)]
+
+        holes = self._active_holes(self._load_meta(symbol, timeframe)['holes'], int(time.time() * 1000))
+        missing = []
+        for a, b in ranges:
+            # 按覆盖范围扣除空洞，缺失段只和空洞部分重叠时保留其余部分
+            for hole_start, hole_end in holes:
+                if hole_end <= a or hole_start >= b:
+                    continue
+                if hole_start > a:
+                    missing.append((a, hole_start))
+                a = max(a, hole_end)
+            if b > a:
+                missing.append((a, b))
+        return missing
+
+    def sync(self, exchange, symbol: str, timeframe: str,
+             start_ms: int, end_ms: Optional[int] = None, limit: int = 100,
+             max_workers: int = 8) -> Dict:
+        """从交易所补齐缺失的时间段，返回同步统计
+
+        每个缺失段按窗口并发下载，窗口完成即落盘；中途失败时重新 sync 只会下载剩余部分。
+        """
+        if end_ms is None:
+            end_ms = int(time.time() * 1000)
+        tf_ms = timeframe_to_ms(timeframe)
+        ranges = self.missing_ranges(symbol, timeframe, start_ms, end_ms)
+        stats = {'ranges': len(ranges), 'requests': 0, 'candles': 0, 'holes': 0}
+        downloader = ParallelCandleDownloader(exchange, limit=limit, max_workers=max_workers)
+
+        def on_window(window, candles):
+            stats['candles'] += self.write(symbol, timeframe, candles)
+
+        meta = self._load_meta(symbol, timeframe)
+        holes_before = list(meta['holes'])
+        for range_start, range_end in ranges:
+            written = stats['candles']
+            try:
+                downloader.download(symbol, timeframe, range_start, range_end, on_window=on_window)
+            except Exception as e:
+                logger.error(f"获取{timeframe}数据失败: {e}")
+                break
+            now_ms = int(time.time() * 1000)
+            if stats['candles'] > written:
+                # 过期后重新请求到了数据: 去掉这一段上的旧空洞，剩余缺失下次同步时重新确认
+                meta['holes'] = [hole for hole in meta['holes']
+                                 if hole['end'] <= range_start or hole['start'] >= range_end]
+                continue
+            first_ts = self._first_timestamp(symbol, timeframe)
+            if range_end < end_ms - tf_ms and first_ts is not None and range_start > first_ts:
+                # 已有数据中间交易所确实没有数据的一段 (例如维护)，记录下来避免每次重复请求；
+                # 最早一根K线之前的部分可能只是上市前或超出历史深度，不记录
+                meta['holes'] = self._record_hole(meta['holes'], range_start, range_end, now_ms)
+                stats['holes'] += 1
+
+        stats['requests'] = downloader.stats['requests']
+        if meta['holes'] != holes_before:
+            self._save_meta(symbol, timeframe, meta)
+        logger.info(f"同步 {symbol} {timeframe}: 缺失{stats['ranges']}段, "
+                    f"请求{stats['requests']}次, 写入{stats['candles']}根K线")
+        return stats
+
+    def sync_dataframe(self, exchange, symbol: str, timeframe: str, days: int,
+                       fill_gaps: bool = False) -> pd.DataFrame:
+        """补齐最近 days 天的数据并以 DataFrame 返回，供回测脚本直接使用
+
+        同步后仍缺失的时间段 (交易所维护等) 会记录在日志里；fill_gaps=True 时用前收盘价的平盘K线补齐。
+        """
+        end_ms = int(time.time() * 1000)
+        start_ms = end_ms - days * DAY_MS
+        self.sync(exchange, symbol, timeframe, start_ms, end_ms)
+
+        arrays = self.load(symbol, timeframe, start_ms, end_ms)
+        ohlcv = np.column_stack([arrays['timestamp']] + [arrays[col] for col in COLUMNS])
+        data, report = clean_ohlcv(ohlcv, timeframe, fill=fill_gaps, start_ms=start_ms, end_ms=end_ms)
+        log_report(report, symbol)
+        df = pd.DataFrame(data[:, 1:], columns=COLUMNS,
+                          index=pd.to_datetime(data[:, 0].astype(np.int64), unit='ms'))
+        df.index.name = 'timestamp'
+        return df
+
+
+def _create_exchange(config_path: str):
+    """创建只用于读取公共行情的交易所实例"""
+    import ccxt
+
+    exchange_config = {'enableRateLimit': True, 'options': {'defaultType': 'swap'}}
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        if 'proxies' in config.get('exchange', {}):
+            exchange_config['proxies'] = config['exchange']['proxies']
+    return ccxt.okx(exchange_config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地K线归档')
+    parser.add_argument('command', choices=['sync', 'info'])
+    parser.add_argument('--symbol', default='BTC/USDT:USDT')
+    parser.add_argument('--timeframe', default='5m')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--root', default=DEFAULT_ROOT)
+    parser.add_argument('--config', default='config/survival_config.json')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = CandleStore(args.root)
+
+    if args.command == 'sync':
+        exchange = _create_exchange(args.config)
+        end_ms = int(time.time() * 1000)
+        stats = store.sync(exchange, args.symbol, args.timeframe, end_ms - args.days * DAY_MS, end_ms,
+                           max_workers=args.workers)
+        print(f"✅ 同步完成: {stats}")
+
+    arrays = store.load(args.symbol, args.timeframe)
+    timestamps = arrays['timestamp']
+    print(f"📦 {args.symbol} {args.timeframe}: {len(timestamps)} 根K线, "
+          f"{len(store.partitions(args.symbol, args.timeframe))} 个日分区")
+    if len(timestamps):
+        print(f"   时间范围: {pd.to_datetime(timestamps[0], unit='ms')} 至 {pd.to_datetime(timestamps[-1], unit='ms')}")
+        ohlcv = np.column_stack([timestamps] + [arrays[col] for col in COLUMNS])
+        print(f"   数据检查: {format_report(clean_ohlcv(ohlcv, args.timeframe)[1])}")
+
+
+if __name__ == '__main__':
+    main()
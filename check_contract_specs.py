@@ -6,6 +6,8 @@
 import ccxt
 import json
 
+from markets_cache import load_markets_cached
+
 def check_contract_specs():
     print('📋 检查OKX合约规格...')
     print('='*50)
@@ -27,7 +29,7 @@ def check_contract_specs():
         
         # 获取市场信息
         symbol = 'BTC/USDT:USDT'
-        markets = exchange.load_markets()
+        markets = load_markets_cached(exchange) or exchange.load_markets()
         
         if symbol not in markets:
             print(f'❌ 交易对 {symbol} 不存在')
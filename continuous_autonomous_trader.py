@@ -6,11 +6,15 @@
 import ccxt
 import json
 import time
-import numpy as np
 from datetime import datetime
 import logging
 import os
 
+from candle_buffer import CandleFeed
+from indicator_memo import default_memo
+from streaming_indicators import PriceStructureIndicators
+from order_book_store import estimate_market_fill
+
 class ContinuousAutonomousTrader:
     def __init__(self):
         """初始化持续交易系统"""
@@ -31,6 +35,8 @@ class ContinuousAutonomousTrader:
         })
         
         self.symbol = 'BTC/USDT:USDT'
+        # K线环形缓冲区，首次完整获取后只增量拉取最新K线
+        self.candles = CandleFeed(self.exchange, self.symbol, {'15m': 100})
         self.contract_multiplier = 0.01
         
         # 🚀 激进策略参数
@@ -106,22 +112,18 @@ class ContinuousAutonomousTrader:
         """分析市场"""
         try:
             # 获取K线数据
-            ohlcv = self.exchange.fetch_ohlcv(self.symbol, '15m', limit=100)
-            closes = np.array([c[4] for c in ohlcv])
-            
-            # 计算技术指标
-            sma_20 = np.mean(closes[-20:])
-            sma_50 = np.mean(closes[-50:])
-            current_price = closes[-1]
+            buffer = self.candles.refresh('15m')
+            current_price = buffer.closes[-1]
             
-            # 计算支撑阻力
-            support = np.min(closes[-20:])
-            resistance = np.max(closes[-20:])
+            # 均线、支撑阻力 (20根)、波动率 (整个缓冲区): 已收盘部分按K线缓存，只重算未收盘K线
+            _, structure = default_memo.get(self.symbol, '15m', buffer, PriceStructureIndicators,
+                                            sr_window=20, vol_window=buffer.capacity)
+            sma_20 = structure['sma_20']
+            sma_50 = structure['sma_50']
+            support = structure['support']
+            resistance = structure['resistance']
             price_position = (current_price - support) / (resistance - support) if resistance != support else 0.5
-            
-            # 计算波动率
-            returns = np.diff(closes) / closes[:-1]
-            volatility = np.std(returns) * np.sqrt(365 * 24 * 4)
+            volatility = structure['volatility']
             
             # 判断趋势
             if current_price > sma_20 > sma_50:
@@ -251,18 +253,23 @@ class ContinuousAutonomousTrader:
                        min(contracts, self.params['max_position_size']))
         contracts = round(contracts * 100) / 100
         
+        # 按盘口深度估算市价单成交均价，止盈止损以此为基准
+        side = 'buy' if signal['direction'] == 'LONG' else 'sell'
+        entry_price, slippage_pct = estimate_market_fill(self.exchange, self.symbol, side, contracts, current_price)
+        
         # 计算止盈止损价格
         if signal['direction'] == 'LONG':
-            stop_loss_price = current_price * (1 - stop_loss_pct / 100)
-            take_profit_price = current_price * (1 + take_profit_pct / 100)
+            stop_loss_price = entry_price * (1 - stop_loss_pct / 100)
+            take_profit_price = entry_price * (1 + take_profit_pct / 100)
         else:
-            stop_loss_price = current_price * (1 + stop_loss_pct / 100)
-            take_profit_price = current_price * (1 - take_profit_pct / 100)
+            stop_loss_price = entry_price * (1 + stop_loss_pct / 100)
+            take_profit_price = entry_price * (1 - take_profit_pct / 100)
         
         trade_params = {
             'contracts': contracts,
             'leverage': leverage,
-            'entry_price': current_price,
+            'entry_price': entry_price,
+            'expected_slippage_pct': slippage_pct,
             'stop_loss_price': stop_loss_price,
             'take_profit_price': take_profit_price,
             'stop_loss_pct': stop_loss_pct,
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+CSV 历史K线的二进制缓存
+第一次读取时把 CSV 转成按列连续存放的二进制文件 (.bin) 和描述列名/类型/偏移的 .schema.json，
+存放在 data/csv_cache/<文件名>-<路径哈希> 下 (不进版本库)；之后直接内存映射读取，不再解析 CSV。
+CSV 的大小或修改时间变化时自动重新转换。
+
+用法:
+    python csv_binary.py convert okx_btc_perpetual_5m.csv
+    python csv_binary.py info okx_btc_perpetual_5m.csv
+
+    df = load_csv_cached('okx_btc_perpetual_5m.csv')        # DataFrame, 含 timestamp 列
+    arrays = load_csv_arrays('okx_btc_perpetual_5m.csv')    # {'timestamp': int64 毫秒, 'open': ..., ...}
+"""
+
+import os
+import json
+import hashlib
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Optional
+
+from candle_quality import dedupe_index
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+REQUIRED_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+CACHE_DIR = 'data/csv_cache'
+
+
+def _paths(csv_path: str):
+    """缓存文件路径: 文件名加上绝对路径的哈希，不同目录下的同名 CSV 互不覆盖"""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    key = hashlib.sha1(os.path.abspath(csv_path).encode()).hexdigest()[:8]
+    base = os.path.join(CACHE_DIR, f'{name}-{key}')
+    return base + '.bin', base + '.schema.json'
+
+
+def _source_info(csv_path: str) -> Dict:
+    stat = os.stat(csv_path)
+    return {'path': os.path.abspath(csv_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _parse_timestamps(df: pd.DataFrame) -> np.ndarray:
+    """优先使用 date 列，否则按数值大小判断 timestamp 列的单位 (秒/毫秒/微秒)，返回 int64 毫秒"""
+    if 'date' in df.columns:
+        parsed = pd.to_datetime(df['date'], utc=True)
+    elif 'timestamp' in df.columns:
+        values = df['timestamp']
+        if pd.api.types.is_numeric_dtype(values):
+            magnitude = float(np.nanmedian(np.abs(values.to_numpy(dtype=np.float64))))
+            unit = 'us' if magnitude > 1e14 else 'ms' if magnitude > 1e11 else 's'
+            parsed = pd.to_datetime(values, unit=unit, utc=True)
+        else:
+            parsed = pd.to_datetime(values, utc=True)
+    else:
+        raise ValueError("CSV 中没有 date 或 timestamp 列")
+    return parsed.dt.tz_localize(None).to_numpy().astype('datetime64[ms]').astype(np.int64)
+
+
+def convert_csv(csv_path: str) -> Dict:
+    """把 CSV 转换为二进制缓存，返回 schema"""
+    source = _source_info(csv_path)
+    df = pd.read_csv(csv_path)
+    for col in REQUIRED_COLUMNS:
+        if col not in df.columns:
+            raise ValueError(f"缺少必要列: {col}")
+
+    timestamps = _parse_timestamps(df)
+    # 排序并去掉重复时间戳 (保留后出现的一行)
+    order = dedupe_index(timestamps)
+    if len(order) < len(timestamps):
+        logger.warning(f"{csv_path} 有 {len(timestamps) - len(order)} 行重复时间戳，已去重")
+    columns = {'timestamp': timestamps[order]}
+    for col in df.columns:
+        if col in ('date', 'timestamp') or not pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        columns[col] = df[col].to_numpy(dtype=np.float64)[order]
+
+    bin_path, schema_path = _paths(csv_path)
+    os.makedirs(os.path.dirname(bin_path), exist_ok=True)
+    schema = {'version': SCHEMA_VERSION, 'rows': len(order), 'columns': [],
+              'source': source, 'created': datetime.now().isoformat()}
+    offset = 0
+    tmp_bin = bin_path + '.tmp'
+    with open(tmp_bin, 'wb') as f:
+        for name, values in columns.items():
+            values = np.ascontiguousarray(values)
+            f.write(values.tobytes())
+            schema['columns'].append({'name': name, 'dtype': values.dtype.str, 'offset': offset})
+            offset += values.nbytes
+    tmp_schema = schema_path + '.tmp'
+    with open(tmp_schema, 'w') as f:
+        json.dump(schema, f, indent=2)
+    # 先替换数据再替换 schema: schema 总是描述一个完整的数据文件
+    os.replace(tmp_bin, bin_path)
+    os.replace(tmp_schema, schema_path)
+
+    logger.info(f"已转换 {csv_path}: {schema['rows']} 行, {len(columns)} 列 → {bin_path}")
+    return schema
+
+
+def _load_schema(csv_path: str) -> Optional[Dict]:
+    bin_path, schema_path = _paths(csv_path)
+    if not os.path.exists(schema_path) or not os.path.exists(bin_path):
+        return None
+    with open(schema_path, 'r') as f:
+        return json.load(f)
+
+
+def is_stale(csv_path: str) -> bool:
+    """缓存不存在、格式过旧或 CSV 已变化"""
+    schema = _load_schema(csv_path)
+    if schema is None or schema.get('version') != SCHEMA_VERSION:
+        return True
+    source = _source_info(csv_path)
+    return source['size'] != schema['source']['size'] or source['mtime_ns'] != schema['source']['mtime_ns']
+
+
+def load_csv_arrays(csv_path: str) -> Dict[str, np.ndarray]:
+    """内存映射读取各列 (timestamp 为 int64 毫秒)，必要时先转换"""
+    schema = convert_csv(csv_path) if is_stale(csv_path) else _load_schema(csv_path)
+    bin_path, _ = _paths(csv_path)
+    rows = schema['rows']
+    arrays = {}
+    for column in schema['columns']:
+        dtype = np.dtype(column['dtype'])
+        if rows == 0:
+            arrays[column['name']] = np.empty(0, dtype=dtype)
+        else:
+            arrays[column['name']] = np.memmap(bin_path, dtype=dtype, mode='r',
+                                               offset=column['offset'], shape=(rows,))
+    return arrays
+
+
+def load_csv_cached(csv_path: str) -> pd.DataFrame:
+    """读取为 DataFrame: timestamp 列为 datetime64，其它数值列与 CSV 相同，按时间升序"""
+    arrays = load_csv_arrays(csv_path)
+    data = {'timestamp': pd.to_datetime(np.asarray(arrays.pop('timestamp')), unit='ms')}
+    data.update({name: np.asarray(values) for name, values in arrays.items()})
+    return pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CSV 历史K线二进制缓存')
+    parser.add_argument('command', choices=['convert', 'info'])
+    parser.add_argument('csv')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == 'convert':
+        convert_csv(args.csv)
+
+    schema = _load_schema(args.csv)
+    if schema is None:
+        print('尚未转换')
+        return
+    print(f"📦 {_paths(args.csv)[0]}: {schema['rows']} 行, 列: {[c['name'] for c in schema['columns']]}")
+    print(f"   {'需要重新转换 (CSV 已变化)' if is_stale(args.csv) else '与 CSV 一致'}")
+
+
+if __name__ == '__main__':
+    main()
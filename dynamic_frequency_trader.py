@@ -11,6 +11,8 @@ from datetime import datetime
 import logging
 import os
 
+from candle_resampler import ResampledCandleFeed
+
 class DynamicFrequencyTrader:
     def __init__(self):
         """初始化动态频率交易系统"""
@@ -32,6 +34,8 @@ class DynamicFrequencyTrader:
         })
         
         self.symbol = 'BTC/USDT:USDT'
+        # 只拉取1分钟K线，本地合成5m/15m并原地更新未收盘K线
+        self.candles = ResampledCandleFeed(self.exchange, self.symbol, {'15m': 100, '5m': 50, '1m': 30})
         self.contract_multiplier = 0.01
         
         # 🎯 动态频率参数
@@ -189,13 +193,10 @@ class DynamicFrequencyTrader:
         """分析市场"""
         try:
             # 获取多种时间框架数据
-            ohlcv_15m = self.exchange.fetch_ohlcv(self.symbol, '15m', limit=100)
-            ohlcv_5m = self.exchange.fetch_ohlcv(self.symbol, '5m', limit=50)
-            ohlcv_1m = self.exchange.fetch_ohlcv(self.symbol, '1m', limit=30)  # 用于计算短期变化
-            
-            closes_15m = np.array([c[4] for c in ohlcv_15m])
-            closes_5m = np.array([c[4] for c in ohlcv_5m])
-            closes_1m = np.array([c[4] for c in ohlcv_1m])
+            candles = self.candles.refresh_all()
+            closes_15m = candles['15m'].closes
+            closes_5m = candles['5m'].closes
+            closes_1m = candles['1m'].closes  # 用于计算短期变化
             
             current_price = closes_15m[-1]
             
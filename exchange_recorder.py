@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+交易所请求录制与回放
+录制: 每次 REST 调用的方法、参数、返回值 (或异常)、时间戳和实测延迟追加写入 gzip 压缩的 JSON 行文件
+回放: 按录制顺序返回同样的结果，时钟也回到录制时的时间，同一份输入可以反复跑、对比不同循环实现
+报告: 按接口统计调用次数和延迟分布，找出每轮耗时花在哪里
+
+用法:
+    python exchange_recorder.py record logs/session.jsonl.gz ultra_fast_trader.UltraFastTrader
+    python exchange_recorder.py replay logs/session.jsonl.gz ultra_fast_trader.UltraFastTrader
+    python exchange_recorder.py report logs/session.jsonl.gz
+"""
+
+import gzip
+import json
+import time
+import atexit
+import logging
+import argparse
+import importlib
+import threading
+import contextlib
+import numpy as np
+from collections import defaultdict, deque
+from typing import Dict, List
+
+from market_data_hub import hub_disabled
+
+logger = logging.getLogger(__name__)
+
+_real_sleep = time.sleep
+
+# 会发出网络请求、需要录制/回放的方法名前缀
+REQUEST_PREFIXES = ('fetch_', 'create_', 'cancel_', 'edit_', 'set_', 'load_markets')
+
+
+class ReplayFinished(KeyboardInterrupt):
+    """录制的请求已全部回放
+
+    继承 KeyboardInterrupt，交易器主循环中已有的"用户中断"处理会让它正常退出。
+    """
+
+
+def _key(method: str, args, kwargs) -> str:
+    return json.dumps([method, list(args), sorted(kwargs.items())], default=str)
+
+
+class RecordingExchange:
+    """把每次调用写入录制文件的 ccxt 客户端包装，调用本身原样转发
+
+    用法:
+        exchange = RecordingExchange(ccxt.okx({...}), 'logs/session.jsonl.gz')
+    """
+
+    _OWN = {'_exchange', '_file', '_lock', '_seq', '_pending', 'path'}
+    FLUSH_EVERY = 50
+
+    def __init__(self, exchange, path: str):
+        self._exchange = exchange
+        self.path = path
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._pending = 0
+        atexit.register(self.close_recording)
+
+    def __getattr__(self, name):
+        if name in self._OWN:
+            raise AttributeError(name)
+        attr = getattr(self._exchange, name)
+        if name.startswith(REQUEST_PREFIXES) and callable(attr):
+            return lambda *args, **kwargs: self._recorded_call(name, attr, args, kwargs)
+        return attr
+
+    def __setattr__(self, name, value):
+        if name in self._OWN:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._exchange, name, value)
+
+    def _recorded_call(self, name, method, args, kwargs):
+        ts = time.time()
+        start = time.perf_counter()
+        entry = {'method': name, 'args': list(args), 'kwargs': kwargs, 'ts': ts}
+        try:
+            entry['result'] = method(*args, **kwargs)
+        except Exception as e:
+            entry['error'] = {'type': type(e).__name__, 'message': str(e)}
+            entry['latency'] = time.perf_counter() - start
+            self._write(entry)
+            raise
+        entry['latency'] = time.perf_counter() - start
+        self._write(entry)
+        return entry['result']
+
+    def _write(self, entry: Dict) -> None:
+        with self._lock:
+            entry['seq'] = self._seq
+            self._seq += 1
+            self._file.write(json.dumps(entry, default=str) + '\n')
+            self._pending += 1
+            if self._pending >= self.FLUSH_EVERY:
+                self._file.flush()
+                self._pending = 0
+
+    def close_recording(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def load_recording(path: str) -> List[Dict]:
+    """读取录制文件，容忍进程被杀时最后一行写了一半"""
+    entries = []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                entries.append(json.loads(line))
+        except (EOFError, ValueError) as e:
+            logger.warning(f"录制文件末尾不完整，已读取{len(entries)}条: {e}")
+    return entries
+
+
+class ReplayExchange:
+    """按录制顺序返回结果的离线交易所
+
+    先按 (方法, 参数) 精确匹配下一条未使用的记录，找不到时使用该方法的下一条记录，
+    因此调用参数略有不同的另一种实现也能回放同一段行情。
+    clock 跟随当前回放记录的时间戳，配合 replaying() 让 time.time() 与录制时一致。
+    market()/markets/options 等不发请求的属性转给一个离线的 ccxt.okx 实例，
+    回放到 load_markets 时把录制的市场信息装入该实例。
+    """
+
+    def __init__(self, path: str, simulate_latency: bool = False):
+        self.entries = load_recording(path)
+        self.simulate_latency = simulate_latency
+        self._by_key: Dict[str, deque] = defaultdict(deque)
+        self._by_method: Dict[str, deque] = defaultdict(deque)
+        for entry in self.entries:
+            self._by_key[_key(entry['method'], entry['args'], entry['kwargs'])].append(entry)
+            self._by_method[entry['method']].append(entry)
+        self._used = set()
+        self.clock = self.entries[0]['ts'] if self.entries else time.time()
+        self.stats = {'exact': 0, 'fallback': 0}
+        self._offline = _offline_exchange()
+        self.enableRateLimit = False
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name in self._by_method:
+            return lambda *args, **kwargs: self._replay(name, args, kwargs)
+        if name.startswith(REQUEST_PREFIXES) or self._offline is None:
+            raise AttributeError(f"录制文件中没有 {name} 的调用")
+        return getattr(self._offline, name)
+
+    def _next(self, queue: deque):
+        while queue and queue[0]['seq'] in self._used:
+            queue.popleft()
+        return queue.popleft() if queue else None
+
+    def _replay(self, name, args, kwargs):
+        entry = self._next(self._by_key[_key(name, args, kwargs)])
+        if entry is not None:
+            self.stats['exact'] += 1
+        else:
+            entry = self._next(self._by_method[name])
+            if entry is None:
+                raise ReplayFinished(f"{name} 的录制记录已用完")
+            self.stats['fallback'] += 1
+        self._used.add(entry['seq'])
+
+        self.clock = entry['ts'] + entry['latency']
+        if self.simulate_latency:
+            _real_sleep(entry['latency'])
+        if 'error' in entry:
+            raise _exception_class(entry['error']['type'])(entry['error']['message'])
+        if name == 'load_markets' and self._offline is not None and entry['result']:
+            self._offline.set_markets(entry['result'])
+        return entry['result']
+
+    def time(self) -> float:
+        return self.clock
+
+    def milliseconds(self) -> int:
+        return int(self.clock * 1000)
+
+    def close(self):
+        pass
+
+
+def _offline_exchange():
+    """不带密钥、不发请求的 ccxt.okx 实例 (只用于 market()/markets 等本地属性)"""
+    try:
+        import ccxt
+        return ccxt.okx({'enableRateLimit': False, 'options': {'defaultType': 'swap'}})
+    except ImportError:
+        return None
+
+
+def _exception_class(name: str):
+    try:
+        import ccxt
+        return getattr(ccxt, name, Exception)
+    except ImportError:
+        return Exception
+
+
+@contextlib.contextmanager
+def recording(path: str):
+    """在上下文中创建的 ccxt.okx 客户端都会被录制 (create_exchange 不走数据中心，请求都经过录制)"""
+    import ccxt
+
+    original = ccxt.okx
+    ccxt.okx = lambda *args, **kwargs: RecordingExchange(original(*args, **kwargs), path)
+    try:
+        with hub_disabled():
+            yield
+    finally:
+        ccxt.okx = original
+
+
+@contextlib.contextmanager
+def replaying(replay: ReplayExchange):
+    """在上下文中把 ccxt.okx 换成回放交易所，time.time/time.monotonic 跟随录制时间，time.sleep 不再等待
+
+    monotonic 也要跟随录制时间，否则 CachedExchange 的 TTL 按真实时间计算，
+    几毫秒跑完的回放里重复请求都会命中缓存，消耗的录制记录比录制时少。
+    数据中心在线时也不连接它，否则请求绕过回放交易所。
+    """
+    import ccxt
+
+    originals = (ccxt.okx, time.time, time.monotonic, time.sleep)
+    ccxt.okx = lambda *args, **kwargs: replay
+    time.time = replay.time
+    time.monotonic = replay.time
+    time.sleep = lambda seconds: None
+    try:
+        with hub_disabled():
+            yield replay
+    finally:
+        ccxt.okx, time.time, time.monotonic, time.sleep = originals
+
+
+def latency_report(entries: List[Dict]) -> Dict[str, Dict]:
+    """按接口统计延迟 (秒): 次数、合计、占比、均值、p50、p95、最大值、失败次数"""
+    by_method = defaultdict(list)
+    errors = defaultdict(int)
+    for entry in entries:
+        by_method[entry['method']].append(entry['latency'])
+        if 'error' in entry:
+            errors[entry['method']] += 1
+
+    grand_total = sum(sum(v) for v in by_method.values()) or 1.0
+    report = {}
+    for method, latencies in by_method.items():
+        arr = np.asarray(latencies)
+        report[method] = {
+            'count': len(arr),
+            'total': float(arr.sum()),
+            'share': float(arr.sum() / grand_total),
+            'mean': float(arr.mean()),
+            'p50': float(np.percentile(arr, 50)),
+            'p95': float(np.percentile(arr, 95)),
+            'max': float(arr.max()),
+            'errors': errors[method],
+        }
+    return dict(sorted(report.items(), key=lambda item: -item[1]['total']))
+
+
+def _run_trader(target: str, method: str = 'run') -> None:
+    module_name, class_name = target.rsplit('.', 1)
+    trader = getattr(importlib.import_module(module_name), class_name)()
+    try:
+        getattr(trader, method)()
+    except ReplayFinished as e:
+        logger.info(f"回放结束: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='交易所请求录制与回放')
+    parser.add_argument('command', choices=['record', 'replay', 'report'])
+    parser.add_argument('path', help='录制文件 (.jsonl.gz)')
+    parser.add_argument('trader', nargs='?', help='交易器类, 例如 ultra_fast_trader.UltraFastTrader')
+    parser.add_argument('--method', default='run')
+    parser.add_argument('--latency', action='store_true', help='回放时按录制的延迟真实等待')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command in ('record', 'replay') and not args.trader:
+        parser.error(f'{args.command} 需要指定交易器类')
+
+    if args.command == 'record':
+        with recording(args.path):
+            _run_trader(args.trader, args.method)
+        return
+
+    if args.command == 'replay':
+        replay = ReplayExchange(args.path, simulate_latency=args.latency)
+        wall_start = time.perf_counter()
+        with replaying(replay):
+            _run_trader(args.trader, args.method)
+        print(f"\n⏱️  回放耗时 {time.perf_counter() - wall_start:.2f}秒, "
+              f"精确匹配 {replay.stats['exact']} 次, 按方法匹配 {replay.stats['fallback']} 次")
+        return
+
+    entries = load_recording(args.path)
+    if not entries:
+        print('录制文件为空')
+        return
+    span = entries[-1]['ts'] - entries[0]['ts']
+    print(f"📼 {args.path}: {len(entries)} 次请求, 时长 {span / 60:.1f} 分钟")
+    print(f"{'接口':<26}{'次数':>6}{'合计(s)':>10}{'占比':>8}{'均值(ms)':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'最大(ms)':>10}{'失败':>6}")
+    for method, row in latency_report(entries).items():
+        print(f"{method:<26}{row['count']:>6}{row['total']:>10.2f}{row['share']:>8.1%}"
+              f"{row['mean'] * 1000:>10.1f}{row['p50'] * 1000:>10.1f}{row['p95'] * 1000:>10.1f}"
+              f"{row['max'] * 1000:>10.1f}{row['errors']:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,11 +8,17 @@
 import ccxt
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 import json
 import logging
 from typing import Dict, List, Tuple, Optional
 
+from candle_buffer import timeframe_to_ms
+from candle_resampler import resample_ohlcv
+from candle_store import CandleStore
+from indicators import add_indicators
+from markets_cache import load_markets_cached
+from timeframe_align import TimeframeAlignment
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -83,7 +89,9 @@ class HighLeverageStrategy:
             'proxies': self.config['exchange']['proxies'],
             'options': {'defaultType': 'swap'}
         }
-        return ccxt.okx(exchange_config)
+        exchange = ccxt.okx(exchange_config)
+        load_markets_cached(exchange)
+        return exchange
     
     def fetch_multi_timeframe_data(self, symbol: str, days: int = 30) -> Dict[str, pd.DataFrame]:
         """获取多时间框架数据"""
@@ -92,88 +100,48 @@ class HighLeverageStrategy:
         timeframes = self.config['strategy']['timeframes']
         data = {}
         
+        # 只下载最小周期，其它周期在本地合成
+        base_tf = min(timeframes, key=timeframe_to_ms)
+        base_df = CandleStore().sync_dataframe(self.exchange, symbol, base_tf, days)
+        if base_df.empty:
+            return data
+        all_ohlcv = np.column_stack([base_df.index.values.astype('datetime64[ms]').astype(np.int64),
+                                     base_df[['open', 'high', 'low', 'close', 'volume']].to_numpy()])
+        
         for tf in timeframes:
-            all_ohlcv = []
-            end_time = datetime.now()
-            start_time = end_time - timedelta(days=days)
-            current = start_time
-            
-            while current < end_time:
-                try:
-                    since = int(current.timestamp() * 1000)
-                    ohlcv = self.exchange.fetch_ohlcv(symbol, tf, since=since, limit=1000)
-                    
-                    if not ohlcv:
-                        break
-                    
-                    all_ohlcv.extend(ohlcv)
-                    current = datetime.fromtimestamp(ohlcv[-1][0] / 1000)
-                    
-                except Exception as e:
-                    logger.error(f"获取{tf}数据失败: {e}")
-                    break
-            
-            if all_ohlcv:
-                df = pd.DataFrame(all_ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df.set_index('timestamp', inplace=True)
-                data[tf] = df
-                logger.info(f"  {tf}: {len(df)} 根K线")
+            ohlcv = resample_ohlcv(all_ohlcv, tf)
+            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            df.set_index('timestamp', inplace=True)
+            data[tf] = df
+            logger.info(f"  {tf}: {len(df)} 根K线")
         
         return data
     
     def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """计算技术指标"""
-        # 移动平均线
-        df['ema_20'] = df['close'].ewm(span=20).mean()
-        df['ema_50'] = df['close'].ewm(span=50).mean()
-        df['ema_100'] = df['close'].ewm(span=100).mean()
-        
-        # RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-        
-        # MACD
-        exp1 = df['close'].ewm(span=12).mean()
-        exp2 = df['close'].ewm(span=26).mean()
-        df['macd'] = exp1 - exp2
-        df['macd_signal'] = df['macd'].ewm(span=9).mean()
-        df['macd_hist'] = df['macd'] - df['macd_signal']
-        
-        # 布林带
-        df['bb_middle'] = df['close'].rolling(window=20).mean()
-        bb_std = df['close'].rolling(window=20).std()
-        df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-        df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
-        df['bb_width'] = (df['bb_upper'] - df['bb_lower']) / df['bb_middle']
-        
-        # 成交量指标
-        df['volume_sma'] = df['volume'].rolling(window=20).mean()
-        df['volume_ratio'] = df['volume'] / df['volume_sma']
-        
-        # ATR (波动率)
-        high_low = df['high'] - df['low']
-        high_close = np.abs(df['high'] - df['close'].shift())
-        low_close = np.abs(df['low'] - df['close'].shift())
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        true_range = ranges.max(axis=1)
-        df['atr'] = true_range.rolling(window=14).mean()
-        df['atr_percent'] = df['atr'] / df['close']
-        
-        return df
+        """计算技术指标 (EMA 20/50/100、RSI、MACD、布林带、成交量、ATR)"""
+        return add_indicators(df)
+    
+    def align_timeframes(self, df_15m: pd.DataFrame, df_1h: pd.DataFrame,
+                         df_4h: pd.DataFrame) -> TimeframeAlignment:
+        """15分钟K线到1小时/4小时K线的 as-of 对齐 (只看已收盘的高周期K线)"""
+        alignment = TimeframeAlignment.from_frame(df_15m, '15m')
+        alignment.add('1h', df_1h, '1h')
+        alignment.add('4h', df_4h, '4h')
+        return alignment
     
     def calculate_leverage(self, df_15m: pd.DataFrame, df_1h: pd.DataFrame, 
-                          df_4h: pd.DataFrame, current_idx: int) -> int:
+                          df_4h: pd.DataFrame, current_idx: int,
+                          alignment: Optional[TimeframeAlignment] = None) -> int:
         """计算动态杠杆"""
         base_leverage = self.config['trading']['leverage']['default']
         max_leverage = self.config['trading']['leverage']['max']
         
+        if alignment is None:
+            alignment = self.align_timeframes(df_15m, df_1h, df_4h)
         current_15m = df_15m.iloc[current_idx]
-        current_1h = df_1h.iloc[-1] if len(df_1h) > 0 else None
-        current_4h = df_4h.iloc[-1] if len(df_4h) > 0 else None
+        current_1h = alignment.row('1h', current_idx)
+        current_4h = alignment.row('4h', current_idx)
         
         leverage = base_leverage
         
@@ -211,13 +179,16 @@ class HighLeverageStrategy:
         return leverage
     
     def check_entry_conditions(self, df_15m: pd.DataFrame, df_1h: pd.DataFrame, 
-                              df_4h: pd.DataFrame, current_idx: int) -> Tuple[Optional[str], float, str]:
-        """检查入场条件（必须全部满足）"""
+                              df_4h: pd.DataFrame, current_idx: int,
+                              alignment: Optional[TimeframeAlignment] = None) -> Tuple[Optional[str], float, str]:
+        """检查入场条件（必须全部满足），高周期只取当时已收盘的K线"""
         conditions = []
+        if alignment is None:
+            alignment = self.align_timeframes(df_15m, df_1h, df_4h)
         current_15m = df_15m.iloc[current_idx]
         prev_15m = df_15m.iloc[current_idx-1] if current_idx > 0 else None
-        current_1h = df_1h.iloc[-1] if len(df_1h) > 0 else None
-        current_4h = df_4h.iloc[-1] if len(df_4h) > 0 else None
+        current_1h = alignment.row('1h', current_idx)
+        current_4h = alignment.row('4h', current_idx)
         
         if prev_15m is None:
             return None, 0, "数据不足"
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+并行历史K线下载器
+把时间范围切成互不重叠的窗口，多线程并发下载，所有线程共享一个令牌桶限速，
+结果按时间顺序合并；每个窗口完成后立即回调落盘，失败后重跑只会下载未完成的窗口
+"""
+
+import time
+import logging
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+
+from candle_buffer import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """线程安全的令牌桶限速器"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """取出令牌，不足时阻塞等待，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+# OKX 历史K线接口限速 20次/2秒，同一进程内所有下载共享这一个令牌桶
+OKX_HISTORY_BUCKET = TokenBucket(rate=10, capacity=10)
+
+
+class ParallelCandleDownloader:
+    """按窗口并发下载K线
+
+    用法:
+        downloader = ParallelCandleDownloader(exchange)
+        ohlcv = downloader.download('BTC/USDT:USDT', '1m', start_ms, end_ms)
+    """
+
+    def __init__(self, exchange, bucket: TokenBucket = OKX_HISTORY_BUCKET,
+                 max_workers: int = 8, limit: int = 100, max_retries: int = 3):
+        self.exchange = exchange
+        self.bucket = bucket
+        self.max_workers = max_workers
+        self.limit = limit
+        self.max_retries = max_retries
+        self.stats = {'requests': 0, 'retries': 0, 'throttle_wait': 0.0}
+        self._stats_lock = threading.Lock()
+
+    def split_windows(self, timeframe: str, start_ms: int, end_ms: int) -> List[Tuple[int, int]]:
+        """按每次请求的K线数量把 [start_ms, end_ms) 切成窗口"""
+        tf_ms = timeframe_to_ms(timeframe)
+        step = tf_ms * self.limit
+        start_ms = start_ms // tf_ms * tf_ms
+        return [(s, min(s + step, end_ms)) for s in range(start_ms, end_ms, step)]
+
+    def _fetch(self, symbol: str, timeframe: str, since: int) -> list:
+        waited = self.bucket.acquire()
+        with self._stats_lock:
+            self.stats['requests'] += 1
+            self.stats['throttle_wait'] += waited
+        return self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=self.limit)
+
+    def _download_window(self, symbol: str, timeframe: str, window: Tuple[int, int]) -> list:
+        """下载单个窗口，交易所返回不足时在窗口内继续翻页"""
+        tf_ms = timeframe_to_ms(timeframe)
+        window_start, window_end = window
+        candles = []
+        since = window_start
+        attempt = 0
+        while since < window_end:
+            try:
+                ohlcv = self._fetch(symbol, timeframe, since)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                with self._stats_lock:
+                    self.stats['retries'] += 1
+                logger.warning(f"窗口 {window_start} 第{attempt}次重试: {e}")
+                time.sleep(min(2 ** attempt, 10))
+                continue
+            if not ohlcv:
+                break
+            candles.extend(c for c in ohlcv if window_start <= c[0] < window_end)
+            next_since = ohlcv[-1][0] + tf_ms
+            if next_since <= since:
+                break
+            since = next_since
+        return candles
+
+    def download(self, symbol: str, timeframe: str, start_ms: int, end_ms: int,
+                 on_window: Optional[Callable[[Tuple[int, int], list], None]] = None) -> np.ndarray:
+        """并发下载并按时间顺序合并，返回 (N, 6) 数组
+
+        on_window 在主线程中按完成顺序调用，可用于逐窗口落盘 (断点续传)。
+        有窗口最终失败时，其余窗口照常完成并回调，最后抛出第一个异常。
+        """
+        windows = self.split_windows(timeframe, start_ms, end_ms)
+        if not windows:
+            return np.empty((0, 6), dtype=np.float64)
+
+        # 由令牌桶统一限速，避免 ccxt 在每个线程里各自 sleep
+        rate_limit_enabled = getattr(self.exchange, 'enableRateLimit', False)
+        self.exchange.enableRateLimit = False
+        results = {}
+        errors = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {pool.submit(self._download_window, symbol, timeframe, w): w for w in windows}
+                for future in as_completed(futures):
+                    window = futures[future]
+                    try:
+                        candles = future.result()
+                    except Exception as e:
+                        logger.error(f"窗口 {window} 下载失败: {e}")
+                        errors.append(e)
+                        continue
+                    results[window] = candles
+                    if on_window is not None and candles:
+                        on_window(window, candles)
+        finally:
+            self.exchange.enableRateLimit = rate_limit_enabled
+
+        logger.info(f"下载 {symbol} {timeframe}: {len(results)}/{len(windows)} 个窗口, "
+                    f"{self.stats['requests']} 次请求")
+        if errors:
+            raise errors[0]
+
+        merged = [c for w in sorted(results) for c in results[w]]
+        if not merged:
+            return np.empty((0, 6), dtype=np.float64)
+        return np.asarray(merged, dtype=np.float64)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+指标结果的磁盘缓存
+回测脚本每次运行都对同一段K线、同一组参数从头计算全部指标。这里把 compute_indicators 的结果
+按列存成可内存映射的二进制文件 (data/indicators/<键>/<列名>.bin + meta.json):
+    键 = hash(指标名, 参数, 指标代码版本, 第一根K线)
+    meta.json 记录已缓存的行数和每 4096 行K线数据的摘要
+再次运行时逐块比对摘要，找出与缓存一致的最长前缀:
+    数据和参数都没变   直接映射读取，不做任何计算
+    K线往后增加了      只计算新增的尾部 (EMA 从缓存的最后一个值接着递推)，追加写入
+    中间的数据变了     从变化的那一块开始重算
+indicators.py 的内容变化时代码版本随之变化，旧缓存自动失效。
+
+用法:
+    python indicator_cache.py info
+    python indicator_cache.py clear
+
+    values = cached_indicators(df, ema_periods=(20, 50))     # {列名: 只读数组}
+    df = add_indicators_cached(df)                            # 与 indicators.add_indicators 相同
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+import indicators
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = 'data/indicators'
+DIGEST_ROWS = 4096
+NAME = 'compute_indicators'
+
+
+def _code_version() -> str:
+    with open(indicators.__file__, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+
+
+CODE_VERSION = _code_version()
+
+
+def _candle_matrix(df: pd.DataFrame) -> np.ndarray:
+    """用于比对的K线数据: [时间戳(若有), open, high, low, close, volume]，每行连续存放"""
+    columns = []
+    timestamps = df['timestamp'] if 'timestamp' in df.columns else \
+        df.index if isinstance(df.index, pd.DatetimeIndex) else None
+    if timestamps is not None:
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps)
+        columns.append(np.asarray(timestamps, dtype='datetime64[ms]').astype(np.float64))
+    for col in ('open', 'high', 'low', 'close', 'volume'):
+        if col in df.columns:
+            columns.append(df[col].to_numpy(dtype=np.float64))
+    return np.ascontiguousarray(np.column_stack(columns))
+
+
+def _block_digests(candles: np.ndarray, rows: Optional[int] = None) -> List[str]:
+    """每 DIGEST_ROWS 行一个摘要 (最后一块可能不满)"""
+    rows = len(candles) if rows is None else rows
+    return [hashlib.sha256(candles[start:min(start + DIGEST_ROWS, rows)]).hexdigest()[:32]
+            for start in range(0, rows, DIGEST_ROWS)]
+
+
+def _params_key(params: Dict) -> Dict:
+    return {k: list(v) if isinstance(v, (tuple, list)) else v for k, v in sorted(params.items())}
+
+
+class IndicatorCache:
+    """compute_indicators 结果的列式磁盘缓存，支持尾部增量计算"""
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+        self.stats = {'hits': 0, 'extended': 0, 'rebuilt': 0, 'rows_reused': 0, 'rows_computed': 0}
+
+    def _directory(self, candles: np.ndarray, params: Dict) -> str:
+        key = json.dumps({'name': NAME, 'params': _params_key(params), 'code': CODE_VERSION,
+                          'first': candles[0].tolist(), 'width': candles.shape[1]}, sort_keys=True)
+        return os.path.join(self.root, hashlib.blake2b(key.encode(), digest_size=12).hexdigest())
+
+    @staticmethod
+    def _load_meta(directory: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(directory, 'meta.json'), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _matched_rows(meta: Dict, candles: np.ndarray) -> int:
+        """与缓存一致的最长前缀行数 (按块比对摘要，长度不同的块摘要也不同)"""
+        rows = min(meta['rows'], len(candles))
+        for i, (old, new) in enumerate(zip(meta['digests'], _block_digests(candles, rows))):
+            if old != new:
+                return i * DIGEST_ROWS
+        return rows
+
+    @staticmethod
+    def _map(directory: str, meta: Dict, rows: int) -> Dict[str, np.ndarray]:
+        if rows == 0:
+            return {name: np.empty(0) for name in meta['columns']}
+        return {name: np.memmap(os.path.join(directory, f'{name}.bin'), dtype=np.float64, mode='r', shape=(rows,))
+                for name in meta['columns']}
+
+    def _write(self, directory: str, columns: Dict[str, np.ndarray], start: int,
+               candles: np.ndarray, params: Dict) -> Dict:
+        """写入第 start 行起的列数据，再原子替换 meta.json
+
+        文件正好有 start 行时直接追加；否则连同保留的前 start 行写成新文件再替换，
+        已经映射旧文件的数组不受影响。
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name, values in columns.items():
+            path = os.path.join(directory, f'{name}.bin')
+            values = np.ascontiguousarray(values, dtype=np.float64)
+            if os.path.exists(path) and os.path.getsize(path) == start * 8:
+                with open(path, 'ab') as f:
+                    f.write(values.tobytes())
+                continue
+            prefix = np.fromfile(path, dtype=np.float64, count=start) if start else np.empty(0)
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(prefix.tobytes())
+                f.write(values.tobytes())
+            os.replace(tmp, path)
+        meta = {'name': NAME, 'params': _params_key(params), 'code': CODE_VERSION, 'rows': len(candles),
+                'columns': list(columns), 'digests': _block_digests(candles)}
+        tmp = os.path.join(directory, f'meta.json.{os.getpid()}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(directory, 'meta.json'))
+        return meta
+
+    def compute(self, df: pd.DataFrame, **params) -> Dict[str, np.ndarray]:
+        """与 indicators.compute_indicators(df 各列, **params) 结果相同，返回只读的内存映射数组
+
+        K线为空时不使用缓存。
+        """
+        params.pop('dtype', None)
+        candles = _candle_matrix(df)
+        if len(candles) == 0:
+            return indicators.compute_indicators(df['close'], df.get('high'), df.get('low'), df.get('volume'),
+                                                 **params)
+        directory = self._directory(candles, params)
+        meta = self._load_meta(directory)
+        matched = self._matched_rows(meta, candles) if meta else 0
+
+        if meta and matched == len(candles) == meta['rows']:
+            self.stats['hits'] += 1
+            self.stats['rows_reused'] += matched
+            return self._public(self._map(directory, meta, matched))
+
+        previous = self._map(directory, meta, matched) if matched else None
+        tail = indicators.compute_indicators(df['close'], df.get('high'), df.get('low'), df.get('volume'),
+                                             keep_state=True, previous=previous, **params)
+        if matched:
+            self.stats['extended'] += 1
+            logger.info(f"指标缓存: 复用 {matched} 行，计算新增 {len(tail['rsi'])} 行")
+        else:
+            self.stats['rebuilt'] += 1
+        self.stats['rows_reused'] += matched
+        self.stats['rows_computed'] += len(candles) - matched
+        meta = self._write(directory, tail, matched, candles, params)
+        return self._public(self._map(directory, meta, len(candles)))
+
+    @staticmethod
+    def _public(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        return {name: values for name, values in columns.items() if name not in indicators.STATE_COLUMNS}
+
+    def entries(self) -> List[Dict]:
+        result = []
+        if not os.path.isdir(self.root):
+            return result
+        for name in sorted(os.listdir(self.root)):
+            directory = os.path.join(self.root, name)
+            meta = self._load_meta(directory)
+            if meta is None:
+                continue
+            size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+            result.append({'key': name, 'rows': meta['rows'], 'columns': len(meta['columns']),
+                           'params': meta['params'], 'current': meta['code'] == CODE_VERSION, 'bytes': size})
+        return result
+
+    def clear(self) -> None:
+        if os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+
+
+_default_cache = IndicatorCache()
+
+
+def cached_indicators(df: pd.DataFrame, cache: Optional[IndicatorCache] = None, **params) -> Dict[str, np.ndarray]:
+    """compute_indicators 的缓存版本，默认缓存在 data/indicators"""
+    return (cache or _default_cache).compute(df, **params)
+
+
+def add_indicators_cached(df: pd.DataFrame, cache: Optional[IndicatorCache] = None, **params) -> pd.DataFrame:
+    """indicators.add_indicators 的缓存版本 (列数据从映射中拷贝出来)"""
+    for name, values in cached_indicators(df, cache, **params).items():
+        df[name] = np.array(values)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='指标磁盘缓存')
+    parser.add_argument('command', choices=['info', 'clear'])
+    parser.add_argument('--root', default=DEFAULT_ROOT)
+    args = parser.parse_args()
+
+    cache = IndicatorCache(args.root)
+    if args.command == 'clear':
+        cache.clear()
+        print(f"🧹 已清空 {args.root}")
+        return
+
+    entries = cache.entries()
+    print(f"📦 {args.root}: {len(entries)} 组缓存, 代码版本 {CODE_VERSION}")
+    for e in entries:
+        state = '' if e['current'] else ' (代码已更新，下次使用时重算)'
+        print(f"   {e['key']}  {e['rows']}行 × {e['columns']}列  {e['bytes'] / 1e6:.1f}MB{state}")
+        print(f"      参数: {e['params']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+按K线缓存的指标备忘录 - 多周期交易程序共用
+10秒一轮的交易程序里，15分钟K线的均线/支撑阻力/波动率每根K线要重复计算约90次，
+而已收盘部分的数据完全相同。这里按 (合约, 周期, 指标, 参数) 保存已收盘K线的增量指标状态，
+状态对应的最后一根已收盘K线时间戳即缓存键的最后一项:
+    时间戳与未收盘K线都没变   直接返回上次的结果
+    时间戳没变               只用 peek 计入未收盘K线
+    有新收盘的K线            只提交新增的几根
+    首次出现或断档           从缓冲区重建
+进程内的交易程序共用 default_memo，stats 给出命中率。
+
+用法:
+    from indicator_memo import default_memo
+    from streaming_indicators import PriceStructureIndicators
+
+    prev, latest = default_memo.get('BTC/USDT:USDT', '15m', feed.buffers['15m'],
+                                    PriceStructureIndicators, sr_window=20)
+    print(default_memo.format_stats())
+"""
+
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _params_key(params: Dict) -> Tuple:
+    return tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items()))
+
+
+class _Entry:
+    __slots__ = ('indicators', 'closed_timestamp', 'forming', 'result')
+
+    def __init__(self, indicators):
+        self.indicators = indicators
+        self.closed_timestamp = None
+        self.forming = None
+        self.result = None
+
+
+class IndicatorMemo:
+    """(合约, 周期, 指标类, 参数) → 已收盘K线的增量指标状态，按最近使用淘汰"""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple, _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'lookups': 0, 'hits': 0, 'forming_only': 0, 'advanced': 0, 'misses': 0}
+
+    def get(self, symbol: str, timeframe: str, candles, factory, **params) -> Tuple[Dict, Dict]:
+        """返回 (最后一根已收盘K线的指标, 含未收盘K线的指标)
+
+        candles 为 CandleRingBuffer 或 (N, 6) 的 ccxt 格式K线 (最后一根为未收盘K线)，
+        factory 为 CandleIndicators 子类，params 为其构造参数。
+        """
+        key = (symbol, timeframe, factory.__name__, _params_key(params))
+        timestamps = candles.timestamps if hasattr(candles, 'timestamps') else \
+            np.asarray(candles, dtype=np.float64)[:, 0]
+        closed_timestamp = int(timestamps[-2]) if len(timestamps) > 1 else None
+        forming = self._forming_candle(candles)
+
+        with self._lock:
+            self.stats['lookups'] += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(factory(**params))
+                self._entries[key] = entry
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                self.stats['misses'] += 1
+            else:
+                self._entries.move_to_end(key)
+                if entry.closed_timestamp == closed_timestamp and entry.result is not None:
+                    if entry.forming == forming:
+                        self.stats['hits'] += 1
+                        return entry.result
+                    # 已收盘部分不变，只重新计入未收盘K线
+                    self.stats['forming_only'] += 1
+                    entry.forming = forming
+                    entry.result = (entry.indicators.committed, entry.indicators.peek(forming))
+                    return entry.result
+                self.stats['advanced'] += 1
+
+            if hasattr(candles, 'timestamps'):
+                entry.result = entry.indicators.sync_buffer(candles)
+            else:
+                entry.result = entry.indicators.sync(candles)
+            entry.closed_timestamp = closed_timestamp
+            entry.forming = forming
+            return entry.result
+
+    @staticmethod
+    def _forming_candle(candles) -> Tuple:
+        if hasattr(candles, 'timestamps'):
+            return (candles.timestamps[-1], candles.opens[-1], candles.highs[-1],
+                    candles.lows[-1], candles.closes[-1], candles.volumes[-1])
+        return tuple(float(v) for v in candles[-1])
+
+    def invalidate(self, symbol: Optional[str] = None) -> None:
+        """丢弃缓存 (symbol 为空时全部丢弃)"""
+        with self._lock:
+            for key in [k for k in self._entries if symbol is None or k[0] == symbol]:
+                del self._entries[key]
+
+    @property
+    def hit_rate(self) -> float:
+        """已收盘部分无需重算的比例 (完全命中 + 只重算未收盘K线)"""
+        lookups = self.stats['lookups']
+        return (self.stats['hits'] + self.stats['forming_only']) / lookups if lookups else 0.0
+
+    def format_stats(self) -> str:
+        s = self.stats
+        return (f"指标缓存: 查询{s['lookups']}次, 命中率{self.hit_rate:.1%} "
+                f"(完全命中{s['hits']}, 仅未收盘K线{s['forming_only']}, 新K线{s['advanced']}, "
+                f"重建{s['misses']}), 缓存{len(self._entries)}项")
+
+
+default_memo = IndicatorMemo()
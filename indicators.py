@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+向量化技术指标库 (纯 NumPy)
+各脚本原先各自用 pandas rolling/ewm 重复实现同一组指标，这里统一成一份:
+    - 所有函数接收一维数组 (或 Series)，可传入 out= 预分配的输出
+    - 结果与原来的 pandas 写法逐点一致 (EMA 默认 adjust=True，RSI/ATR 为简单均值，标准差 ddof=1)
+    - compute_indicators 一次分配 (指标数 × N) 的输出块，共用中间结果:
+      一次滑动均值同时用于 SMA 和布林带中轨，MACD 复用同周期的 EMA 列
+    - dtype=np.float32 时输出为 float32 (内部按块用 float64 计算)，内存减半
+    - *_grid 函数一次计算一组参数 (如 RSI 25 个周期、布林带 周期×倍数)，用于参数优化
+
+用法:
+    from indicators import add_indicators, rsi, ema, bollinger
+    df = add_indicators(df)                         # 在 DataFrame 上添加全套指标列
+    values = compute_indicators(close=c, high=h, low=l, volume=v)
+    upper, middle, lower = bollinger_grid(c, range(18, 23), [1.8, 1.9, 2.0, 2.1, 2.2])
+"""
+
+import logging
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+BLOCK = 65536   # 滑动窗口按块计算，限制临时数组的大小
+
+
+def _as_array(x) -> np.ndarray:
+    return np.asarray(getattr(x, 'values', x), dtype=np.float64)
+
+
+def _output(n: int, out: Optional[np.ndarray], dtype=np.float64) -> np.ndarray:
+    if out is None:
+        return np.empty(n, dtype=dtype)
+    if out.shape != (n,):
+        raise ValueError(f"输出数组形状应为 ({n},)，实际为 {out.shape}")
+    return out
+
+
+# ---------- 递推 ----------
+
+def _linear_recurrence(x: np.ndarray, beta: float, init: float, out: np.ndarray) -> np.ndarray:
+    """y[t] = beta·y[t-1] + x[t]，y[-1] = init
+
+    块内用 y[s+i] = beta^i·(beta·carry + Σ x[s+m]·beta^-m) 的累加和形式计算，
+    块长使 beta^-i 不超过 1e100，给 x 的量级 (成交量、成交额可达 1e9 以上) 留足余量不溢出，
+    块间只传递一个标量。
+    """
+    n = len(x)
+    if n == 0:
+        return out
+    if beta <= 0:
+        out[:] = x
+        return out
+    block = n if beta >= 1 else max(1, min(n, int(100 / -np.log10(beta))))
+    powers = beta ** np.arange(block, dtype=np.float64)
+    inverse = 1.0 / powers
+    carry = init
+    for start in range(0, n, block):
+        chunk = x[start:start + block]
+        m = len(chunk)
+        y = powers[:m] * (np.cumsum(chunk * inverse[:m]) + beta * carry)
+        out[start:start + m] = y
+        carry = y[-1]
+    return out
+
+
+def ema(x, span: Optional[float] = None, alpha: Optional[float] = None,
+        adjust: bool = True, out: Optional[np.ndarray] = None,
+        prev: Optional[float] = None, start: int = 0) -> np.ndarray:
+    """指数移动平均，与 pandas ewm(span=..., adjust=...).mean() 一致 (输入不含 NaN)
+
+    prev/start 用于接着已有结果往后算: prev 为前 start 个值的 EMA 最后一个值，
+    返回的是第 start 个值起的 EMA，与对完整序列计算后取尾部相同。
+    """
+    x = _as_array(x)
+    n = len(x)
+    out = _output(n, out, out.dtype if out is not None else np.float64)
+    if n == 0:
+        return out
+    if alpha is None:
+        alpha = 2.0 / (span + 1.0)
+    beta = 1.0 - alpha
+    values = np.empty(n, dtype=np.float64)
+    if adjust:
+        # 分子 Σ beta^k·x[t-k] 递推，分母为权重和 Σ beta^k = (1 - beta^(t+1)) / (1 - beta)
+        numerator = 0.0 if prev is None else prev * (1.0 - beta ** start) / alpha
+        _linear_recurrence(x, beta, numerator, values)
+        # beta^(t+1) 小于机器精度后权重和即为常数
+        head = n if beta == 0 else max(0, min(n, int(40 / -np.log10(beta)) + 1 - start))
+        values[:head] /= (1.0 - beta ** np.arange(start + 1, start + head + 1, dtype=np.float64)) / alpha
+        values[head:] *= alpha
+    else:
+        _linear_recurrence(alpha * x, beta, x[0] if prev is None else prev, values)
+    out[:] = values
+    return out
+
+
+def wilder(x, period: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Wilder 平滑 (RMA): 前 period 个值的均值作为起点，之后 avg += (x - avg)/period"""
+    x = _as_array(x)
+    n = len(x)
+    out = _output(n, out, out.dtype if out is not None else np.float64)
+    out[:min(period - 1, n)] = np.nan
+    if n < period:
+        return out
+    alpha = 1.0 / period
+    seed = x[:period].mean()
+    values = np.empty(n - period + 1, dtype=np.float64)
+    values[0] = seed
+    if n > period:
+        _linear_recurrence(alpha * x[period:], 1.0 - alpha, seed, values[1:])
+    out[period - 1:] = values
+    return out
+
+
+# ---------- 滑动窗口 ----------
+
+def rolling_mean(x, window: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """滑动均值 (前 window-1 个为 NaN)，与 rolling(window).mean() 一致"""
+    x = _as_array(x)
+    n = len(x)
+    out = _output(n, out, out.dtype if out is not None else np.float64)
+    out[:min(window - 1, n)] = np.nan
+    if n < window:
+        return out
+    # 减去首个值再累加，降低大数相减的误差
+    offset = x[0]
+    cumsum = np.empty(n + 1, dtype=np.float64)
+    cumsum[0] = 0.0
+    np.cumsum(x - offset, out=cumsum[1:])
+    out[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window + offset
+    return out
+
+
+def rolling_std(x, window: int, ddof: int = 1, mean: Optional[np.ndarray] = None,
+                out: Optional[np.ndarray] = None) -> np.ndarray:
+    """滑动标准差 (两遍法，按块计算)，mean 可传入已算好的滑动均值"""
+    x = _as_array(x)
+    n = len(x)
+    out = _output(n, out, out.dtype if out is not None else np.float64)
+    out[:min(window - 1, n)] = np.nan
+    if n < window:
+        return out
+    if mean is None:
+        mean = rolling_mean(x, window)
+    windows = np.lib.stride_tricks.sliding_window_view(x, window)
+    for start in range(0, len(windows), BLOCK):
+        chunk = windows[start:start + BLOCK]
+        m = np.asarray(mean[window - 1 + start:window - 1 + start + len(chunk)], dtype=np.float64)
+        deviation = chunk - m[:, None]
+        out[window - 1 + start:window - 1 + start + len(chunk)] = \
+            np.sqrt(np.einsum('ij,ij->i', deviation, deviation) / (window - ddof))
+    return out
+
+
+def rolling_max(x, window: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """滑动最大值 (前 window-1 个为 NaN)，与 rolling(window).max() 一致"""
+    return _rolling_extremum(x, window, np.maximum, out)
+
+
+def rolling_min(x, window: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """滑动最小值 (前 window-1 个为 NaN)，与 rolling(window).min() 一致"""
+    return _rolling_extremum(x, window, np.minimum, out)
+
+
+def rolling_extrema(x, windows: Sequence[int], mode: str = 'max') -> Dict[int, np.ndarray]:
+    """多个窗口的滑动最大值/最小值，返回 {窗口: 数组}"""
+    if mode not in ('max', 'min'):
+        raise ValueError(f"不支持的模式: {mode}")
+    x = _as_array(x)
+    ufunc = np.maximum if mode == 'max' else np.minimum
+    return {w: _rolling_extremum(x, w, ufunc, None) for w in windows}
+
+
+def _rolling_extremum(x, window: int, ufunc, out: Optional[np.ndarray]) -> np.ndarray:
+    """van Herk/Gil-Werman: 按窗口长度分块，块内前缀极值与后缀极值各一遍，
+    每个窗口的极值 = 起点的后缀极值 ∨ 终点的前缀极值，计算量与窗口长度无关"""
+    x = _as_array(x)
+    n = len(x)
+    out = _output(n, out, out.dtype if out is not None else np.float64)
+    out[:min(window - 1, n)] = np.nan
+    if n < window:
+        return out
+    blocks = -(-n // window)
+    padded = np.empty(blocks * window, dtype=np.float64)
+    padded[:n] = x
+    padded[n:] = x[-1]      # 只会出现在终点之后，不影响结果
+    padded = padded.reshape(blocks, window)
+    prefix = ufunc.accumulate(padded, axis=1).ravel()
+    suffix = ufunc.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    ufunc(suffix[:n - window + 1], prefix[window - 1:n], out=out[window - 1:])
+    return out
+
+
+# ---------- 指标 ----------
+
+def _rsi_from_averages(gain: np.ndarray, loss: np.ndarray, out: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[:] = 100.0 - 100.0 / (1.0 + gain / loss)
+    return out
+
+
+def rsi(close, period: int = 14, method: str = 'sma', delta: Optional[np.ndarray] = None,
+        out: Optional[np.ndarray] = None) -> np.ndarray:
+    """RSI，method='sma' 为涨跌幅滑动均值 (各脚本原有写法)，'wilder' 为 Wilder 平滑
+
+    delta 可传入已算好的 np.diff(close)。
+    """
+    close = _as_array(close)
+    n = len(close)
+    out = _output(n, out, out.dtype if out is not None else np.float64)
+    if n == 0:
+        return out
+    if delta is None:
+        delta = np.diff(close)
+    gains = np.maximum(delta, 0.0)
+    losses = np.maximum(-delta, 0.0)
+    if method == 'sma':
+        # 与 diff().where(d > 0, 0).rolling() 一致: 第一根K线的涨跌幅按 0 计入窗口
+        gains = np.concatenate(([0.0], gains))
+        losses = np.concatenate(([0.0], losses))
+        return _rsi_from_averages(rolling_mean(gains, period), rolling_mean(losses, period), out)
+    # Wilder: 第一根K线没有涨跌幅，按涨跌幅序列计算后右移一位
+    out[0] = np.nan
+    _rsi_from_averages(wilder(gains, period), wilder(losses, period), out[1:])
+    return out
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9,
+         adjust: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """返回 (macd, 信号线, 柱)"""
+    close = _as_array(close)
+    line = ema(close, fast, adjust=adjust) - ema(close, slow, adjust=adjust)
+    signal_line = ema(line, signal, adjust=adjust)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, window: int = 20, num_std: float = 2.0,
+              mean: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """返回 (上轨, 中轨, 下轨)，mean 可传入已算好的滑动均值"""
+    close = _as_array(close)
+    middle = rolling_mean(close, window) if mean is None else mean
+    std = rolling_std(close, window, mean=middle)
+    return middle + num_std * std, middle, middle - num_std * std
+
+
+def true_range(high, low, close, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """真实波幅，第一根为 high - low"""
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    n = len(close)
+    out = _output(n, out, out.dtype if out is not None else np.float64)
+    out[:] = high - low
+    if n > 1:
+        previous = close[:-1]
+        np.maximum(out[1:], np.abs(high[1:] - previous), out=out[1:])
+        np.maximum(out[1:], np.abs(low[1:] - previous), out=out[1:])
+    return out
+
+
+def atr(high, low, close, period: int = 14, method: str = 'sma',
+        out: Optional[np.ndarray] = None) -> np.ndarray:
+    """平均真实波幅，method='sma' 为滑动均值 (各脚本原有写法)，'wilder' 为 Wilder 平滑"""
+    tr = true_range(high, low, close)
+    average = rolling_mean if method == 'sma' else wilder
+    return average(tr, period, out=out)
+
+
+# ---------- 参数网格 ----------
+# 参数优化时对一组周期/倍数一次算完，返回 (参数数, N) 的二维数组，各参数共用同一份累加和
+
+def _window_sums(x: np.ndarray, windows: np.ndarray, squares: bool = False):
+    """各窗口长度的滑动和 (以及平方和)，形状 (窗口数, N)，窗口未满处为 NaN
+
+    按块计算累加和，所有窗口共用；每块先减去块首值，避免长序列上大数相减损失精度，
+    返回的是减去偏移量后的和: (和, 平方和 或 None, 每个位置的偏移量)。
+    """
+    n = len(x)
+    longest = int(windows.max())
+    sums = np.full((len(windows), n), np.nan)
+    sq_sums = np.full((len(windows), n), np.nan) if squares else None
+    offsets = np.empty(n)
+    for start in range(0, n, BLOCK):
+        stop = min(start + BLOCK, n)
+        first = max(0, start - longest + 1)
+        base = x[first]
+        segment = x[first:stop] - base
+        offsets[start:stop] = base
+        cumsum = np.concatenate(([0.0], np.cumsum(segment)))
+        sq_cumsum = np.concatenate(([0.0], np.cumsum(segment * segment))) if squares else None
+        for row, window in enumerate(windows):
+            begin = max(start, window - 1)   # 该窗口在本块中第一个完整的位置
+            if begin >= stop:
+                continue
+            hi = slice(begin - first + 1, stop - first + 1)
+            lo = slice(begin - first + 1 - window, stop - first + 1 - window)
+            sums[row, begin:stop] = cumsum[hi] - cumsum[lo]
+            if squares:
+                sq_sums[row, begin:stop] = sq_cumsum[hi] - sq_cumsum[lo]
+    return sums, sq_sums, offsets
+
+
+def rolling_mean_grid(x, windows: Sequence[int]) -> np.ndarray:
+    """多个窗口的滑动均值，形状 (窗口数, N)"""
+    x = _as_array(x)
+    windows = np.asarray(windows, dtype=np.int64)
+    if len(x) == 0:
+        return np.empty((len(windows), 0))
+    sums, _, offsets = _window_sums(x, windows)
+    return sums / windows[:, None] + offsets
+
+
+def rsi_grid(close, periods: Sequence[int], method: str = 'sma') -> np.ndarray:
+    """多个周期的 RSI，形状 (周期数, N)，每行与 rsi(close, period, method) 相同
+
+    method='sma' 时所有周期共用一次涨跌幅累加和；'wilder' 逐周期递推。
+    """
+    close = _as_array(close)
+    periods = np.asarray(periods, dtype=np.int64)
+    result = np.empty((len(periods), len(close)))
+    if len(close) == 0:
+        return result
+    delta = np.diff(close)
+    if method != 'sma':
+        for row, period in zip(result, periods):
+            rsi(close, int(period), method, delta=delta, out=row)
+        return result
+    # 涨跌幅都非负，整段共用一次累加和；周期相同的均值之比等于和之比
+    gain_cumsum = np.concatenate(([0.0, 0.0], np.cumsum(np.maximum(delta, 0.0))))
+    loss_cumsum = np.concatenate(([0.0, 0.0], np.cumsum(np.maximum(-delta, 0.0))))
+    n = len(close)
+    ratio = np.empty(n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for row, period in zip(result, periods):
+            period = int(period)
+            row[:period - 1] = np.nan
+            if n < period:
+                continue
+            valid = ratio[:n - period + 1]
+            np.subtract(gain_cumsum[period:], gain_cumsum[:-period], out=valid)
+            np.divide(valid, loss_cumsum[period:] - loss_cumsum[:-period], out=valid)
+            valid += 1.0
+            np.divide(-100.0, valid, out=valid)
+            np.add(valid, 100.0, out=row[period - 1:])
+    return result
+
+
+def bollinger_grid(close, windows: Sequence[int], num_stds: Sequence[float]
+                   ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """所有 (周期, 倍数) 组合的布林带
+
+    返回 (上轨, 中轨, 下轨)，上下轨形状 (周期数, 倍数数, N)，中轨形状 (周期数, N)。
+    均值和标准差 (ddof=1) 来自同一份累加和与平方累加和。
+    """
+    close = _as_array(close)
+    windows = np.asarray(windows, dtype=np.int64)
+    num_stds = np.asarray(num_stds, dtype=np.float64)
+    if len(close) == 0:
+        empty = np.empty((len(windows), len(num_stds), 0))
+        return empty, np.empty((len(windows), 0)), empty.copy()
+    sums, sq_sums, offsets = _window_sums(close, windows, squares=True)
+    w = windows[:, None].astype(np.float64)
+    centered_mean = sums / w
+    variance = (sq_sums - sums * centered_mean) / (w - 1)
+    std = np.sqrt(np.maximum(variance, 0.0))
+    middle = centered_mean + offsets
+    band = num_stds[None, :, None] * std[:, None, :]
+    return middle[:, None, :] + band, middle, middle[:, None, :] - band
+
+
+def ema_grid(x, spans: Sequence[float], adjust: bool = True) -> np.ndarray:
+    """多个周期的 EMA，形状 (周期数, N)"""
+    x = _as_array(x)
+    result = np.empty((len(spans), len(x)))
+    for row, span in zip(result, spans):
+        ema(x, span, adjust=adjust, out=row)
+    return result
+
+
+def macd_grid(close, fast_periods: Sequence[int], slow_periods: Sequence[int],
+              signal_periods: Sequence[int], adjust: bool = True):
+    """所有 fast < slow 的 (fast, slow, signal) 组合的 MACD
+
+    每个周期的 EMA 只算一次。返回 (组合列表, macd, 信号线, 柱)，数组形状 (组合数, N)。
+    """
+    close = _as_array(close)
+    spans = sorted(set(fast_periods) | set(slow_periods))
+    emas = dict(zip(spans, ema_grid(close, spans, adjust)))
+    pairs = [(f, s) for f in fast_periods for s in slow_periods if f < s]
+    lines = np.stack([emas[f] - emas[s] for f, s in pairs]) if pairs else np.empty((0, len(close)))
+    combos, line_rows = [], []
+    for g in signal_periods:
+        for i, (f, s) in enumerate(pairs):
+            combos.append((f, s, g))
+            line_rows.append(i)
+    line = lines[line_rows] if combos else np.empty((0, len(close)))
+    signal = np.empty_like(line)
+    for row, (_, _, g), i in zip(signal, combos, line_rows):
+        ema(lines[i], g, adjust=adjust, out=row)
+    return combos, line, signal, line - signal
+
+
+# ---------- 全套指标 ----------
+
+STATE_COLUMNS = ('_macd_fast', '_macd_slow')
+INDICATOR_COLUMNS = ('rsi', 'macd', 'macd_signal', 'macd_hist', 'bb_middle', 'bb_upper', 'bb_lower',
+                     'bb_width', 'volume_sma', 'volume_ratio', 'atr', 'atr_percent')
+
+
+def compute_indicators(close, high=None, low=None, volume=None,
+                       ema_periods: Sequence[int] = (20, 50, 100), rsi_period: int = 14,
+                       macd_periods: Tuple[int, int, int] = (12, 26, 9), bb_period: int = 20,
+                       bb_std: float = 2.0, atr_period: int = 14, volume_period: int = 20,
+                       sma_periods: Sequence[int] = (), macd_adjust: bool = True,
+                       dtype=np.float64, previous: Optional[Dict[str, np.ndarray]] = None,
+                       keep_state: bool = False) -> Dict[str, np.ndarray]:
+    """计算全套指标，返回 {列名: 数组}，所有数组是同一个 (指标数, N) 输出块的行视图
+
+    列名与 run_high_leverage_backtest / HighLeverageStrategy 的 calculate_indicators 相同，
+    sma_periods 另外输出 sma_<n>；没有 high/low 时不计算 ATR，没有 volume 时不计算成交量指标。
+
+    keep_state=True 时额外输出 MACD 快慢线 (_macd_fast/_macd_slow)，供下次增量计算。
+    previous 为同一组参数对这些K线前 m 根算过的结果 (keep_state=True 的输出):
+    只计算第 m 根起的部分并返回 (长度 N-m)，EMA 从上次的最后一个值接着递推，
+    滑动窗口类指标只回看最长窗口的长度，结果与整段重算相同。
+    """
+    close = _as_array(close)
+    total = len(close)
+    fast, slow, signal = macd_periods
+    done = 0 if previous is None else len(previous['macd_signal'])
+    if previous is not None:
+        missing = set(STATE_COLUMNS) - set(previous)
+        if missing:
+            raise ValueError(f"增量计算需要上次结果中的 {sorted(missing)} 列 (keep_state=True)")
+    # 滑动窗口类指标需要回看的K线数 (RSI/ATR 还要多一根前收盘价)
+    lookback = max([rsi_period + 1, bb_period, atr_period + 1, volume_period] + list(sma_periods))
+    begin = max(0, done - lookback)
+    skip = done - begin
+    n = total - done
+
+    names = [f'ema_{p}' for p in ema_periods] + [f'sma_{p}' for p in sma_periods] + \
+        ['rsi', 'macd', 'macd_signal', 'macd_hist', 'bb_middle', 'bb_upper', 'bb_lower', 'bb_width']
+    if volume is not None:
+        names += ['volume_sma', 'volume_ratio']
+    if high is not None and low is not None:
+        names += ['atr', 'atr_percent']
+    if keep_state:
+        names += list(STATE_COLUMNS)
+    block = np.empty((len(names), n), dtype=dtype)
+    result = dict(zip(names, block))
+    if n == 0:
+        return result
+
+    def last_value(name):
+        return None if previous is None else float(previous[name][-1])
+
+    tail = close[done:]
+    for period in ema_periods:
+        ema(tail, period, out=result[f'ema_{period}'], prev=last_value(f'ema_{period}'), start=done)
+    # MACD 快慢线: 与 ema_<n> 列参数相同时直接复用
+    lines = {}
+    for key, period in (('_macd_fast', fast), ('_macd_slow', slow)):
+        if macd_adjust and f'ema_{period}' in result:
+            lines[key] = result[f'ema_{period}']
+            if key in result:
+                result[key][:] = lines[key]
+        else:
+            lines[key] = ema(tail, period, adjust=macd_adjust, out=result.get(key),
+                             prev=last_value(key), start=done)
+    np.subtract(lines['_macd_fast'], lines['_macd_slow'], out=result['macd'])
+    ema(result['macd'], signal, adjust=macd_adjust, out=result['macd_signal'],
+        prev=last_value('macd_signal'), start=done)
+    np.subtract(result['macd'], result['macd_signal'], out=result['macd_hist'])
+
+    # 以下均为滑动窗口，在回看区间上计算后取尾部
+    window_close = close[begin:]
+    rsi_values = rsi(window_close, rsi_period)
+    result['rsi'][:] = rsi_values[skip:]
+
+    # 一次滑动均值同时作为布林带中轨和同周期的 SMA
+    middle = rolling_mean(window_close, bb_period)
+    std = rolling_std(window_close, bb_period, mean=middle)
+    middle, std = middle[skip:], std[skip:]
+    result['bb_middle'][:] = middle
+    np.add(middle, bb_std * std, out=result['bb_upper'])
+    np.subtract(middle, bb_std * std, out=result['bb_lower'])
+    for period in sma_periods:
+        result[f'sma_{period}'][:] = middle if period == bb_period else \
+            rolling_mean(window_close, period)[skip:]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        np.divide(result['bb_upper'] - result['bb_lower'], middle, out=result['bb_width'])
+
+        if volume is not None:
+            volume = _as_array(volume)[begin:]
+            volume_sma = rolling_mean(volume, volume_period)[skip:]
+            result['volume_sma'][:] = volume_sma
+            np.divide(volume[skip:], volume_sma, out=result['volume_ratio'])
+
+        if 'atr' in result:
+            tr = true_range(_as_array(high)[begin:], _as_array(low)[begin:], window_close)
+            atr_values = rolling_mean(tr, atr_period)[skip:]
+            result['atr'][:] = atr_values
+            np.divide(atr_values, tail, out=result['atr_percent'])
+    return result
+
+
+def add_indicators(df, **kwargs):
+    """在含 open/high/low/close/volume 列的 DataFrame 上添加全套指标列，返回同一个 df"""
+    values = compute_indicators(df['close'], df.get('high'), df.get('low'), df.get('volume'), **kwargs)
+    for name, column in values.items():
+        df[name] = column
+    return df
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+信息驱动K线 - 成交量K线、成交额K线、逐笔不平衡K线
+按市场活跃度而不是时间切分: 行情清淡时K线少，剧烈时K线多。
+实时: 逐笔 (或逐根1分钟K线) 输入，每次 O(1)，阈值按指数加权平均自适应
+历史: 成交量/成交额K线批量转换 (每根K线一次 searchsorted，聚合向量化)，阈值按前一天的总量逐日调整
+
+输出与 resample_ohlcv 兼容: 前6列为 [开始时间, open, high, low, close, volume]，
+之后是 [成交额, 输入笔数, 结束时间]。
+
+用法:
+    builder = InfoBarBuilder('dollar', bars_per_day=50)
+    for trade in trades:
+        bar = builder.push(trade['timestamp'], trade['price'], trade['amount'])
+        if bar is not None:
+            ...
+
+    bars = dollar_bars(ohlcv_1m, bars_per_day=50)          # 历史批量
+    bars = store_bars(CandleStore(), 'BTC/USDT:USDT', 'dollar')
+"""
+
+import logging
+import numpy as np
+from typing import List, Optional
+
+from candle_store import DAY_MS
+
+logger = logging.getLogger(__name__)
+
+BAR_KINDS = ('volume', 'dollar', 'imbalance')
+BAR_COLUMNS = 9
+
+
+class InfoBarBuilder:
+    """流式信息K线生成器
+
+    kind:
+        volume    累计成交量达到阈值时收盘
+        dollar    累计成交额达到阈值时收盘
+        imbalance 按 tick rule 给每笔成交记 ±1，累计不平衡的绝对值超过
+                  期望值 E[T]·|2P(b=1)-1| 时收盘 (E[T]、P(b=1) 按已收盘K线加权平均)
+    threshold 不指定时按 bars_per_day 自适应: 用已收盘K线的流量 (每毫秒成交量/额)
+    的指数加权平均估算一天的总量再除以 bars_per_day。
+    """
+
+    def __init__(self, kind: str = 'dollar', threshold: Optional[float] = None,
+                 bars_per_day: float = 50, ewma_alpha: float = 0.1,
+                 initial_ticks: int = 100):
+        if kind not in BAR_KINDS:
+            raise ValueError(f"不支持的K线类型: {kind}")
+        self.kind = kind
+        self.fixed_threshold = threshold
+        self.bars_per_day = bars_per_day
+        self.alpha = ewma_alpha
+        self.threshold = threshold
+
+        # 自适应状态
+        self._flow_rate = None        # 每毫秒成交量/额 (volume/dollar)
+        self._expected_ticks = float(initial_ticks)
+        self._expected_imbalance = None
+        self._last_price = None
+        self._last_sign = 1
+        self._prev_close_ts = None
+
+        self._reset_bar()
+
+    def _reset_bar(self) -> None:
+        self._open_ts = None
+        self._open = self._high = self._low = self._close = 0.0
+        self._volume = 0.0
+        self._dollar = 0.0
+        self._count = 0
+        self._imbalance = 0.0
+        self._last_ts = 0
+
+    def _sign(self, price: float) -> int:
+        """tick rule: 上涨记+1，下跌记-1，不变沿用上一笔"""
+        if self._last_price is not None and price != self._last_price:
+            self._last_sign = 1 if price > self._last_price else -1
+        self._last_price = price
+        return self._last_sign
+
+    def _current_threshold(self) -> Optional[float]:
+        if self.kind == 'imbalance':
+            if self._expected_imbalance is None:
+                return None
+            # 买卖基本平衡时期望值趋近0，用随机游走的尺度 √E[T] 兜底
+            return max(self._expected_ticks * abs(self._expected_imbalance), np.sqrt(self._expected_ticks))
+        if self.fixed_threshold is not None:
+            return self.fixed_threshold
+        if self._flow_rate is None:
+            return None
+        return self._flow_rate * DAY_MS / self.bars_per_day
+
+    def push(self, timestamp: int, price: float, amount: float) -> Optional[List[float]]:
+        """输入一笔成交，K线收盘时返回该K线，否则返回 None"""
+        price = float(price)
+        amount = float(amount)
+        sign = self._sign(price)
+
+        if self._open_ts is None:
+            self._open_ts = int(timestamp)
+            self._open = self._high = self._low = price
+        else:
+            self._high = max(self._high, price)
+            self._low = min(self._low, price)
+        self._close = price
+        self._volume += amount
+        self._dollar += price * amount
+        self._count += 1
+        self._imbalance += sign
+        self._last_ts = int(timestamp)
+
+        threshold = self._current_threshold()
+        if threshold is None:
+            # 自适应阈值尚未建立: 先按时间 (每天 bars_per_day 根) 切分
+            if self._last_ts - self._open_ts < DAY_MS / self.bars_per_day:
+                return None
+        elif self._progress() < threshold:
+            return None
+        return self._close_bar()
+
+    def push_candle(self, candle) -> Optional[List[float]]:
+        """输入一根K线 [timestamp, open, high, low, close, volume]，视为收盘价上的一笔成交"""
+        return self.push(candle[0], candle[4], candle[5])
+
+    def _progress(self) -> float:
+        if self.kind == 'volume':
+            return self._volume
+        if self.kind == 'dollar':
+            return self._dollar
+        return abs(self._imbalance)
+
+    def _close_bar(self) -> List[float]:
+        bar = [float(self._open_ts), self._open, self._high, self._low, self._close,
+               self._volume, self._dollar, float(self._count), float(self._last_ts)]
+
+        # 更新自适应阈值
+        if self.kind == 'imbalance':
+            self._expected_ticks += self.alpha * (self._count - self._expected_ticks)
+            mean_sign = self._imbalance / self._count
+            self._expected_imbalance = mean_sign if self._expected_imbalance is None else \
+                self._expected_imbalance + self.alpha * (mean_sign - self._expected_imbalance)
+        elif self.fixed_threshold is None:
+            # 从上一根收盘算起，包含两根K线之间的间隔
+            since = self._prev_close_ts if self._prev_close_ts is not None else self._open_ts
+            duration = max(self._last_ts - since, 1)
+            rate = (self._volume if self.kind == 'volume' else self._dollar) / duration
+            self._flow_rate = rate if self._flow_rate is None else \
+                self._flow_rate + self.alpha * (rate - self._flow_rate)
+        self.threshold = self._current_threshold()
+
+        self._prev_close_ts = self._last_ts
+        self._reset_bar()
+        return bar
+
+    def push_many(self, timestamps, prices, amounts) -> np.ndarray:
+        """逐笔输入一批数据，返回这批数据中收盘的K线 (M, 9)"""
+        bars = []
+        for ts, price, amount in zip(timestamps, prices, amounts):
+            bar = self.push(ts, price, amount)
+            if bar is not None:
+                bars.append(bar)
+        return np.asarray(bars, dtype=np.float64).reshape(-1, BAR_COLUMNS)
+
+
+# ---------- 历史批量转换 ----------
+
+def _daily_thresholds(timestamps: np.ndarray, flow: np.ndarray, bars_per_day: float) -> np.ndarray:
+    """每一行使用的阈值: 前一天的总量 / bars_per_day (第一天用当天的)"""
+    days = timestamps // DAY_MS
+    unique_days, day_index = np.unique(days, return_inverse=True)
+    totals = np.bincount(day_index, weights=flow)
+    previous = np.r_[totals[0], totals[:-1]]
+    thresholds = previous / bars_per_day
+    thresholds[thresholds <= 0] = np.nan
+    return thresholds[day_index]
+
+
+def _bar_starts(flow: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """每根K线第一行的位置
+
+    与 InfoBarBuilder 一致: 收盘后从下一行重新累计，累计量达到当前阈值的那一行收盘，
+    超出阈值的部分不计入下一根。每根K线在阈值不变的区段内用累加和 searchsorted 找收盘行。
+    """
+    n = len(flow)
+    cumsum = np.cumsum(flow)
+    filled = np.where(np.isnan(thresholds), np.inf, thresholds)
+    run_starts = np.flatnonzero(np.r_[True, filled[1:] != filled[:-1]])
+    run_ends = np.r_[run_starts[1:], n]
+
+    starts = [0]
+    start, run = 0, 0
+    while True:
+        base = cumsum[start - 1] if start else 0.0
+        while run_ends[run] <= start:
+            run += 1
+        end = n
+        for r in range(run, len(run_starts)):
+            lo = max(start, run_starts[r])
+            k = lo + int(np.searchsorted(cumsum[lo:run_ends[r]], base + filled[lo], side='left'))
+            if k < run_ends[r]:
+                end = k
+                break
+        if end >= n - 1:
+            break
+        start = end + 1
+        starts.append(start)
+    return np.asarray(starts, dtype=np.int64)
+
+
+def _group_bars(data: np.ndarray, flow: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """按收盘位置分组，向量化聚合"""
+    n = len(data)
+    starts = _bar_starts(flow, thresholds)
+    ends = np.r_[starts[1:], n] - 1
+
+    bars = np.empty((len(starts), BAR_COLUMNS), dtype=np.float64)
+    bars[:, 0] = data[starts, 0]
+    bars[:, 1] = data[starts, 1]
+    bars[:, 2] = np.maximum.reduceat(data[:, 2], starts)
+    bars[:, 3] = np.minimum.reduceat(data[:, 3], starts)
+    bars[:, 4] = data[ends, 4]
+    bars[:, 5] = np.add.reduceat(data[:, 5], starts)
+    bars[:, 6] = np.add.reduceat(data[:, 4] * data[:, 5], starts)
+    bars[:, 7] = np.diff(np.r_[starts, n])
+    bars[:, 8] = data[ends, 0]
+    return bars
+
+
+def _prepare(ohlcv) -> np.ndarray:
+    data = np.asarray(ohlcv, dtype=np.float64)
+    if data.size == 0:
+        return np.empty((0, 6), dtype=np.float64)
+    return data[np.argsort(data[:, 0], kind='stable')]
+
+
+def volume_bars(ohlcv, threshold: Optional[float] = None, bars_per_day: float = 50) -> np.ndarray:
+    """把 (N, 6) 的1分钟K线转换为成交量K线 (M, 9)
+
+    threshold 为空时每天的阈值 = 前一天总成交量 / bars_per_day。
+    最后一根可能未达到阈值，与 resample_ohlcv 的未收盘K线一致。
+    """
+    data = _prepare(ohlcv)
+    if len(data) == 0:
+        return np.empty((0, BAR_COLUMNS), dtype=np.float64)
+    flow = data[:, 5]
+    thresholds = np.full(len(data), float(threshold)) if threshold else \
+        _daily_thresholds(data[:, 0].astype(np.int64), flow, bars_per_day)
+    return _group_bars(data, flow, thresholds)
+
+
+def dollar_bars(ohlcv, threshold: Optional[float] = None, bars_per_day: float = 50) -> np.ndarray:
+    """把 (N, 6) 的1分钟K线转换为成交额K线 (M, 9)，成交额按收盘价 × 成交量估算"""
+    data = _prepare(ohlcv)
+    if len(data) == 0:
+        return np.empty((0, BAR_COLUMNS), dtype=np.float64)
+    flow = data[:, 4] * data[:, 5]
+    thresholds = np.full(len(data), float(threshold)) if threshold else \
+        _daily_thresholds(data[:, 0].astype(np.int64), flow, bars_per_day)
+    return _group_bars(data, flow, thresholds)
+
+
+def imbalance_bars(ohlcv, **kwargs) -> np.ndarray:
+    """把 (N, 6) 的1分钟K线转换为不平衡K线 (M, 9)
+
+    收盘条件依赖逐根更新的期望值，无法向量化，逐根调用 InfoBarBuilder。
+    """
+    data = _prepare(ohlcv)
+    builder = InfoBarBuilder('imbalance', **kwargs)
+    return builder.push_many(data[:, 0].astype(np.int64), data[:, 4], data[:, 5])
+
+
+def store_bars(store, symbol: str, kind: str = 'dollar', timeframe: str = '1m',
+               start_ms: Optional[int] = None, end_ms: Optional[int] = None, **kwargs) -> np.ndarray:
+    """直接从本地K线归档生成信息K线"""
+    arrays = store.load(symbol, timeframe, start_ms, end_ms)
+    ohlcv = np.column_stack([arrays['timestamp'], arrays['open'], arrays['high'],
+                             arrays['low'], arrays['close'], arrays['volume']])
+    converters = {'volume': volume_bars, 'dollar': dollar_bars, 'imbalance': imbalance_bars}
+    bars = converters[kind](ohlcv, **kwargs)
+    logger.info(f"{symbol} {timeframe}: {len(ohlcv)} 根K线 → {len(bars)} 根{kind}K线")
+    return bars
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+行情数据中心 - 唯一持有交易所连接的进程
+定时拉取K线/行情/持仓/余额/成交，通过 Unix socket 推送给本机所有交易器、监控面板和通知器。
+无论开多少个面板，交易所的请求量都保持不变。
+
+启动:
+    python market_data_hub.py
+客户端:
+    from market_data_hub import create_exchange
+    exchange = create_exchange(config)   # 数据中心在线时读取推送数据，否则退化为直连 ccxt
+"""
+
+import os
+import json
+import time
+import socket
+import logging
+import threading
+import contextlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from cached_exchange import CachedExchange, ORDER_METHODS
+from markets_cache import load_markets_cached
+from candle_resampler import ResampledCandleFeed
+
+logger = logging.getLogger(__name__)
+
+HUB_SOCKET_PATH = '/tmp/okx_market_hub.sock'
+HUB_SYMBOL = 'BTC/USDT:USDT'
+
+# 各数据的刷新间隔 (秒)
+DEFAULT_INTERVALS = {
+    'ticker': 2,
+    'positions': 5,
+    'balance': 10,
+    'ohlcv': 10,
+    'fills': 30,
+}
+
+# 快照超过 (刷新间隔 × 该倍数) 没有更新时视为过期 (数据中心持续拉取失败)，客户端改为直连
+MAX_AGE_INTERVALS = 3
+
+# 下单后会变化的账户数据
+ACCOUNT_TOPICS = {'positions', 'balance', 'fills'}
+
+
+def okx_config(config: Dict) -> Dict:
+    """从项目配置生成 ccxt.okx 的参数"""
+    return {
+        'apiKey': config['exchange']['api_key'],
+        'secret': config['exchange']['secret'],
+        'password': config['exchange']['passphrase'],
+        'enableRateLimit': True,
+        'proxies': config['exchange']['proxies'],
+        'options': {'defaultType': 'swap'}
+    }
+
+
+class MarketDataHub:
+    """轮询交易所并向订阅者推送最新快照
+
+    推送协议: 每行一条 JSON {"topic": ..., "data": ..., "ts": ...}，ts 为发出这次请求的时间 (毫秒)
+    客户端连上后先发一行 {"subscribe": [...]} (空列表表示全部)，随即收到各主题的最新快照。
+    """
+
+    def __init__(self, exchange, symbol: str = HUB_SYMBOL,
+                 timeframes: Optional[Dict[str, int]] = None,
+                 intervals: Optional[Dict[str, float]] = None,
+                 socket_path: str = HUB_SOCKET_PATH):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.socket_path = socket_path
+        self.intervals = dict(DEFAULT_INTERVALS, **(intervals or {}))
+        self.candles = ResampledCandleFeed(exchange, symbol, timeframes or {'1m': 60, '5m': 100, '15m': 100})
+        self.snapshots: Dict[str, Dict] = {}
+        self.clients: List[tuple] = []
+        self._lock = threading.Lock()
+        self.running = False
+        self.stats = {'requests': 0, 'published': 0, 'clients': 0}
+
+    # ---------- 数据拉取 ----------
+
+    def _poll(self, topic: str) -> None:
+        requested = int(time.time() * 1000)
+        if topic == 'ticker':
+            self.publish('ticker', self.exchange.fetch_ticker(self.symbol), requested)
+        elif topic == 'positions':
+            self.publish('positions', self.exchange.fetch_positions([self.symbol]), requested)
+        elif topic == 'balance':
+            self.publish('balance', self.exchange.fetch_balance(), requested)
+        elif topic == 'fills':
+            self.publish('fills', self.exchange.fetch_my_trades(self.symbol, limit=50), requested)
+        elif topic == 'ohlcv':
+            for tf, buffer in self.candles.refresh_all().items():
+                self.publish(f'ohlcv:{tf}', buffer.to_ohlcv())
+            return
+        self.stats['requests'] += 1
+
+    def poll_loop(self) -> None:
+        next_due = {topic: 0.0 for topic in self.intervals}
+        while self.running:
+            now = time.time()
+            for topic, due in next_due.items():
+                if now < due:
+                    continue
+                try:
+                    self._poll(topic)
+                except Exception as e:
+                    logger.error(f"拉取{topic}失败: {e}")
+                next_due[topic] = now + self.intervals[topic]
+            time.sleep(max(0.05, min(next_due.values()) - time.time()))
+
+    # ---------- 推送 ----------
+
+    def publish(self, topic: str, data, ts: Optional[int] = None) -> None:
+        message = {'topic': topic, 'data': data, 'ts': ts if ts is not None else int(time.time() * 1000)}
+        line = (json.dumps(message, default=str) + '\n').encode()
+        with self._lock:
+            self.snapshots[topic] = message
+            clients = list(self.clients)
+        for client in clients:
+            self._send(client, topic, line)
+        self.stats['published'] += 1
+
+    def _send(self, client, topic: str, line: bytes) -> None:
+        conn, topics = client
+        if topics and topic.split(':')[0] not in topics and topic not in topics:
+            return
+        try:
+            conn.sendall(line)
+        except OSError:
+            with self._lock:
+                if client in self.clients:
+                    self.clients.remove(client)
+            conn.close()
+
+    def accept_loop(self, server: socket.socket) -> None:
+        while self.running:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                break
+            try:
+                conn.settimeout(5)
+                request = conn.makefile('r').readline()
+                topics = set(json.loads(request).get('subscribe') or []) if request else set()
+                conn.settimeout(None)
+            except (OSError, ValueError) as e:
+                logger.warning(f"订阅请求无效: {e}")
+                conn.close()
+                continue
+
+            client = (conn, topics)
+            with self._lock:
+                snapshots = list(self.snapshots.values())
+                self.clients.append(client)
+                self.stats['clients'] = len(self.clients)
+            for message in snapshots:
+                self._send(client, message['topic'], (json.dumps(message, default=str) + '\n').encode())
+
+    def run(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(32)
+        self.running = True
+        threading.Thread(target=self.accept_loop, args=(server,), daemon=True).start()
+
+        logger.info(f"📡 行情数据中心已启动: {self.socket_path}")
+        try:
+            self.poll_loop()
+        except KeyboardInterrupt:
+            logger.info("🛑 用户中断，停止数据中心")
+        finally:
+            self.running = False
+            server.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+
+class HubClient:
+    """订阅数据中心推送，在后台线程中保存各主题最新快照"""
+
+    def __init__(self, socket_path: str = HUB_SOCKET_PATH, topics: Optional[List[str]] = None):
+        self.socket_path = socket_path
+        self.latest: Dict[str, Dict] = {}
+        self.connected = False
+        self._ready = threading.Condition()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(socket_path)
+        self._sock.sendall((json.dumps({'subscribe': topics or []}) + '\n').encode())
+        self.connected = True
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+    def _read_loop(self) -> None:
+        try:
+            for line in self._sock.makefile('r'):
+                message = json.loads(line)
+                with self._ready:
+                    self.latest[message['topic']] = message
+                    self._ready.notify_all()
+        except (OSError, ValueError) as e:
+            logger.warning(f"与数据中心的连接中断: {e}")
+        self.connected = False
+
+    def get(self, topic: str, timeout: float = 3.0):
+        """返回主题的最新数据，尚未收到时最多等待 timeout 秒；仍没有或连接已断开则返回 None"""
+        deadline = time.time() + timeout
+        with self._ready:
+            while topic not in self.latest and self.connected:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._ready.wait(remaining)
+            message = self.latest.get(topic) if self.connected else None
+        return message['data'] if message else None
+
+    def requested_at(self, topic: str) -> Optional[int]:
+        """主题最新快照对应的请求时间 (毫秒)，没有时为 None"""
+        message = self.latest.get(topic)
+        return message.get('ts') if message else None
+
+
+class HubExchange:
+    """与 ccxt 相同方法名的只读门面
+
+    fetch_ticker / fetch_positions / fetch_balance / fetch_ohlcv / fetch_my_trades 读取数据中心的推送，
+    下单等其它调用以及数据中心没有的数据 (如其它交易对、带 params 的请求) 交给直连的 ccxt 客户端 (按需创建)。
+    以下情况不读快照，直接查询交易所:
+        快照超过 MAX_AGE_INTERVALS 个刷新间隔没有更新 (数据中心拉取一直失败)
+        下单之后、数据中心推送下单后请求的持仓/余额/成交快照之前
+    """
+
+    def __init__(self, client: HubClient, config: Dict, symbol: str = HUB_SYMBOL,
+                 intervals: Optional[Dict[str, float]] = None):
+        self.client = client
+        self.symbol = symbol
+        self.intervals = dict(DEFAULT_INTERVALS, **(intervals or {}))
+        self._config = config
+        self._direct = None
+        self._last_order_ms = None
+        self._stale = set()
+
+    @property
+    def direct(self):
+        if self._direct is None:
+            import ccxt
+            exchange = ccxt.okx(okx_config(self._config))
+            load_markets_cached(exchange)
+            self._direct = CachedExchange(exchange)
+        return self._direct
+
+    def __getattr__(self, name):
+        attr = getattr(self.direct, name)
+        if name in ORDER_METHODS and callable(attr):
+            def call(*args, **kwargs):
+                try:
+                    return attr(*args, **kwargs)
+                finally:
+                    self._last_order_ms = int(time.time() * 1000)
+            return call
+        return attr
+
+    def _snapshot(self, topic: str, timeout: float = 3.0):
+        """数据中心的快照，没有、已过期或下单后尚未推送新的账户快照时返回 None"""
+        data = self.client.get(topic, timeout=timeout)
+        if data is None:
+            return None
+        requested = self.client.requested_at(topic)
+        max_age_ms = self.intervals[topic.split(':')[0]] * MAX_AGE_INTERVALS * 1000
+        if requested is None or time.time() * 1000 - requested > max_age_ms:
+            if topic not in self._stale:
+                self._stale.add(topic)
+                logger.warning(f"数据中心的 {topic} 快照已过期，改为直连交易所")
+            return None
+        if topic in self._stale:
+            self._stale.discard(topic)
+            logger.info(f"数据中心的 {topic} 快照已恢复更新")
+        if topic in ACCOUNT_TOPICS and self._last_order_ms is not None and requested <= self._last_order_ms:
+            return None
+        return data
+
+    def fetch_ticker(self, symbol, params={}):
+        ticker = None if params else self._snapshot('ticker')
+        if ticker is None or ticker.get('symbol') != symbol:
+            return self.direct.fetch_ticker(symbol, params)
+        return ticker
+
+    def fetch_positions(self, symbols=None, params={}):
+        # 数据中心只拉取 self.symbol 的持仓，查询全部或其它交易对时直连
+        if params or not symbols or any(s != self.symbol for s in symbols):
+            return self.direct.fetch_positions(symbols, params)
+        positions = self._snapshot('positions')
+        if positions is None:
+            return self.direct.fetch_positions(symbols, params)
+        return [p for p in positions if p.get('symbol') in symbols]
+
+    def fetch_balance(self, params={}):
+        balance = None if params else self._snapshot('balance')
+        if balance is None:
+            return self.direct.fetch_balance(params)
+        return balance
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None, params={}):
+        # 数据中心只保存 self.symbol 最近的成交
+        fills = None if params or symbol != self.symbol else self._snapshot('fills')
+        if fills is None:
+            return self.direct.fetch_my_trades(symbol, since, limit, params)
+        fills = [t for t in fills if t.get('symbol') == symbol
+                 and (since is None or (t.get('timestamp') or 0) >= since)]
+        return fills[-limit:] if limit else fills
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        if symbol != self.symbol or params:
+            return self.direct.fetch_ohlcv(symbol, timeframe, since, limit, params)
+        ohlcv = self._snapshot(f'ohlcv:{timeframe}', timeout=0.5)
+        if ohlcv is None or (since is not None and ohlcv and since < ohlcv[0][0]) \
+                or (limit and since is None and limit > len(ohlcv)):
+            return self.direct.fetch_ohlcv(symbol, timeframe, since, limit, params)
+        if since is not None:
+            ohlcv = [c for c in ohlcv if c[0] >= since]
+            return ohlcv[:limit] if limit else ohlcv
+        return ohlcv[-limit:] if limit else ohlcv
+
+
+@contextlib.contextmanager
+def hub_disabled():
+    """在上下文中 create_exchange 不连接数据中心，总是创建 ccxt.okx 客户端
+
+    离线模拟、录制和回放会替换 ccxt.okx，请求必须经过它，不能被数据中心的推送数据接管。
+    """
+    global HUB_SOCKET_PATH
+    original = HUB_SOCKET_PATH
+    HUB_SOCKET_PATH = None
+    try:
+        yield
+    finally:
+        HUB_SOCKET_PATH = original
+
+
+def create_exchange(config: Dict, socket_path: Optional[str] = None):
+    """优先连接本机数据中心，不可用时直接创建 (带缓存的) ccxt.okx 客户端"""
+    socket_path = socket_path or HUB_SOCKET_PATH
+    if socket_path and os.path.exists(socket_path):
+        try:
+            return HubExchange(HubClient(socket_path), config)
+        except OSError as e:
+            logger.warning(f"数据中心不可用，改为直连交易所: {e}")
+    import ccxt
+    exchange = ccxt.okx(okx_config(config))
+    load_markets_cached(exchange)
+    return CachedExchange(exchange)
+
+
+if __name__ == '__main__':
+    os.makedirs('logs', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('logs/market_data_hub.log'),
+            logging.StreamHandler()
+        ]
+    )
+    import ccxt
+
+    with open('config/final_config.json', 'r') as f:
+        config = json.load(f)
+
+    hub = MarketDataHub(ccxt.okx(okx_config(config)))
+    print(f'📡 行情数据中心 {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
+    print(f'   交易对: {hub.symbol}')
+    print(f'   刷新间隔: {hub.intervals}')
+    hub.run()
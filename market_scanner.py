@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+多币种扫描器 - 同时监控几十个 OKX USDT 永续合约
+每个合约一个 ResampledCandleFeed (每轮只拉一次1分钟K线)，各合约的K线叠成 (合约数 × 时间) 的矩阵，
+趋势、价格位置、波动率以及信号选择沿用 UltraFastTrader.analyze_candles / generate_signal 的规则，
+但对所有合约一次性用数组计算，100个合约的计算量相当于原来单个合约的一轮。
+与单合约交易器的差别见 analyze_matrix。
+
+用法:
+    python market_scanner.py --top 50 --interval 10
+
+    scanner = MarketScanner(exchange, discover_symbols(exchange, top=50))
+    candidates = scanner.scan()     # 按信心度/突破幅度排序的信号列表
+"""
+
+import json
+import time
+import copy
+import logging
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from candle_resampler import ResampledCandleFeed
+from ultra_fast_trader import ULTRA_FAST_PARAMS
+
+logger = logging.getLogger(__name__)
+
+TIMEFRAMES = {'15m': 50, '5m': 30, '1m': 20}
+TREND_NAMES = {1: 'bullish', -1: 'bearish', 0: 'neutral'}
+DIRECTIONS = {1: 'LONG', -1: 'SHORT'}
+
+
+def discover_symbols(exchange, quote: str = 'USDT', top: Optional[int] = None) -> List[str]:
+    """交易中的 USDT 本位永续合约，top 指定时按24小时成交额取前 top 个"""
+    markets = exchange.load_markets()
+    symbols = [s for s, m in markets.items()
+               if m.get('swap') and m.get('linear') and m.get('quote') == quote and m.get('active', True)]
+    if top is None or len(symbols) <= top:
+        return sorted(symbols)
+    try:
+        tickers = exchange.fetch_tickers(symbols)
+    except Exception as e:
+        logger.warning(f"获取成交额排名失败，按字母顺序取前{top}个: {e}")
+        return sorted(symbols)[:top]
+    volume = {s: (tickers.get(s) or {}).get('quoteVolume') or 0 for s in symbols}
+    return sorted(symbols, key=lambda s: volume[s], reverse=True)[:top]
+
+
+def _stack(buffers, width: int) -> np.ndarray:
+    """各合约最近 width 根收盘价叠成 (S, width) 矩阵，不足的在左侧补 NaN"""
+    matrix = np.full((len(buffers), width), np.nan)
+    for i, buffer in enumerate(buffers):
+        closes = buffer.closes[-width:]
+        if len(closes):
+            matrix[i, width - len(closes):] = closes
+    return matrix
+
+
+def analyze_matrix(closes_15m: np.ndarray, closes_5m: np.ndarray,
+                   current_prices: np.ndarray, params: Dict = ULTRA_FAST_PARAMS) -> Dict[str, np.ndarray]:
+    """UltraFastTrader 的分析与信号选择的二维版本，每个输出都是长度为合约数的数组
+
+    closes_15m: (S, ≥50)，closes_5m: (S, ≥breakout_period+1)，最后一列为未收盘K线。
+    与 UltraFastTrader 的两处差别:
+        - 扫描器没有逐笔成交，突破只与已收盘的5分钟K线比较 (对应交易器的10秒K线突破检测)；
+          交易器10秒K线不足时退回的5分钟K线窗口包含未收盘K线
+        - 15分钟K线不足50根或有缺失的合约视为数据不足 (valid 为 False)，不出信号；
+          交易器按已有的K线计算
+    direction: 1 做多 / -1 做空 / 0 无信号；strategy: 0 无 / 1 快速突破 / 2 趋势跟踪 / 3 均值回归
+    """
+    price = np.asarray(current_prices, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sma_20 = closes_15m[:, -20:].mean(axis=1)
+        sma_50 = closes_15m[:, -50:].mean(axis=1)
+        support = closes_15m[:, -15:].min(axis=1)
+        resistance = closes_15m[:, -15:].max(axis=1)
+        span = resistance - support
+        price_position = np.where(span != 0, (price - support) / span, 0.5)
+
+        last_20 = closes_15m[:, -20:]
+        returns = np.diff(last_20, axis=1) / last_20[:, :-1]
+        volatility = returns.std(axis=1) * np.sqrt(365 * 24 * 4)
+
+    trend = np.where((price > sma_20) & (sma_20 > sma_50), 1,
+                     np.where((price < sma_20) & (sma_20 < sma_50), -1, 0))
+
+    # 快速突破
+    breakout = params['quick_breakout']
+    period, multiplier = breakout['breakout_period'], breakout['breakout_multiplier']
+    window = closes_5m[:, -period - 1:-1]
+    recent_high = window.max(axis=1)
+    recent_low = window.min(axis=1)
+    breakout_up = price > recent_high * multiplier
+    breakout_down = ~breakout_up & (price < recent_low / multiplier)
+    if not breakout['enabled']:
+        breakout_up[:] = breakout_down[:] = False
+    breakout_level = np.where(breakout_up, recent_high, np.where(breakout_down, recent_low, np.nan))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        breakout_percent = np.where(breakout_up, (price / recent_high - 1) * 100,
+                                    np.where(breakout_down, (1 - price / recent_low) * 100, 0.0))
+
+    # 信号选择顺序与 generate_signal 相同: 快速突破 > 趋势跟踪 > 均值回归
+    trend_params = params['trend_following']
+    reversion = params['mean_reversion']
+    trend_long = (trend == 1) & (price_position < trend_params['long_support_threshold'])
+    trend_short = (trend == -1) & (price_position > trend_params['short_resistance_threshold'])
+    ranging = (trend == 0) & (volatility > reversion['volatility_threshold']) & reversion['enabled']
+    reversion_long = ranging & (price_position < reversion['long_support_threshold'])
+    reversion_short = ranging & ~reversion_long & (price_position > reversion['short_resistance_threshold'])
+
+    is_breakout = breakout_up | breakout_down
+    is_trend = ~is_breakout & (trend_long | trend_short)
+    is_reversion = ~is_breakout & ~is_trend & (reversion_long | reversion_short)
+
+    direction = np.select(
+        [breakout_up, breakout_down, is_trend & trend_long, is_trend & trend_short,
+         is_reversion & reversion_long, is_reversion & reversion_short],
+        [1, -1, 1, -1, 1, -1], 0)
+    strategy = np.select([is_breakout, is_trend, is_reversion], [1, 2, 3], 0)
+    confidence = np.select([is_breakout, is_trend, is_reversion],
+                           [breakout['confidence'], trend_params['confidence'], reversion['confidence']], 0.0)
+
+    # 数据不足 (NaN) 的合约不出信号
+    valid = ~np.isnan(closes_15m[:, -50:]).any(axis=1) & ~np.isnan(window).any(axis=1) & ~np.isnan(price)
+    direction = np.where(valid, direction, 0)
+
+    return {
+        'current_price': price, 'trend': trend, 'volatility': volatility,
+        'sma_20': sma_20, 'sma_50': sma_50, 'support': support, 'resistance': resistance,
+        'price_position': price_position, 'breakout_level': breakout_level,
+        'breakout_percent': breakout_percent, 'direction': direction,
+        'strategy': np.where(valid, strategy, 0), 'confidence': np.where(valid, confidence, 0.0),
+        'valid': valid,
+    }
+
+
+def rank_candidates(symbols: List[str], result: Dict[str, np.ndarray]) -> List[Dict]:
+    """有信号的合约按 信心度 → 突破幅度 → 波动率 降序排列"""
+    fired = np.flatnonzero(result['direction'] != 0)
+    order = np.lexsort((-result['volatility'][fired], -result['breakout_percent'][fired],
+                        -result['confidence'][fired]))
+    strategy_names = {1: '快速突破', 2: '趋势跟踪', 3: '均值回归'}
+    candidates = []
+    for i in fired[order]:
+        candidates.append({
+            'symbol': symbols[i],
+            'direction': DIRECTIONS[int(result['direction'][i])],
+            'strategy': strategy_names[int(result['strategy'][i])],
+            'confidence': float(result['confidence'][i]),
+            'current_price': float(result['current_price'][i]),
+            'trend': TREND_NAMES[int(result['trend'][i])],
+            'price_position': float(result['price_position'][i]),
+            'volatility': float(result['volatility'][i]),
+            'breakout_percent': float(result['breakout_percent'][i]),
+        })
+    return candidates
+
+
+class MarketScanner:
+    """多合约K线缓冲区 + 二维向量化分析"""
+
+    def __init__(self, exchange, symbols: List[str], params: Optional[Dict] = None,
+                 max_workers: int = 8):
+        self.exchange = exchange
+        self.symbols = list(symbols)
+        self.params = copy.deepcopy(params or ULTRA_FAST_PARAMS)
+        self.max_workers = max_workers
+        self.feeds = {s: ResampledCandleFeed(exchange, s, TIMEFRAMES) for s in self.symbols}
+        self.stats = {'scans': 0, 'errors': 0, 'fetch_time': 0.0, 'compute_time': 0.0}
+
+    def _refresh(self, symbol: str) -> bool:
+        try:
+            self.feeds[symbol].refresh_all()
+            return True
+        except Exception as e:
+            logger.warning(f"{symbol} K线更新失败: {e}")
+            return False
+
+    def refresh(self) -> Dict[str, float]:
+        """并发刷新所有合约的K线，再用一次 fetch_tickers 取最新价 (失败时用最新收盘价)"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            ok = list(pool.map(self._refresh, self.symbols))
+        self.stats['errors'] += ok.count(False)
+        try:
+            tickers = self.exchange.fetch_tickers(self.symbols)
+            return {s: t['last'] for s, t in tickers.items() if t.get('last')}
+        except Exception as e:
+            logger.warning(f"获取最新价失败，使用K线收盘价: {e}")
+            return {}
+
+    def analyze(self, last_prices: Optional[Dict[str, float]] = None) -> Dict[str, np.ndarray]:
+        """对当前缓冲区做一次二维分析 (不访问交易所)"""
+        closes_15m = _stack([self.feeds[s].buffers['15m'] for s in self.symbols], TIMEFRAMES['15m'])
+        closes_5m = _stack([self.feeds[s].buffers['5m'] for s in self.symbols], TIMEFRAMES['5m'])
+        prices = closes_5m[:, -1].copy()
+        if last_prices:
+            for i, symbol in enumerate(self.symbols):
+                if symbol in last_prices:
+                    prices[i] = last_prices[symbol]
+        return analyze_matrix(closes_15m, closes_5m, prices, self.params)
+
+    def scan(self) -> List[Dict]:
+        """刷新并返回排序后的候选信号"""
+        start = time.perf_counter()
+        last_prices = self.refresh()
+        fetched = time.perf_counter()
+        candidates = rank_candidates(self.symbols, self.analyze(last_prices))
+        self.stats['scans'] += 1
+        self.stats['fetch_time'] += fetched - start
+        self.stats['compute_time'] += time.perf_counter() - fetched
+        return candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多币种信号扫描')
+    parser.add_argument('--top', type=int, default=50, help='按成交额取前N个合约')
+    parser.add_argument('--interval', type=float, default=ULTRA_FAST_PARAMS['check_interval'])
+    parser.add_argument('--show', type=int, default=10)
+    parser.add_argument('--config', default='config/final_config.json')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    import ccxt
+    from market_data_hub import okx_config
+    from markets_cache import load_markets_cached
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    exchange = ccxt.okx(okx_config(config))
+    load_markets_cached(exchange)
+    symbols = discover_symbols(exchange, top=args.top)
+    scanner = MarketScanner(exchange, symbols)
+    print(f"🔍 扫描 {len(symbols)} 个 USDT 永续合约，每{args.interval}秒一次")
+
+    try:
+        while True:
+            start = time.time()
+            candidates = scanner.scan()
+            compute_ms = scanner.stats['compute_time'] / scanner.stats['scans'] * 1000
+            print(f"\n⚡ {time.strftime('%H:%M:%S')} 信号 {len(candidates)} 个 (计算 {compute_ms:.2f}ms)")
+            for c in candidates[:args.show]:
+                print(f"   {c['symbol']:<22} {c['direction']:<5} {c['strategy']} "
+                      f"信心{c['confidence']:.0%} 价格{c['current_price']:.6g} 位置{c['price_position']:.1%}")
+            time.sleep(max(0.1, args.interval - (time.time() - start)))
+    except KeyboardInterrupt:
+        print('\n🛑 停止扫描')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+交易所市场信息的本地缓存
+OKX 的 load_markets 返回数MB数据、耗时数秒，每个脚本启动都要拉一次。
+这里把市场信息存到 data/markets/okx.json，所有脚本共用:
+    缓存未过期   直接注入 ccxt 客户端，启动时不发请求
+    缓存已过期   先用旧数据启动，后台线程刷新并写回文件
+    没有缓存     同步拉取一次并写入
+合约乘数、最小价格变动、最小下单量立即可用；杠杆档位按合约首次查询时拉取并一起缓存。
+
+用法:
+    python markets_cache.py refresh
+    python markets_cache.py info --symbol BTC/USDT:USDT
+
+    exchange = ccxt.okx({...})
+    load_markets_cached(exchange)
+    spec = contract_spec(exchange.market('BTC/USDT:USDT'))
+"""
+
+import os
+import json
+import time
+import inspect
+import logging
+import argparse
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = 'data/markets/okx.json'
+DEFAULT_TTL = 6 * 60 * 60  # 秒
+
+
+class MarketsCache:
+    """市场信息与杠杆档位的 JSON 文件缓存 (多进程共用，原子替换写入)"""
+
+    def __init__(self, path: str = DEFAULT_PATH, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def load(self) -> Optional[Dict]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"市场缓存读取失败，将重新获取: {e}")
+            return None
+
+    def _save(self, data: Dict) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp, self.path)
+
+    def age(self, data: Optional[Dict] = None) -> float:
+        """缓存的年龄 (秒)，没有缓存时为无穷大"""
+        data = data if data is not None else self.load()
+        return time.time() - data['fetched_at'] if data else float('inf')
+
+    # ---------- 市场信息 ----------
+
+    def refresh(self, exchange) -> Dict:
+        """从交易所重新获取并写入缓存 (保留已缓存的杠杆档位)"""
+        markets = exchange.load_markets(reload=True)
+        with self._lock:
+            data = self.load() or {}
+            data.update({'fetched_at': time.time(), 'markets': markets})
+            data.setdefault('leverage_tiers', {})
+            self._save(data)
+        logger.info(f"市场信息已更新: {len(markets)} 个交易对 → {self.path}")
+        return markets
+
+    def _refresh_in_background(self, exchange) -> None:
+        if self._refreshing:
+            return
+        self._refreshing = True
+
+        def run():
+            try:
+                self.refresh(exchange)
+            except Exception as e:
+                logger.warning(f"后台刷新市场信息失败，继续使用旧缓存: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='markets-refresh', daemon=True).start()
+
+    def attach(self, exchange, background: bool = True) -> Optional[Dict]:
+        """把缓存的市场信息注入 ccxt 客户端，返回 markets
+
+        只对真正的 ccxt 客户端生效；模拟、录制、回放等包装对象原样返回 None，
+        它们在需要时自行 load_markets。
+        ccxt.async_support 客户端的 load_markets 是协程，这里不能同步刷新: 只注入已有缓存 (过期也照用)，
+        没有缓存时返回 None，由 ccxt 在首次请求时自行加载。
+        """
+        if getattr(type(exchange), 'set_markets', None) is None:
+            return None
+        data = self.load()
+        if inspect.iscoroutinefunction(exchange.load_markets):
+            if not data or not data.get('markets'):
+                return None
+            exchange.set_markets(data['markets'])
+            return exchange.markets
+        if not data or not data.get('markets'):
+            try:
+                return self.refresh(exchange)
+            except Exception as e:
+                logger.warning(f"获取市场信息失败，稍后由 ccxt 按需加载: {e}")
+                return None
+
+        exchange.set_markets(data['markets'])
+        age = self.age(data)
+        if age > self.ttl:
+            logger.info(f"市场缓存已过期 ({age / 3600:.1f}小时)，后台刷新")
+            if background:
+                self._refresh_in_background(exchange)
+            else:
+                return self.refresh(exchange)
+        return exchange.markets
+
+    # ---------- 杠杆档位 ----------
+
+    def leverage_tiers(self, exchange, symbol: str) -> List[Dict]:
+        """合约的杠杆档位 (未缓存或过期时拉取一次)"""
+        data = self.load() or {'fetched_at': time.time(), 'markets': {}, 'leverage_tiers': {}}
+        cached = data.get('leverage_tiers', {}).get(symbol)
+        if cached and time.time() - cached['fetched_at'] <= self.ttl:
+            return cached['tiers']
+
+        tiers = exchange.fetch_market_leverage_tiers(symbol)
+        with self._lock:
+            data = self.load() or data
+            data.setdefault('leverage_tiers', {})[symbol] = {'fetched_at': time.time(), 'tiers': tiers}
+            self._save(data)
+        return tiers
+
+
+_default_cache = MarketsCache()
+
+
+def load_markets_cached(exchange, path: Optional[str] = None, ttl: Optional[float] = None,
+                        background: bool = True) -> Optional[Dict]:
+    """load_markets 的缓存版本，默认所有脚本共用 data/markets/okx.json"""
+    cache = _default_cache if path is None and ttl is None else \
+        MarketsCache(path or DEFAULT_PATH, DEFAULT_TTL if ttl is None else ttl)
+    return cache.attach(exchange, background)
+
+
+def contract_spec(market: Dict) -> Dict:
+    """从 ccxt 市场信息中取出下单常用的合约规格
+
+    OKX 在 ccxt 中使用 TICK_SIZE 精度模式，precision 里就是最小变动单位。
+    """
+    limits = market.get('limits') or {}
+    precision = market.get('precision') or {}
+    return {
+        'symbol': market.get('symbol'),
+        'contract_size': market.get('contractSize') or 1.0,
+        'tick_size': precision.get('price'),
+        'amount_step': precision.get('amount'),
+        'min_amount': (limits.get('amount') or {}).get('min'),
+        'max_leverage': (limits.get('leverage') or {}).get('max'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='交易所市场信息缓存')
+    parser.add_argument('command', choices=['refresh', 'info'])
+    parser.add_argument('--symbol', default='BTC/USDT:USDT')
+    parser.add_argument('--path', default=DEFAULT_PATH)
+    parser.add_argument('--config', default='config/final_config.json')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    import ccxt
+    from market_data_hub import okx_config
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+    exchange = ccxt.okx(okx_config(config))
+    cache = MarketsCache(args.path)
+
+    if args.command == 'refresh':
+        cache.refresh(exchange)
+    else:
+        start = time.perf_counter()
+        cache.attach(exchange, background=False)
+        print(f"📦 {args.path}: {len(exchange.markets)} 个交易对, 缓存 {cache.age() / 60:.0f} 分钟前更新, "
+              f"加载耗时 {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    spec = contract_spec(exchange.market(args.symbol))
+    print(f"   {args.symbol}: 合约乘数 {spec['contract_size']}, 最小变动 {spec['tick_size']}, "
+          f"最小下单 {spec['min_amount']}张, 最大杠杆 {spec['max_leverage']}x")
+    try:
+        tiers = cache.leverage_tiers(exchange, args.symbol)
+        print(f"   杠杆档位: {len(tiers)} 档, 第一档最大杠杆 {tiers[0].get('maxLeverage') if tiers else 'N/A'}x")
+    except Exception as e:
+        print(f"   获取杠杆档位失败: {e}")
+
+
+if __name__ == '__main__':
+    main()
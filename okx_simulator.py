@@ -0,0 +1,601 @@
+#!/usr/bin/env python3
+"""
+OKX 离线模拟交易所 - 用本地K线归档驱动，实现各脚本用到的 ccxt 接口子集
+行情、下单、持仓、余额、成交记录都在本地计算，可配置请求延迟、手续费、滑点、
+合约乘数 (默认 0.01 BTC/张) 和保证金/强平模型。
+
+时间是模拟的: 每次请求按设定延迟推进时钟，time.sleep 直接推进时钟而不真正等待，
+因此交易器可以不做任何修改、以全速跑完一段历史行情。
+
+用法:
+    python candle_store.py sync --symbol BTC/USDT:USDT --timeframe 1m --days 7
+    python okx_simulator.py ultra_fast_trader.UltraFastTrader --days 3 --balance 100
+
+    # 代码中
+    sim = OKXSimulator(CandleStore(), start_ms=..., end_ms=...)
+    with simulate(sim):
+        trader = UltraFastTrader()   # 内部的 ccxt.okx(...) 得到的是 sim
+        trader.run()
+"""
+
+import time
+import logging
+import argparse
+import importlib
+import itertools
+import contextlib
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from candle_buffer import timeframe_to_ms
+from candle_resampler import resample_ohlcv
+from candle_store import CandleStore, DAY_MS
+from market_data_hub import hub_disabled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYMBOL = 'BTC/USDT:USDT'
+
+
+class SimulationFinished(KeyboardInterrupt):
+    """归档行情已回放完毕
+
+    继承 KeyboardInterrupt，交易器主循环中已有的"用户中断"处理会让它正常退出。
+    """
+
+
+class OKXSimulator:
+    """与 ccxt.okx 方法名、参数和返回格式一致的本地模拟交易所
+
+    单向持仓 (净头寸)，全仓保证金: 可用 = 权益 - 持仓占用保证金。
+    行情只暴露当前时刻之前已收盘的基础K线，正在形成的K线以开盘价表示，不会看到未来数据。
+    """
+
+    id = 'okx'
+
+    def __init__(self, store: Optional[CandleStore] = None, symbol: str = DEFAULT_SYMBOL,
+                 base_timeframe: str = '1m', start_ms: Optional[int] = None,
+                 end_ms: Optional[int] = None, balance: float = 100.0,
+                 contract_size: float = 0.01, taker_fee: float = 0.0005, maker_fee: float = 0.0002,
+                 slippage: float = 0.0001, latency: float = 0.05, default_leverage: int = 10,
+                 maintenance_margin_rate: float = 0.004, warmup_days: float = 2):
+        self.store = store or CandleStore()
+        self.symbol = symbol
+        self.base_timeframe = base_timeframe
+        self.base_ms = timeframe_to_ms(base_timeframe)
+        self.contract_size = contract_size
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+        self.slippage = slippage
+        self.latency = latency
+        self.maintenance_margin_rate = maintenance_margin_rate
+        self.enableRateLimit = False
+
+        arrays = self.store.load(symbol, base_timeframe)
+        self._ts = np.asarray(arrays['timestamp'], dtype=np.int64)
+        if len(self._ts) == 0:
+            raise ValueError(f"本地没有 {symbol} {base_timeframe} 的K线，请先运行 candle_store.py sync")
+        self._ohlcv = np.column_stack([self._ts] + [np.asarray(arrays[c]) for c in
+                                                    ('open', 'high', 'low', 'close', 'volume')])
+
+        first, last = int(self._ts[0]), int(self._ts[-1]) + self.base_ms
+        self.start_ms = start_ms if start_ms is not None else min(first + int(warmup_days * DAY_MS), last)
+        self.end_ms = min(end_ms, last) if end_ms is not None else last
+        self.now_ms = self.start_ms
+        self._cursor = self._completed_count(self.now_ms)
+
+        # 账户状态
+        self.initial_balance = balance
+        self.wallet = balance
+        self.leverage = default_leverage
+        self.contracts = 0.0          # 带符号: 多为正，空为负
+        self.entry_price = 0.0
+        self.orders: Dict[str, Dict] = {}
+        self.trades: List[Dict] = []
+        self._ids = itertools.count(1)
+        self.stats = {'requests': 0, 'orders': 0, 'liquidations': 0, 'fees': 0.0, 'realized_pnl': 0.0}
+
+        self.markets = {symbol: self._market_info()}
+
+    # ---------- 时钟 ----------
+
+    def milliseconds(self) -> int:
+        return self.now_ms
+
+    def time(self) -> float:
+        return self.now_ms / 1000
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+
+    def advance(self, seconds: float) -> None:
+        """推进模拟时钟，并撮合期间触及价格的限价单、检查强平"""
+        target = self.now_ms + int(seconds * 1000)
+        if target >= self.end_ms:
+            self.now_ms = self.end_ms
+            raise SimulationFinished(f"行情回放结束: {self.iso8601(self.end_ms)}")
+        new_cursor = self._completed_count(target)
+        if new_cursor > self._cursor:
+            self._process_bars(self._cursor, new_cursor)
+            self._cursor = new_cursor
+        self.now_ms = target
+
+    def _request(self) -> None:
+        self.stats['requests'] += 1
+        if self.latency:
+            self.advance(self.latency)
+
+    def _completed_count(self, now_ms: int) -> int:
+        """now_ms 时已收盘的基础K线数量"""
+        return int(np.searchsorted(self._ts, now_ms - self.base_ms, side='right'))
+
+    @staticmethod
+    def iso8601(ts_ms: Optional[int]) -> Optional[str]:
+        if ts_ms is None:
+            return None
+        return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+    # ---------- 行情 ----------
+
+    def _visible_base(self, start_ms: int) -> np.ndarray:
+        """start_ms 至今的基础K线: 已收盘的 + 正在形成的一根 (只知道开盘价)"""
+        lo = int(np.searchsorted(self._ts, start_ms, side='left'))
+        rows = self._ohlcv[lo:self._cursor]
+        if self._cursor < len(self._ts) and self._ts[self._cursor] <= self.now_ms:
+            forming = self._ohlcv[self._cursor].copy()
+            forming[2:5] = forming[1]
+            forming[5] = 0.0
+            rows = np.vstack([rows, forming])
+        return rows
+
+    def _last_price(self) -> float:
+        index = self._cursor if self._cursor < len(self._ts) and self._ts[self._cursor] <= self.now_ms \
+            else self._cursor - 1
+        if index < 0:
+            raise ValueError("模拟时间早于归档数据")
+        return float(self._ohlcv[index, 1] if index == self._cursor else self._ohlcv[index, 4])
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        self._check_symbol(symbol)
+        self._request()
+        tf_ms = timeframe_to_ms(timeframe)
+        limit = min(limit or 100, 300)
+        if since is None:
+            start = (self.now_ms // tf_ms - limit + 1) * tf_ms
+        else:
+            start = since // tf_ms * tf_ms
+        rows = self._visible_base(start)
+        if tf_ms != self.base_ms:
+            rows = resample_ohlcv(rows, timeframe, drop_partial_first=False)
+        if since is not None:
+            rows = rows[rows[:, 0] >= since][:limit]
+        else:
+            rows = rows[-limit:]
+        return [[int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5])] for r in rows]
+
+    def fetch_ticker(self, symbol, params={}):
+        self._check_symbol(symbol)
+        self._request()
+        day = self._visible_base(self.now_ms - DAY_MS)
+        last = self._last_price()
+        open_24h = float(day[0, 1]) if len(day) else last
+        tick = self.markets[symbol]['precision']['price']
+        return {
+            'symbol': symbol,
+            'timestamp': self.now_ms,
+            'datetime': self.iso8601(self.now_ms),
+            'high': float(day[:, 2].max()) if len(day) else last,
+            'low': float(day[:, 3].min()) if len(day) else last,
+            'bid': last - tick,
+            'ask': last + tick,
+            'open': open_24h,
+            'close': last,
+            'last': last,
+            'change': last - open_24h,
+            'percentage': (last / open_24h - 1) * 100 if open_24h else 0.0,
+            'baseVolume': float(day[:, 5].sum()) if len(day) else 0.0,
+            'quoteVolume': float((day[:, 5] * day[:, 4]).sum()) if len(day) else 0.0,
+            'info': {},
+        }
+
+    def fetch_trades(self, symbol, since=None, limit=None, params={}):
+        """归档中没有逐笔成交，返回空列表 (秒级K线聚合器会退回到分钟K线)"""
+        self._check_symbol(symbol)
+        self._request()
+        return []
+
+    # ---------- 市场信息 ----------
+
+    def _market_info(self) -> Dict:
+        base, quote = self.symbol.split(':')[0].split('/')
+        return {
+            'id': f'{base}-{quote}-SWAP',
+            'symbol': self.symbol,
+            'base': base,
+            'quote': quote,
+            'settle': quote,
+            'type': 'swap',
+            'swap': True,
+            'contract': True,
+            'linear': True,
+            'active': True,
+            'contractSize': self.contract_size,
+            'precision': {'amount': 0.01, 'price': 0.1},
+            'limits': {'amount': {'min': 0.01, 'max': None}, 'leverage': {'min': 1, 'max': 125}},
+            'taker': self.taker_fee,
+            'maker': self.maker_fee,
+            'info': {},
+        }
+
+    def load_markets(self, reload=False, params={}):
+        return self.markets
+
+    def market(self, symbol):
+        self._check_symbol(symbol)
+        return self.markets[symbol]
+
+    def _check_symbol(self, symbol) -> None:
+        if symbol is not None and symbol != self.symbol:
+            raise ValueError(f"模拟交易所只有 {self.symbol} 的数据: {symbol}")
+
+    # ---------- 账户 ----------
+
+    def _unrealized_pnl(self, price: float) -> float:
+        return self.contracts * self.contract_size * (price - self.entry_price)
+
+    def _initial_margin(self) -> float:
+        return abs(self.contracts) * self.contract_size * self.entry_price / self.leverage
+
+    def _liquidation_price(self) -> Optional[float]:
+        """全仓: 权益跌到维持保证金时的价格"""
+        if not self.contracts:
+            return None
+        qty = self.contracts * self.contract_size
+        maintenance = abs(qty) * self.entry_price * self.maintenance_margin_rate
+        return max(0.0, self.entry_price - (self.wallet - maintenance) / qty)
+
+    def set_leverage(self, leverage, symbol=None, params={}):
+        self._check_symbol(symbol)
+        self._request()
+        self.leverage = int(leverage)
+        return {'lever': str(self.leverage), 'instId': self.markets[self.symbol]['id']}
+
+    def set_margin_mode(self, marginMode, symbol=None, params={}):
+        self._request()
+        return {'marginMode': marginMode}
+
+    def fetch_balance(self, params={}):
+        self._request()
+        equity = self.wallet + self._unrealized_pnl(self._last_price())
+        used = self._initial_margin()
+        free = max(0.0, equity - used)
+        return {
+            'USDT': {'free': free, 'used': used, 'total': equity},
+            'free': {'USDT': free},
+            'used': {'USDT': used},
+            'total': {'USDT': equity},
+            'timestamp': self.now_ms,
+            'datetime': self.iso8601(self.now_ms),
+            'info': {},
+        }
+
+    def fetch_positions(self, symbols=None, params={}):
+        self._request()
+        if not self.contracts or (symbols and self.symbol not in symbols):
+            return []
+        mark = self._last_price()
+        notional = abs(self.contracts) * self.contract_size * mark
+        margin = self._initial_margin()
+        unrealized = self._unrealized_pnl(mark)
+        return [{
+            'symbol': self.symbol,
+            'side': 'long' if self.contracts > 0 else 'short',
+            'contracts': abs(self.contracts),
+            'contractSize': self.contract_size,
+            'entryPrice': self.entry_price,
+            'markPrice': mark,
+            'notional': notional,
+            'leverage': self.leverage,
+            'unrealizedPnl': unrealized,
+            'percentage': unrealized / margin * 100 if margin else 0.0,
+            'initialMargin': margin,
+            'maintenanceMargin': notional * self.maintenance_margin_rate,
+            'liquidationPrice': self._liquidation_price(),
+            'marginMode': 'cross',
+            'timestamp': self.now_ms,
+            'datetime': self.iso8601(self.now_ms),
+            'info': {},
+        }]
+
+    # ---------- 下单 ----------
+
+    def create_order(self, symbol, type, side, amount, price=None, params={}):
+        self._check_symbol(symbol)
+        self._request()
+        if side not in ('buy', 'sell'):
+            raise ValueError(f"无效的方向: {side}")
+        amount = float(amount)
+        if amount <= 0:
+            raise ValueError(f"无效的数量: {amount}")
+
+        order = self._new_order(symbol, type, side, amount, price, params)
+        self.stats['orders'] += 1
+
+        last = self._last_price()
+        if type == 'market':
+            fill_price = last * (1 + self.slippage if side == 'buy' else 1 - self.slippage)
+            self._fill(order, fill_price, 'taker')
+        elif type == 'limit':
+            if price is None:
+                raise ValueError("限价单需要价格")
+            # 可立即成交的限价单按吃单成交
+            if (side == 'buy' and price >= last) or (side == 'sell' and price <= last):
+                self._fill(order, last, 'taker')
+        else:
+            raise ValueError(f"不支持的订单类型: {type}")
+        return dict(order)
+
+    def create_market_order(self, symbol, side, amount, price=None, params={}):
+        return self.create_order(symbol, 'market', side, amount, None, params)
+
+    def create_market_buy_order(self, symbol, amount, params={}):
+        return self.create_order(symbol, 'market', 'buy', amount, None, params)
+
+    def create_market_sell_order(self, symbol, amount, params={}):
+        return self.create_order(symbol, 'market', 'sell', amount, None, params)
+
+    def create_limit_order(self, symbol, side, amount, price, params={}):
+        return self.create_order(symbol, 'limit', side, amount, price, params)
+
+    def create_limit_buy_order(self, symbol, amount, price, params={}):
+        return self.create_order(symbol, 'limit', 'buy', amount, price, params)
+
+    def create_limit_sell_order(self, symbol, amount, price, params={}):
+        return self.create_order(symbol, 'limit', 'sell', amount, price, params)
+
+    def cancel_order(self, id, symbol=None, params={}):
+        self._request()
+        order = self._get_order(id)
+        if order['status'] == 'open':
+            order['status'] = 'canceled'
+        return dict(order)
+
+    def _new_order(self, symbol, type, side, amount, price=None, params={}) -> Dict:
+        order_id = str(next(self._ids))
+        order = {
+            'id': order_id,
+            'clientOrderId': params.get('clOrdId'),
+            'timestamp': self.now_ms,
+            'datetime': self.iso8601(self.now_ms),
+            'lastTradeTimestamp': None,
+            'symbol': symbol,
+            'type': type,
+            'side': side,
+            'price': float(price) if price is not None else None,
+            'average': None,
+            'amount': amount,
+            'filled': 0.0,
+            'remaining': amount,
+            'cost': 0.0,
+            'status': 'open',
+            'fee': {'cost': 0.0, 'currency': 'USDT'},
+            'reduceOnly': bool(params.get('reduceOnly')),
+            'trades': [],
+            'info': {},
+        }
+        self.orders[order_id] = order
+        return order
+
+    def _fill(self, order: Dict, price: float, taker_or_maker: str, ts: Optional[int] = None) -> None:
+        ts = ts if ts is not None else self.now_ms
+        amount = order['remaining']
+        signed = amount if order['side'] == 'buy' else -amount
+        if order['reduceOnly']:
+            if self.contracts * signed >= 0:
+                order['status'] = 'canceled'
+                return
+            signed = np.sign(signed) * min(abs(signed), abs(self.contracts))
+            amount = abs(signed)
+
+        cost = amount * self.contract_size * price
+        fee = cost * (self.taker_fee if taker_or_maker == 'taker' else self.maker_fee)
+        realized = self._apply_fill(signed, price) - fee
+        self.wallet += realized
+        self.stats['fees'] += fee
+        self.stats['realized_pnl'] += realized + fee
+
+        trade = {
+            'id': f"{order['id']}-{len(order['trades']) + 1}",
+            'order': order['id'],
+            'timestamp': ts,
+            'datetime': self.iso8601(ts),
+            'symbol': order['symbol'],
+            'type': order['type'],
+            'side': order['side'],
+            'takerOrMaker': taker_or_maker,
+            'price': price,
+            'amount': amount,
+            'cost': cost,
+            'fee': {'cost': fee, 'currency': 'USDT'},
+            'info': {'pnl': realized + fee},
+        }
+        self.trades.append(trade)
+        order['trades'].append(trade)
+        order['filled'] += amount
+        order['remaining'] = 0.0
+        order['cost'] += cost
+        order['average'] = order['cost'] / (order['filled'] * self.contract_size)
+        order['price'] = order['price'] if order['type'] == 'limit' else order['average']
+        order['fee']['cost'] += fee
+        order['lastTradeTimestamp'] = ts
+        order['status'] = 'closed'
+
+    def _apply_fill(self, signed: float, price: float) -> float:
+        """更新净头寸，返回本次平仓部分的已实现盈亏 (不含手续费)"""
+        realized = 0.0
+        if self.contracts * signed >= 0:
+            total = self.contracts + signed
+            self.entry_price = (self.entry_price * abs(self.contracts) + price * abs(signed)) / abs(total)
+            self.contracts = total
+            return realized
+
+        closed = min(abs(signed), abs(self.contracts))
+        direction = np.sign(self.contracts)
+        realized = direction * closed * self.contract_size * (price - self.entry_price)
+        self.contracts += signed
+        if abs(self.contracts) < 1e-12:
+            self.contracts = 0.0
+            self.entry_price = 0.0
+        elif np.sign(self.contracts) != direction:
+            # 反手: 剩余部分以成交价开新仓
+            self.entry_price = price
+        return float(realized)
+
+    def _process_bars(self, lo: int, hi: int) -> None:
+        """撮合 [lo, hi) 这些新收盘K线触及的限价单，并检查强平"""
+        highs = self._ohlcv[lo:hi, 2]
+        lows = self._ohlcv[lo:hi, 3]
+        for order in list(self.orders.values()):
+            if order['status'] != 'open' or order['type'] != 'limit':
+                continue
+            if order['side'] == 'buy':
+                hit = np.flatnonzero(lows <= order['price'])
+            else:
+                hit = np.flatnonzero(highs >= order['price'])
+            if len(hit):
+                self._fill(order, order['price'], 'maker', int(self._ts[lo + hit[0]]) + self.base_ms)
+
+        liquidation = self._liquidation_price()
+        if liquidation is None:
+            return
+        if self.contracts > 0:
+            hit = np.flatnonzero(lows <= liquidation)
+        else:
+            hit = np.flatnonzero(highs >= liquidation)
+        if len(hit):
+            logger.warning(f"💥 模拟强平: {self.contracts}张 @ {liquidation:.2f}")
+            side = 'sell' if self.contracts > 0 else 'buy'
+            order = self._new_order(self.symbol, 'market', side, abs(self.contracts), params={'reduceOnly': True})
+            order['info']['liquidation'] = True
+            ts = int(self._ts[lo + hit[0]]) + self.base_ms
+            self._fill(order, liquidation, 'taker', ts)
+            self.stats['liquidations'] += 1
+
+    # ---------- 订单/成交查询 ----------
+
+    def _get_order(self, id) -> Dict:
+        order = self.orders.get(str(id))
+        if order is None:
+            raise ValueError(f"订单不存在: {id}")
+        return order
+
+    def fetch_order(self, id, symbol=None, params={}):
+        self._request()
+        return dict(self._get_order(id))
+
+    def _select_orders(self, statuses, symbol, since, limit) -> List[Dict]:
+        self._check_symbol(symbol)
+        orders = [dict(o) for o in self.orders.values() if o['status'] in statuses
+                  and (since is None or o['timestamp'] >= since)]
+        return orders[-limit:] if limit else orders
+
+    def fetch_orders(self, symbol=None, since=None, limit=None, params={}):
+        self._request()
+        return self._select_orders(('open', 'closed', 'canceled'), symbol, since, limit)
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params={}):
+        self._request()
+        return self._select_orders(('open',), symbol, since, limit)
+
+    def fetch_closed_orders(self, symbol=None, since=None, limit=None, params={}):
+        self._request()
+        return self._select_orders(('closed', 'canceled'), symbol, since, limit)
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None, params={}):
+        self._check_symbol(symbol)
+        self._request()
+        trades = [t for t in self.trades if since is None or t['timestamp'] >= since]
+        return trades[-limit:] if limit else trades
+
+    def close(self):
+        pass
+
+    # ---------- 汇总 ----------
+
+    def summary(self) -> Dict:
+        equity = self.wallet + self._unrealized_pnl(self._last_price())
+        return {
+            'start': self.iso8601(self.start_ms),
+            'now': self.iso8601(self.now_ms),
+            'initial_balance': self.initial_balance,
+            'equity': equity,
+            'return': equity / self.initial_balance - 1,
+            'trades': len(self.trades),
+            **self.stats,
+        }
+
+
+@contextlib.contextmanager
+def simulate(simulator: OKXSimulator):
+    """在上下文中把 ccxt.okx 和 time.time/time.monotonic/time.sleep 替换为模拟器
+
+    交易器代码无需修改: 创建交易所时拿到模拟器，sleep 时推进模拟时钟。
+    本机数据中心在线时 create_exchange 也不连接它，所有请求都由模拟器应答。
+    """
+    import ccxt
+
+    originals = (ccxt.okx, time.time, time.monotonic, time.sleep)
+    ccxt.okx = lambda *args, **kwargs: simulator
+    time.time = simulator.time
+    time.monotonic = simulator.time
+    time.sleep = simulator.sleep
+    try:
+        with hub_disabled():
+            yield simulator
+    finally:
+        ccxt.okx, time.time, time.monotonic, time.sleep = originals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='用本地K线归档离线运行交易器')
+    parser.add_argument('trader', help='交易器类, 例如 ultra_fast_trader.UltraFastTrader')
+    parser.add_argument('--method', default='run')
+    parser.add_argument('--symbol', default=DEFAULT_SYMBOL)
+    parser.add_argument('--timeframe', default='1m', help='驱动模拟的基础K线周期')
+    parser.add_argument('--start', help='开始日期 YYYY-MM-DD (默认归档开始后2天)')
+    parser.add_argument('--days', type=float, help='模拟天数 (默认直到归档结束)')
+    parser.add_argument('--balance', type=float, default=100.0)
+    parser.add_argument('--latency', type=float, default=0.05, help='每次请求的模拟延迟 (秒)')
+    parser.add_argument('--root', default='data/candles')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    start_ms = None
+    if args.start:
+        start_ms = int(datetime.strptime(args.start, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp() * 1000)
+    sim = OKXSimulator(CandleStore(args.root), args.symbol, args.timeframe, start_ms=start_ms,
+                       balance=args.balance, latency=args.latency)
+    if args.days:
+        sim.end_ms = min(sim.end_ms, sim.start_ms + int(args.days * DAY_MS))
+
+    module_name, class_name = args.trader.rsplit('.', 1)
+    wall_start = time.perf_counter()
+    with simulate(sim):
+        trader = getattr(importlib.import_module(module_name), class_name)()
+        try:
+            getattr(trader, args.method)()
+        except SimulationFinished as e:
+            logger.info(str(e))
+    elapsed = time.perf_counter() - wall_start
+
+    summary = sim.summary()
+    print(f"\n📊 模拟结果 ({summary['start']} → {summary['now']}, 实际耗时 {elapsed:.1f}秒)")
+    print(f"   权益: ${summary['initial_balance']:.2f} → ${summary['equity']:.2f} ({summary['return']:+.2%})")
+    print(f"   请求: {summary['requests']}次, 订单: {summary['orders']}笔, 成交: {summary['trades']}笔")
+    print(f"   手续费: ${summary['fees']:.4f}, 强平: {summary['liquidations']}次")
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,9 @@ from datetime import datetime
 import logging
 import os
 
+from candle_buffer import CandleFeed
+from order_book_store import estimate_market_fill
+
 class OptimizedAutonomousTrader:
     def __init__(self):
         """初始化优化版交易系统"""
@@ -32,6 +35,8 @@ class OptimizedAutonomousTrader:
         })
         
         self.symbol = 'BTC/USDT:USDT'
+        # K线环形缓冲区，首次完整获取后只增量拉取最新K线
+        self.candles = CandleFeed(self.exchange, self.symbol, {'15m': 100})
         self.contract_multiplier = 0.01
         
         # 🎯 优化后的策略参数
@@ -121,8 +126,7 @@ class OptimizedAutonomousTrader:
         """分析市场"""
         try:
             # 获取K线数据
-            ohlcv = self.exchange.fetch_ohlcv(self.symbol, '15m', limit=100)
-            closes = np.array([c[4] for c in ohlcv])
+            closes = self.candles.refresh('15m').closes
             
             # 计算技术指标
             sma_20 = np.mean(closes[-20:])
@@ -312,18 +316,23 @@ class OptimizedAutonomousTrader:
                        min(contracts, self.params['max_position_size']))
         contracts = round(contracts * 100) / 100
         
+        # 按盘口深度估算市价单成交均价，止盈止损以此为基准
+        side = 'buy' if signal['direction'] == 'LONG' else 'sell'
+        entry_price, slippage_pct = estimate_market_fill(self.exchange, self.symbol, side, contracts, current_price)
+        
         # 计算止盈止损价格
         if signal['direction'] == 'LONG':
-            stop_loss_price = current_price * (1 - stop_loss_pct / 100)
-            take_profit_price = current_price * (1 + take_profit_pct / 100)
+            stop_loss_price = entry_price * (1 - stop_loss_pct / 100)
+            take_profit_price = entry_price * (1 + take_profit_pct / 100)
         else:
-            stop_loss_price = current_price * (1 + stop_loss_pct / 100)
-            take_profit_price = current_price * (1 - take_profit_pct / 100)
+            stop_loss_price = entry_price * (1 + stop_loss_pct / 100)
+            take_profit_price = entry_price * (1 - take_profit_pct / 100)
         
         trade_params = {
             'contracts': contracts,
             'leverage': leverage,
-            'entry_price': current_price,
+            'entry_price': entry_price,
+            'expected_slippage_pct': slippage_pct,
             'stop_loss_price': stop_loss_price,
             'take_profit_price': take_profit_price,
             'stop_loss_pct': stop_loss_pct,
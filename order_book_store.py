@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+盘口快照归档与向量化滑点估算
+按交易对/日期分区保存 L2 盘口快照: <日期>.ts.npy (int64 毫秒) 和
+<日期>.bids.npy / <日期>.asks.npy (float64, N×深度×2，[价格, 张数]，不足深度的档位补 NaN/0)。
+估算市价单成交均价时一次性对所有快照按档位累加，不需要逐单在 Python 里遍历盘口。
+
+用法:
+    python order_book_store.py collect --symbol BTC/USDT:USDT --interval 1 --hours 24
+    python order_book_store.py info --symbol BTC/USDT:USDT
+
+    books = OrderBookStore().load('BTC/USDT:USDT')
+    avg_price, filled = fill_prices(books['asks'], 50)        # 每个快照买入50张的成交均价
+    model = SlippageModel.from_store(OrderBookStore(), 'BTC/USDT:USDT')
+    price = model.fill_price(ts_ms, 'buy', 50, close)        # 回测中的实际开仓价
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Union
+
+from candle_store import DAY_MS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = 'data/orderbooks'
+DEFAULT_DEPTH = 50
+
+
+def book_to_array(levels: List[list], depth: int = DEFAULT_DEPTH) -> np.ndarray:
+    """ccxt 盘口的一侧 [[价格, 数量], ...] → (depth, 2) 数组，不足的档位价格为 NaN、数量为 0"""
+    side = np.zeros((depth, 2), dtype=np.float64)
+    side[:, 0] = np.nan
+    if levels:
+        rows = np.asarray([level[:2] for level in levels[:depth]], dtype=np.float64)
+        side[:len(rows)] = rows
+    return side
+
+
+# ---------- 向量化滑点估算 ----------
+
+def fill_prices(levels: np.ndarray, amounts: Union[float, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """按盘口逐档吃单估算成交均价
+
+    levels: (N, depth, 2) 一侧盘口 (买入用 asks，卖出用 bids)，档位按由优到劣排列
+    amounts: 每个快照要成交的张数，标量或 (N,)
+    返回 (成交均价 (N,), 实际可成交张数 (N,))；深度不足时均价只按可成交部分计算
+    """
+    levels = np.asarray(levels, dtype=np.float64)
+    if levels.ndim == 2:
+        levels = levels[np.newaxis]
+    prices = levels[:, :, 0]
+    sizes = levels[:, :, 1]
+    amounts = np.broadcast_to(np.asarray(amounts, dtype=np.float64), (levels.shape[0],))
+
+    before = np.cumsum(sizes, axis=1) - sizes                       # 每档之前已累计的数量
+    taken = np.clip(amounts[:, np.newaxis] - before, 0.0, sizes)    # 每档实际吃掉的数量
+    filled = taken.sum(axis=1)
+    cost = np.nansum(taken * prices, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        average = np.where(filled > 0, cost / filled, prices[:, 0])
+    return average, filled
+
+
+def slippage_rates(bids: np.ndarray, asks: np.ndarray, side: str,
+                   amounts: Union[float, np.ndarray]) -> np.ndarray:
+    """相对中间价的滑点 (比例，正数表示成本)，(N,)"""
+    bids = np.asarray(bids, dtype=np.float64)
+    asks = np.asarray(asks, dtype=np.float64)
+    if bids.ndim == 2:
+        bids, asks = bids[np.newaxis], asks[np.newaxis]
+    mid = (bids[:, 0, 0] + asks[:, 0, 0]) / 2
+    if side == 'buy':
+        average, _ = fill_prices(asks, amounts)
+        return average / mid - 1
+    average, _ = fill_prices(bids, amounts)
+    return 1 - average / mid
+
+
+def estimate_market_fill(exchange, symbol: str, side: str, contracts: float,
+                         fallback_price: float, depth: int = DEFAULT_DEPTH) -> Tuple[float, float]:
+    """实盘下单前按当前盘口估算市价单成交均价，返回 (均价, 滑点百分比)
+
+    获取盘口失败或对应一侧盘口为空时返回 (fallback_price, 0.0)，不影响下单流程。
+    """
+    try:
+        book = exchange.fetch_order_book(symbol, limit=depth)
+    except Exception as e:
+        logger.warning(f"获取盘口失败，按当前价估算: {e}")
+        return fallback_price, 0.0
+    bids, asks = book_to_array(book.get('bids') or [], depth), book_to_array(book.get('asks') or [], depth)
+    average, filled = fill_prices(asks if side == 'buy' else bids, contracts)
+    if filled[0] == 0 or not np.isfinite(average[0]):
+        logger.warning(f"{'卖' if side == 'buy' else '买'}盘为空，按当前价估算")
+        return fallback_price, 0.0
+    if filled[0] < contracts:
+        logger.warning(f"盘口前{depth}档只能成交 {filled[0]:.2f}/{contracts} 张")
+    slippage = slippage_rates(bids, asks, side, contracts)[0]
+    return float(average[0]), float(slippage * 100) if np.isfinite(slippage) else 0.0
+
+
+class SlippageModel:
+    """回测用滑点模型: 取不晚于成交时刻的最近一个盘口快照，按相对中间价的滑点调整成交价
+
+    没有快照 (或快照过旧)、或盘口单边为空算不出中间价的时刻使用 default_bps。
+    """
+
+    def __init__(self, timestamps: np.ndarray, bids: np.ndarray, asks: np.ndarray,
+                 default_bps: float = 2.0, max_age_ms: int = 5 * 60 * 1000):
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.bids = bids
+        self.asks = asks
+        self.default_rate = default_bps / 10000
+        self.max_age_ms = max_age_ms
+
+    @classmethod
+    def from_store(cls, store: 'OrderBookStore', symbol: str,
+                   start_ms: Optional[int] = None, end_ms: Optional[int] = None, **kwargs) -> 'SlippageModel':
+        books = store.load(symbol, start_ms, end_ms)
+        return cls(books['timestamp'], books['bids'], books['asks'], **kwargs)
+
+    def rates(self, timestamps, side: str, contracts) -> np.ndarray:
+        """一批成交时刻的滑点比例 (N,)"""
+        timestamps = np.atleast_1d(np.asarray(timestamps, dtype=np.int64))
+        contracts = np.broadcast_to(np.asarray(contracts, dtype=np.float64), timestamps.shape)
+        rates = np.full(timestamps.shape, self.default_rate)
+        if len(self.timestamps) == 0:
+            return rates
+
+        index = np.searchsorted(self.timestamps, timestamps, side='right') - 1
+        valid = (index >= 0) & (timestamps - self.timestamps[np.maximum(index, 0)] <= self.max_age_ms)
+        if valid.any():
+            snap = index[valid]
+            rates[valid] = slippage_rates(self.bids[snap], self.asks[snap], side, contracts[valid])
+        rates[~np.isfinite(rates)] = self.default_rate
+        return rates
+
+    def fill_price(self, timestamp: int, side: str, contracts: float, price: float) -> float:
+        """单笔成交价: 买入上浮、卖出下调"""
+        rate = float(self.rates(timestamp, side, contracts)[0])
+        return price * (1 + rate) if side == 'buy' else price * (1 - rate)
+
+
+# ---------- 存储 ----------
+
+class OrderBookStore:
+    """按交易对/日期分区的盘口快照仓库"""
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+
+    def symbol_dir(self, symbol: str) -> str:
+        return os.path.join(self.root, symbol.replace('/', '-').replace(':', '_'))
+
+    def _paths(self, symbol_dir: str, day: str) -> Dict[str, str]:
+        return {name: os.path.join(symbol_dir, f'{day}.{name}.npy') for name in ('ts', 'bids', 'asks')}
+
+    @staticmethod
+    def _day_key(ts_ms: int) -> str:
+        return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+    def partitions(self, symbol: str) -> List[str]:
+        symbol_dir = self.symbol_dir(symbol)
+        if not os.path.isdir(symbol_dir):
+            return []
+        return sorted(name[:-len('.ts.npy')] for name in os.listdir(symbol_dir) if name.endswith('.ts.npy'))
+
+    def write(self, symbol: str, timestamps: np.ndarray, bids: np.ndarray, asks: np.ndarray) -> int:
+        """追加一批快照 (同一时间戳以新数据为准)，返回写入的快照数"""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if len(timestamps) == 0:
+            return 0
+        symbol_dir = self.symbol_dir(symbol)
+        os.makedirs(symbol_dir, exist_ok=True)
+
+        days = timestamps // DAY_MS
+        for day in np.unique(days):
+            mask = days == day
+            arrays = {'ts': timestamps[mask], 'bids': bids[mask], 'asks': asks[mask]}
+            paths = self._paths(symbol_dir, self._day_key(int(day) * DAY_MS))
+
+            if os.path.exists(paths['ts']):
+                old = {name: np.load(path) for name, path in paths.items()}
+                if old['bids'].shape[1:] != arrays['bids'].shape[1:]:
+                    raise ValueError(f"盘口深度不一致: {old['bids'].shape[1]} != {arrays['bids'].shape[1]}")
+                arrays = {name: np.concatenate([old[name], arrays[name]]) for name in arrays}
+
+            _, last_idx = np.unique(arrays['ts'][::-1], return_index=True)
+            keep = len(arrays['ts']) - 1 - last_idx
+            for name, path in paths.items():
+                tmp = path + '.tmp.npy'
+                np.save(tmp, np.ascontiguousarray(arrays[name][keep]))
+                os.replace(tmp, path)
+        return len(timestamps)
+
+    def load(self, symbol: str, start_ms: Optional[int] = None,
+             end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """读取 [start_ms, end_ms) 的快照: {'timestamp': (N,), 'bids': (N, depth, 2), 'asks': ...}"""
+        symbol_dir = self.symbol_dir(symbol)
+        start_key = self._day_key(start_ms) if start_ms is not None else None
+        end_key = self._day_key(end_ms - 1) if end_ms is not None else None
+
+        parts = {'ts': [], 'bids': [], 'asks': []}
+        for day_key in self.partitions(symbol):
+            if (start_key and day_key < start_key) or (end_key and day_key > end_key):
+                continue
+            for name, path in self._paths(symbol_dir, day_key).items():
+                parts[name].append(np.load(path, mmap_mode='r'))
+
+        if not parts['ts']:
+            empty = np.empty((0, DEFAULT_DEPTH, 2), dtype=np.float64)
+            return {'timestamp': np.empty(0, dtype=np.int64), 'bids': empty, 'asks': empty}
+        arrays = {name: arrays_[0] if len(arrays_) == 1 else np.concatenate(arrays_)
+                  for name, arrays_ in parts.items()}
+
+        timestamps = arrays['ts']
+        lo = 0 if start_ms is None else int(np.searchsorted(timestamps, start_ms, side='left'))
+        hi = len(timestamps) if end_ms is None else int(np.searchsorted(timestamps, end_ms, side='left'))
+        return {'timestamp': timestamps[lo:hi], 'bids': arrays['bids'][lo:hi], 'asks': arrays['asks'][lo:hi]}
+
+
+class OrderBookCollector:
+    """定时拉取盘口快照，攒够一批后写入归档"""
+
+    def __init__(self, exchange, symbol: str, store: Optional[OrderBookStore] = None,
+                 depth: int = DEFAULT_DEPTH, flush_every: int = 60):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.store = store or OrderBookStore()
+        self.depth = depth
+        self.flush_every = flush_every
+        self._pending: List[Tuple[int, np.ndarray, np.ndarray]] = []
+        self.stats = {'snapshots': 0, 'errors': 0}
+
+    def snapshot(self) -> None:
+        book = self.exchange.fetch_order_book(self.symbol, limit=self.depth)
+        ts = book.get('timestamp') or int(time.time() * 1000)
+        self._pending.append((ts, book_to_array(book['bids'], self.depth), book_to_array(book['asks'], self.depth)))
+        self.stats['snapshots'] += 1
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        timestamps = np.array([p[0] for p in self._pending], dtype=np.int64)
+        bids = np.stack([p[1] for p in self._pending])
+        asks = np.stack([p[2] for p in self._pending])
+        self.store.write(self.symbol, timestamps, bids, asks)
+        self._pending = []
+
+    def run(self, interval: float = 1.0, duration: Optional[float] = None) -> None:
+        deadline = time.time() + duration if duration else None
+        try:
+            while deadline is None or time.time() < deadline:
+                started = time.time()
+                try:
+                    self.snapshot()
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.error(f"获取盘口失败: {e}")
+                time.sleep(max(0.0, interval - (time.time() - started)))
+        except KeyboardInterrupt:
+            logger.info("🛑 用户中断，停止采集")
+        finally:
+            self.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='盘口快照归档')
+    parser.add_argument('command', choices=['collect', 'info'])
+    parser.add_argument('--symbol', default='BTC/USDT:USDT')
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH)
+    parser.add_argument('--interval', type=float, default=1.0, help='采集间隔 (秒)')
+    parser.add_argument('--hours', type=float, help='采集时长，默认一直运行')
+    parser.add_argument('--root', default=DEFAULT_ROOT)
+    parser.add_argument('--config', default='config/survival_config.json')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = OrderBookStore(args.root)
+
+    if args.command == 'collect':
+        import ccxt
+
+        exchange_config = {'enableRateLimit': True, 'options': {'defaultType': 'swap'}}
+        if os.path.exists(args.config):
+            with open(args.config, 'r') as f:
+                config = json.load(f)
+            if 'proxies' in config.get('exchange', {}):
+                exchange_config['proxies'] = config['exchange']['proxies']
+        collector = OrderBookCollector(ccxt.okx(exchange_config), args.symbol, store, args.depth)
+        print(f"📚 开始采集 {args.symbol} 盘口 (前{args.depth}档, 每{args.interval}秒)")
+        collector.run(args.interval, args.hours * 3600 if args.hours else None)
+        print(f"✅ 采集结束: {collector.stats}")
+
+    books = store.load(args.symbol)
+    timestamps = books['timestamp']
+    print(f"📦 {args.symbol}: {len(timestamps)} 个快照, {len(store.partitions(args.symbol))} 个日分区")
+    if len(timestamps):
+        spread = (books['asks'][:, 0, 0] - books['bids'][:, 0, 0]).mean()
+        print(f"   时间范围: {datetime.fromtimestamp(timestamps[0] / 1000)} 至 {datetime.fromtimestamp(timestamps[-1] / 1000)}")
+        print(f"   平均价差: {spread:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+永续合约资金费率与标记价格历史
+资金费率: <root>/<交易对>/funding.ts.npy + funding.rate.npy (列式，按时间升序)
+标记价格: 标记价格K线复用 CandleStore 的日分区格式，存放在 <root>/mark 下
+
+回测时先用 align_to_bars 一次性把两者对齐到K线 (预先计算索引)，
+之后资金费用和按标记价格的强平检查都是数组运算，不需要逐根K线查找。
+
+用法:
+    python perp_history.py sync --symbol BTC/USDT:USDT --timeframe 15m --days 30
+
+    perp = PerpHistory().align_to_bars('BTC/USDT:USDT', bar_timestamps, '15m')
+    funding = funding_payments(signed_notional, perp.funding_rate)
+    liquidated = liquidation_mask(direction, entry_price, leverage, perp.mark_high, perp.mark_low)
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+import numpy as np
+from typing import Dict, Optional
+
+from candle_buffer import timeframe_to_ms
+from candle_store import CandleStore, DAY_MS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = 'data/perp'
+FUNDING_INTERVAL_MS = 8 * 3600 * 1000      # OKX 永续合约每 8 小时结算一次资金费用
+
+
+class _MarkPriceSource:
+    """把 fetch_ohlcv 转成 fetch_mark_ohlcv，供 CandleStore.sync 下载标记价格K线"""
+
+    def __init__(self, exchange):
+        self._exchange = exchange
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        return self._exchange.fetch_mark_ohlcv(symbol, timeframe, since, limit, params)
+
+    @property
+    def enableRateLimit(self):
+        return getattr(self._exchange, 'enableRateLimit', False)
+
+    @enableRateLimit.setter
+    def enableRateLimit(self, value):
+        self._exchange.enableRateLimit = value
+
+
+class PerpBars:
+    """对齐到K线的永续合约数据，所有数组长度与K线相同
+
+    funding_rate[i] 为第 i 根K线内结算的资金费率 (无结算为 0)；
+    mark_* 为同一开盘时间的标记价格K线 (缺失时退回成交价K线)。
+    """
+
+    def __init__(self, funding_rate: np.ndarray, mark_open: np.ndarray, mark_high: np.ndarray,
+                 mark_low: np.ndarray, mark_close: np.ndarray):
+        self.funding_rate = funding_rate
+        self.mark_open = mark_open
+        self.mark_high = mark_high
+        self.mark_low = mark_low
+        self.mark_close = mark_close
+
+
+class PerpHistory:
+    """资金费率与标记价格的本地归档"""
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+        self.mark_store = CandleStore(os.path.join(root, 'mark'))
+
+    def _funding_paths(self, symbol: str):
+        symbol_dir = os.path.join(self.root, symbol.replace('/', '-').replace(':', '_'))
+        return (symbol_dir,
+                os.path.join(symbol_dir, 'funding.ts.npy'),
+                os.path.join(symbol_dir, 'funding.rate.npy'))
+
+    # ---------- 资金费率 ----------
+
+    def load_funding(self, symbol: str, start_ms: Optional[int] = None,
+                     end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """返回 {'timestamp': int64 结算时间, 'rate': float64 资金费率}"""
+        _, ts_path, rate_path = self._funding_paths(symbol)
+        if not os.path.exists(ts_path):
+            return {'timestamp': np.empty(0, dtype=np.int64), 'rate': np.empty(0, dtype=np.float64)}
+        timestamps = np.load(ts_path, mmap_mode='r')
+        rates = np.load(rate_path, mmap_mode='r')
+        lo = 0 if start_ms is None else int(np.searchsorted(timestamps, start_ms, side='left'))
+        hi = len(timestamps) if end_ms is None else int(np.searchsorted(timestamps, end_ms, side='left'))
+        return {'timestamp': timestamps[lo:hi], 'rate': rates[lo:hi]}
+
+    def write_funding(self, symbol: str, timestamps, rates) -> int:
+        """合并写入资金费率 (同一结算时间以新数据为准)"""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        rates = np.asarray(rates, dtype=np.float64)
+        if len(timestamps) == 0:
+            return 0
+        symbol_dir, ts_path, rate_path = self._funding_paths(symbol)
+        os.makedirs(symbol_dir, exist_ok=True)
+        if os.path.exists(ts_path):
+            timestamps = np.concatenate([np.load(ts_path), timestamps])
+            rates = np.concatenate([np.load(rate_path), rates])
+
+        _, last_idx = np.unique(timestamps[::-1], return_index=True)
+        keep = len(timestamps) - 1 - last_idx
+        for path, array in ((ts_path, timestamps[keep]), (rate_path, rates[keep])):
+            tmp = path + '.tmp.npy'
+            np.save(tmp, array)
+            os.replace(tmp, path)
+        return len(keep)
+
+    def sync_funding(self, exchange, symbol: str, start_ms: int,
+                     end_ms: Optional[int] = None, limit: int = 100) -> int:
+        """从最后一次已存的结算时间开始向后补齐资金费率，返回新写入的条数"""
+        if end_ms is None:
+            end_ms = int(time.time() * 1000)
+        stored = self.load_funding(symbol)['timestamp']
+        since = max(start_ms, int(stored[-1]) + 1) if len(stored) else start_ms
+
+        written = 0
+        while since < end_ms:
+            try:
+                history = exchange.fetch_funding_rate_history(symbol, since=since, limit=limit)
+            except Exception as e:
+                logger.error(f"获取资金费率失败: {e}")
+                break
+            history = [h for h in history if h.get('timestamp') is not None and h['timestamp'] >= since]
+            if not history:
+                break
+            written += self.write_funding(symbol, [h['timestamp'] for h in history],
+                                          [h['fundingRate'] for h in history])
+            since = history[-1]['timestamp'] + 1
+        logger.info(f"同步 {symbol} 资金费率: 新增{written}条")
+        return written
+
+    # ---------- 标记价格 ----------
+
+    def sync_mark(self, exchange, symbol: str, timeframe: str, start_ms: int,
+                  end_ms: Optional[int] = None) -> Dict:
+        return self.mark_store.sync(_MarkPriceSource(exchange), symbol, timeframe, start_ms, end_ms)
+
+    def sync(self, exchange, symbol: str, timeframe: str, days: int) -> None:
+        end_ms = int(time.time() * 1000)
+        start_ms = end_ms - days * DAY_MS
+        self.sync_funding(exchange, symbol, start_ms, end_ms)
+        self.sync_mark(exchange, symbol, timeframe, start_ms, end_ms)
+
+    # ---------- 对齐 ----------
+
+    def align_to_bars(self, symbol: str, bar_timestamps, timeframe: str,
+                      closes=None, highs=None, lows=None, opens=None) -> PerpBars:
+        """把资金费率和标记价格对齐到K线 (bar_timestamps 为K线开盘时间，毫秒)
+
+        closes/highs/lows/opens 传入成交价K线时，缺失标记价格的位置用它们填充。
+        """
+        bar_ts = np.asarray(bar_timestamps, dtype=np.int64)
+        n = len(bar_ts)
+        bar_ms = timeframe_to_ms(timeframe)
+        if n == 0:
+            empty = np.empty(0, dtype=np.float64)
+            return PerpBars(empty, empty, empty, empty, empty)
+        start_ms, end_ms = int(bar_ts[0]), int(bar_ts[-1]) + bar_ms
+
+        # 资金费率: 每个结算时间落在哪根K线 [开盘, 开盘+周期)
+        funding = self.load_funding(symbol, start_ms, end_ms)
+        funding_rate = np.zeros(n, dtype=np.float64)
+        index = np.searchsorted(bar_ts, funding['timestamp'], side='right') - 1
+        valid = (index >= 0) & (funding['timestamp'] < bar_ts[np.maximum(index, 0)] + bar_ms)
+        np.add.at(funding_rate, index[valid], np.asarray(funding['rate'])[valid])
+        if not valid.any() and end_ms - start_ms >= FUNDING_INTERVAL_MS:
+            logger.warning(f"{symbol} {timeframe} K线范围内没有资金费率记录，回测不计资金费用 "
+                           f"(先运行 python perp_history.py sync)")
+
+        # 标记价格: 同周期K线按开盘时间对齐，缺失时用成交价
+        mark = self.mark_store.load(symbol, timeframe, start_ms, end_ms)
+        mark_ts = np.asarray(mark['timestamp'])
+        position = np.searchsorted(mark_ts, bar_ts)
+        found = position < len(mark_ts)
+        found[found] = mark_ts[position[found]] == bar_ts[found]
+
+        def column(name, fallback):
+            values = np.full(n, np.nan)
+            values[found] = np.asarray(mark[name])[position[found]]
+            if fallback is not None:
+                values = np.where(found, values, np.asarray(fallback, dtype=np.float64))
+            return values
+
+        if not found.all():
+            logger.info(f"{symbol} {timeframe} 标记价格缺失 {int((~found).sum())}/{n} 根，使用成交价")
+        return PerpBars(funding_rate,
+                        column('open', opens), column('high', highs),
+                        column('low', lows), column('close', closes))
+
+
+# ---------- 向量化计算 ----------
+
+def funding_payments(signed_notional, funding_rate) -> np.ndarray:
+    """每根K线的资金费用现金流 (N,)
+
+    signed_notional: 结算时的持仓名义价值，多头为正、空头为负 (按标记价格计)
+    资金费率为正时多头付费、空头收费，返回值为账户收到的金额 (付费为负)。
+    """
+    return -np.asarray(signed_notional, dtype=np.float64) * np.asarray(funding_rate, dtype=np.float64)
+
+
+def liquidation_prices(direction, entry_price, leverage, maintenance_margin_rate: float = 0.004) -> np.ndarray:
+    """逐仓强平价 (N,): 多头 entry·(1 - 1/杠杆 + mmr)，空头 entry·(1 + 1/杠杆 - mmr)，无持仓为 NaN"""
+    direction = np.asarray(direction, dtype=np.float64)
+    entry_price = np.asarray(entry_price, dtype=np.float64)
+    leverage = np.asarray(leverage, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        prices = entry_price * (1 - direction * (1 / leverage - maintenance_margin_rate))
+    return np.where(direction != 0, prices, np.nan)
+
+
+def liquidation_mask(direction, entry_price, leverage, mark_high, mark_low,
+                     maintenance_margin_rate: float = 0.004) -> np.ndarray:
+    """每根K线是否触发强平 (N,): 多头看标记价最低价，空头看标记价最高价"""
+    direction = np.asarray(direction, dtype=np.float64)
+    liq = liquidation_prices(direction, entry_price, leverage, maintenance_margin_rate)
+    with np.errstate(invalid='ignore'):
+        return ((direction > 0) & (np.asarray(mark_low) <= liq)) | \
+               ((direction < 0) & (np.asarray(mark_high) >= liq))
+
+
+def _create_exchange(config_path: str):
+    import ccxt
+
+    exchange_config = {'enableRateLimit': True, 'options': {'defaultType': 'swap'}}
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        if 'proxies' in config.get('exchange', {}):
+            exchange_config['proxies'] = config['exchange']['proxies']
+    return ccxt.okx(exchange_config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='资金费率与标记价格归档')
+    parser.add_argument('command', choices=['sync', 'info'])
+    parser.add_argument('--symbol', default='BTC/USDT:USDT')
+    parser.add_argument('--timeframe', default='15m')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--root', default=DEFAULT_ROOT)
+    parser.add_argument('--config', default='config/survival_config.json')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    history = PerpHistory(args.root)
+    if args.command == 'sync':
+        history.sync(_create_exchange(args.config), args.symbol, args.timeframe, args.days)
+
+    funding = history.load_funding(args.symbol)
+    mark = history.mark_store.load(args.symbol, args.timeframe)
+    print(f"📦 {args.symbol}: 资金费率 {len(funding['timestamp'])} 条, "
+          f"{args.timeframe} 标记价格K线 {len(mark['timestamp'])} 根")
+    if len(funding['rate']):
+        rates = np.asarray(funding['rate'])
+        print(f"   平均费率: {rates.mean():.6f}, 年化: {rates.mean() * 3 * 365:.2%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,11 +4,14 @@
 """
 
 import ccxt
-import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 
+from candle_store import CandleStore
+from indicator_cache import add_indicators_cached
+from backtest_core import run_backtest, PositionModel, EXIT_OPEN, EXIT_STOP
+
 print("🚀 快速回测分析")
 print("="*60)
 
@@ -30,39 +33,13 @@ print("📊 获取BTC/USDT永续合约30天5分钟数据...")
 symbol = 'BTC/USDT:USDT'
 timeframe = '5m'
 
-# 计算时间范围
-end_time = datetime.now()
-start_time = end_time - timedelta(days=30)
-
-all_data = []
-current = start_time
-
-while current < end_time:
-    try:
-        since = int(current.timestamp() * 1000)
-        ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=1000)
-        
-        if not ohlcv:
-            break
-            
-        all_data.extend(ohlcv)
-        current = datetime.fromtimestamp(ohlcv[-1][0] / 1000)
-        
-        print(f"  已获取 {len(all_data)} 根K线...")
-        
-    except Exception as e:
-        print(f"  获取数据出错: {e}")
-        break
-
-if not all_data:
+# 从本地K线仓库读取，只从交易所补齐缺失部分
+df = CandleStore().sync_dataframe(exchange, symbol, timeframe, 30)
+
+if df.empty:
     print("❌ 无法获取数据")
     exit(1)
 
-# 创建DataFrame
-df = pd.DataFrame(all_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-df.set_index('timestamp', inplace=True)
-
 print(f"✅ 数据获取完成: {len(df)} 根K线")
 print(f"  时间范围: {df.index[0]} 至 {df.index[-1]}")
 print(f"  最新价格: ${df['close'].iloc[-1]:,.2f}")
@@ -70,30 +47,8 @@ print(f"  最新价格: ${df['close'].iloc[-1]:,.2f}")
 # 计算基本指标
 print("\n📈 计算技术指标...")
 
-# 移动平均线
-df['ema_20'] = df['close'].ewm(span=20).mean()
-df['ema_50'] = df['close'].ewm(span=50).mean()
-
-# RSI
-delta = df['close'].diff()
-gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-rs = gain / loss
-df['rsi'] = 100 - (100 / (1 + rs))
-
-# 布林带
-df['bb_middle'] = df['close'].rolling(window=20).mean()
-bb_std = df['close'].rolling(window=20).std()
-df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
-
-# ATR
-high_low = df['high'] - df['low']
-high_close = np.abs(df['high'] - df['close'].shift())
-low_close = np.abs(df['low'] - df['close'].shift())
-ranges = pd.concat([high_low, high_close, low_close], axis=1)
-true_range = ranges.max(axis=1)
-df['atr'] = true_range.rolling(window=14).mean()
+# EMA 20/50、RSI、MACD、布林带、ATR
+add_indicators_cached(df, ema_periods=(20, 50))
 
 print("✅ 指标计算完成")
 
@@ -101,112 +56,55 @@ print("✅ 指标计算完成")
 print("\n⚡ 运行简单策略回测...")
 
 initial_capital = 200
-capital = initial_capital
-position = None
-entry_price = 0
-trade_history = []
-equity_curve = [capital]
 
-for i in range(1, len(df)):
-    current = df.iloc[i]
-    prev = df.iloc[i-1]
-    
-    # 生成信号
-    signal = 'FLAT'
-    reason = ''
-    
-    # EMA交叉
-    if current['ema_20'] > current['ema_50'] and prev['ema_20'] <= prev['ema_50']:
-        signal = 'LONG'
-        reason = 'EMA金叉'
-    elif current['ema_20'] < current['ema_50'] and prev['ema_20'] >= prev['ema_50']:
-        signal = 'SHORT'
-        reason = 'EMA死叉'
-    
-    # RSI极端值
-    elif current['rsi'] < 30:
-        signal = 'LONG'
-        reason = f'RSI超卖({current["rsi"]:.1f})'
-    elif current['rsi'] > 70:
-        signal = 'SHORT'
-        reason = f'RSI超买({current["rsi"]:.1f})'
-    
-    # 布林带触碰
-    elif current['close'] <= current['bb_lower']:
-        signal = 'LONG'
-        reason = '触及布林带下轨'
-    elif current['close'] >= current['bb_upper']:
-        signal = 'SHORT'
-        reason = '触及布林带上轨'
-    
-    # 如果有持仓，检查平仓
-    if position:
-        current_price = current['close']
-        
-        if position == 'LONG':
-            # 3%止损，6%止盈
-            if current_price <= entry_price * 0.97:
-                pnl = (current_price - entry_price) * (capital * 0.1 * 10 / entry_price)
-                capital += pnl
-                trade_history.append({
-                    'type': 'CLOSE',
-                    'direction': 'LONG',
-                    'entry': entry_price,
-                    'exit': current_price,
-                    'pnl': pnl,
-                    'reason': '止损'
-                })
-                position = None
-            elif current_price >= entry_price * 1.06:
-                pnl = (current_price - entry_price) * (capital * 0.1 * 10 / entry_price)
-                capital += pnl
-                trade_history.append({
-                    'type': 'CLOSE',
-                    'direction': 'LONG',
-                    'entry': entry_price,
-                    'exit': current_price,
-                    'pnl': pnl,
-                    'reason': '止盈'
-                })
-                position = None
-        else:  # SHORT
-            if current_price >= entry_price * 1.03:
-                pnl = (entry_price - current_price) * (capital * 0.1 * 10 / entry_price)
-                capital += pnl
-                trade_history.append({
-                    'type': 'CLOSE',
-                    'direction': 'SHORT',
-                    'entry': entry_price,
-                    'exit': current_price,
-                    'pnl': pnl,
-                    'reason': '止损'
-                })
-                position = None
-            elif current_price <= entry_price * 0.94:
-                pnl = (entry_price - current_price) * (capital * 0.1 * 10 / entry_price)
-                capital += pnl
-                trade_history.append({
-                    'type': 'CLOSE',
-                    'direction': 'SHORT',
-                    'entry': entry_price,
-                    'exit': current_price,
-                    'pnl': pnl,
-                    'reason': '止盈'
-                })
-                position = None
-    
-    # 如果没有持仓，检查开仓
-    if not position and signal != 'FLAT':
-        position = signal
-        entry_price = current['close']
+# 信号整列计算 (优先级: EMA交叉 > RSI极端值 > 布林带触碰)
+close = df['close'].to_numpy()
+ema_20, ema_50 = df['ema_20'].to_numpy(), df['ema_50'].to_numpy()
+rsi = df['rsi'].to_numpy()
+prev_20, prev_50 = np.roll(ema_20, 1), np.roll(ema_50, 1)
+rules = [
+    (ema_20 > ema_50) & (prev_20 <= prev_50),      # EMA金叉
+    (ema_20 < ema_50) & (prev_20 >= prev_50),      # EMA死叉
+    rsi < 30,
+    rsi > 70,
+    close <= df['bb_lower'].to_numpy(),
+    close >= df['bb_upper'].to_numpy(),
+]
+rule = np.select(rules, np.arange(1, 7), 0)
+signal = np.select([rule % 2 == 1, rule > 0], [1, -1], 0)
+signal[0] = 0
+
+
+def signal_reason(i):
+    return {1: 'EMA金叉', 2: 'EMA死叉', 3: f'RSI超卖({rsi[i]:.1f})', 4: f'RSI超买({rsi[i]:.1f})',
+            5: '触及布林带下轨', 6: '触及布林带上轨'}[int(rule[i])]
+
+
+# 3%止损，6%止盈，10%资金 × 10倍杠杆；平仓的那根K线可以再开仓
+result = run_backtest(close, signal, model=PositionModel(fraction=0.1, leverage=10, stop_loss=0.03, take_profit=0.06),
+                      initial_capital=initial_capital, start=1)
+capital = result.final_capital
+equity_curve = [initial_capital] + result.capital.tolist()
+
+trade_history = []
+for t in range(len(result)):
+    direction = 'LONG' if result.side[t] > 0 else 'SHORT'
+    entry_index = int(result.entry_index[t])
+    trade_history.append({
+        'type': 'OPEN',
+        'direction': direction,
+        'price': result.entry_price[t],
+        'reason': signal_reason(entry_index)
+    })
+    if result.exit_reason[t] != EXIT_OPEN:
         trade_history.append({
-            'type': 'OPEN',
-            'direction': signal,
-            'price': entry_price,
-            'reason': reason
+            'type': 'CLOSE',
+            'direction': direction,
+            'entry': result.entry_price[t],
+            'exit': result.exit_price[t],
+            'pnl': result.pnl[t],
+            'reason': '止损' if result.exit_reason[t] == EXIT_STOP else '止盈'
         })
-    
-    equity_curve.append(capital)
 
 print("✅ 回测完成")
 
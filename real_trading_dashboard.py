@@ -10,7 +10,7 @@ from datetime import datetime
 import threading
 import logging
 import os
-import ccxt
+from market_data_hub import create_exchange
 
 app = Flask(__name__, static_folder='templates')
 
@@ -66,14 +66,7 @@ def init_exchange():
         with open('config/final_config.json', 'r') as f:
             config = json.load(f)
         
-        exchange = ccxt.okx({
-            'apiKey': config['exchange']['api_key'],
-            'secret': config['exchange']['secret'],
-            'password': config['exchange']['passphrase'],
-            'enableRateLimit': True,
-            'proxies': config['exchange']['proxies'],
-            'options': {'defaultType': 'swap'}
-        })
+        exchange = create_exchange(config)
         
         # 加载历史交易记录
         load_trade_history()
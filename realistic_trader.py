@@ -16,6 +16,8 @@ from dataclasses import dataclass
 from enum import Enum
 import time
 
+from timeframe_align import TimeframeAlignment
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -209,15 +211,26 @@ class RealisticTrader:
         return leverage
     
     def generate_triple_confirmation_signal(self, df_15m: pd.DataFrame, df_1h: pd.DataFrame, 
-                                           current_idx: int) -> Optional[TradeSignal]:
-        """生成三重确认信号"""
+                                           current_idx: int,
+                                           alignment: Optional[TimeframeAlignment] = None) -> Optional[TradeSignal]:
+        """生成三重确认信号
+
+        1小时趋势取第 current_idx 根15分钟K线收盘时最后一根已收盘的1小时K线；
+        逐根回测时传入预先建好的 alignment，避免每次重建。
+        """
         if current_idx < 2 or len(df_1h) < 2:
             return None
         
+        if alignment is None:
+            alignment = TimeframeAlignment.from_frame(df_15m, '15m')
+            alignment.add('1h', df_1h, '1h')
+        current_1h = alignment.row('1h', current_idx)
+        if current_1h is None:
+            return None
+        prev_1h = alignment.row('1h', current_idx, offset=-1) or current_1h
+        
         current_15m = df_15m.iloc[current_idx]
         prev_15m = df_15m.iloc[current_idx-1]
-        current_1h = df_1h.iloc[-1]
-        prev_1h = df_1h.iloc[-2] if len(df_1h) > 1 else current_1h
         
         reasons = []
         confidence = 0
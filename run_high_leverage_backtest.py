@@ -18,94 +18,59 @@ except ImportError:
     print("❌ 无法导入策略模块")
     sys.exit(1)
 
+from candle_resampler import resample_ohlcv
+from candle_store import CandleStore
+from indicator_cache import add_indicators_cached
+from order_book_store import OrderBookStore, SlippageModel
+from timeframe_align import TimeframeAlignment
+
+CONTRACT_SIZE = 0.01  # OKX BTC永续每张0.01 BTC
+
 def fetch_historical_data(exchange, symbol, timeframe, days):
     """获取历史数据"""
     print(f"📊 获取{timeframe} {days}天数据...")
     
-    all_ohlcv = []
-    end_time = datetime.now()
-    start_time = end_time - timedelta(days=days)
-    current = start_time
-    
-    while current < end_time:
-        try:
-            since = int(current.timestamp() * 1000)
-            ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=1000)
-            
-            if not ohlcv:
-                break
-            
-            all_ohlcv.extend(ohlcv)
-            current = datetime.fromtimestamp(ohlcv[-1][0] / 1000)
-            
-            if len(all_ohlcv) % 1000 == 0:
-                print(f"  已获取 {len(all_ohlcv)} 根K线...")
-                
-        except Exception as e:
-            print(f"  获取失败: {e}")
-            break
-    
-    if not all_ohlcv:
+    # 从本地K线仓库读取，只从交易所补齐缺失部分
+    df = CandleStore().sync_dataframe(exchange, symbol, timeframe, days)
+    if df.empty:
         return None
     
-    df = pd.DataFrame(all_ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df.set_index('timestamp', inplace=True)
-    
     print(f"  ✅ 完成: {len(df)} 根K线")
     return df
 
+def resample_dataframe(df, timeframe):
+    """从已下载的低周期K线合成高周期，避免重复下载"""
+    ohlcv = df[['open', 'high', 'low', 'close', 'volume']].to_numpy()
+    timestamps = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    resampled = resample_ohlcv(np.column_stack([timestamps, ohlcv]), timeframe)
+    result = pd.DataFrame(resampled, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    result['timestamp'] = pd.to_datetime(result['timestamp'], unit='ms')
+    result.set_index('timestamp', inplace=True)
+    return result
+
 def calculate_indicators(df):
-    """计算技术指标"""
-    # 移动平均线
-    df['ema_20'] = df['close'].ewm(span=20).mean()
-    df['ema_50'] = df['close'].ewm(span=50).mean()
-    df['ema_100'] = df['close'].ewm(span=100).mean()
-    
-    # RSI
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    df['rsi'] = 100 - (100 / (1 + rs))
-    
-    # MACD
-    exp1 = df['close'].ewm(span=12).mean()
-    exp2 = df['close'].ewm(span=26).mean()
-    df['macd'] = exp1 - exp2
-    df['macd_signal'] = df['macd'].ewm(span=9).mean()
-    df['macd_hist'] = df['macd'] - df['macd_signal']
-    
-    # 布林带
-    df['bb_middle'] = df['close'].rolling(window=20).mean()
-    bb_std = df['close'].rolling(window=20).std()
-    df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-    df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
-    df['bb_width'] = (df['bb_upper'] - df['bb_lower']) / df['bb_middle']
-    
-    # 成交量
-    df['volume_sma'] = df['volume'].rolling(window=20).mean()
-    df['volume_ratio'] = df['volume'] / df['volume_sma']
-    
-    # ATR
-    high_low = df['high'] - df['low']
-    high_close = np.abs(df['high'] - df['close'].shift())
-    low_close = np.abs(df['low'] - df['close'].shift())
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = ranges.max(axis=1)
-    df['atr'] = true_range.rolling(window=14).mean()
-    df['atr_percent'] = df['atr'] / df['close']
-    
-    return df
+    """计算技术指标 (EMA 20/50/100、RSI、MACD、布林带、成交量、ATR)，结果缓存在磁盘"""
+    return add_indicators_cached(df)
+
+def align_timeframes(df_15m, df_1h):
+    """15分钟K线与1小时K线的 as-of 对齐 (每根15分钟K线只看到已收盘的1小时K线)"""
+    alignment = TimeframeAlignment.from_frame(df_15m, '15m')
+    alignment.add('1h', df_1h, '1h')
+    return alignment
 
-def check_entry_signal(df_15m, df_1h, current_idx):
-    """检查入场信号"""
+def check_entry_signal(df_15m, df_1h, current_idx, alignment=None):
+    """检查入场信号 (1小时趋势取第 current_idx 根15分钟K线收盘时最后一根已收盘的1小时K线)"""
     if current_idx < 1 or len(df_1h) < 1:
         return None, 0, ""
     
+    if alignment is None:
+        alignment = align_timeframes(df_15m, df_1h)
+    current_1h = alignment.row('1h', current_idx)
+    if current_1h is None:
+        return None, 0, "1小时数据不足"
+    
     current_15m = df_15m.iloc[current_idx]
     prev_15m = df_15m.iloc[current_idx-1]
-    current_1h = df_1h.iloc[-1]
     
     # 1小时趋势
     if current_1h['ema_20'] > current_1h['ema_50']:
@@ -233,7 +198,7 @@ def run_simple_backtest():
     # 获取数据
     print("\n📥 获取历史数据...")
     df_15m = fetch_historical_data(exchange, symbol, '15m', 30)
-    df_1h = fetch_historical_data(exchange, symbol, '1h', 30)
+    df_1h = resample_dataframe(df_15m, '1h') if df_15m is not None else None
     
     if df_15m is None or df_1h is None:
         print("❌ 数据获取失败")
@@ -249,6 +214,7 @@ def run_simple_backtest():
     print("\n📈 计算技术指标...")
     df_15m = calculate_indicators(df_15m)
     df_1h = calculate_indicators(df_1h)
+    alignment = align_timeframes(df_15m, df_1h)
     
     # 回测参数
     initial_capital = 200
@@ -264,6 +230,10 @@ def run_simple_backtest():
     daily_trades = 0
     current_day = None
     
+    # 按盘口快照估算市价单滑点 (没有快照的时段按默认值)
+    slippage = SlippageModel.from_store(OrderBookStore(), symbol)
+    print(f"\n📚 盘口快照: {len(slippage.timestamps)} 个")
+    
     print("\n⚡ 运行回测...")
     
     for i in range(1, len(df_15m)):
@@ -275,9 +245,14 @@ def run_simple_backtest():
             current_day = current_day_str
             daily_trades = 0
         
+        # 按收盘价成交: 滑点取这根15分钟K线收盘时刻的盘口
+        current_ms = int(current_time.timestamp() * 1000) + 15 * 60 * 1000
+        
         # 检查是否有持仓
         if position:
             current_price = df_15m['close'].iloc[i]
+            exit_side = 'sell' if position == 'LONG' else 'buy'
+            exit_price = slippage.fill_price(current_ms, exit_side, position_size / CONTRACT_SIZE, current_price)
             
             if position == 'LONG':
                 # 计算止损止盈
@@ -286,14 +261,14 @@ def run_simple_backtest():
                 
                 # 检查平仓条件
                 if current_price <= stop_loss:
-                    pnl = (current_price - entry_price) * position_size
+                    pnl = (exit_price - entry_price) * position_size
                     capital += pnl
                     trade_history.append({
                         'time': current_time,
                         'type': 'CLOSE',
                         'direction': 'LONG',
                         'entry': entry_price,
-                        'exit': current_price,
+                        'exit': exit_price,
                         'pnl': pnl,
                         'reason': '止损',
                         'leverage': leverage
@@ -302,14 +277,14 @@ def run_simple_backtest():
                     daily_trades += 1
                     
                 elif current_price >= take_profit:
-                    pnl = (current_price - entry_price) * position_size
+                    pnl = (exit_price - entry_price) * position_size
                     capital += pnl
                     trade_history.append({
                         'time': current_time,
                         'type': 'CLOSE',
                         'direction': 'LONG',
                         'entry': entry_price,
-                        'exit': current_price,
+                        'exit': exit_price,
                         'pnl': pnl,
                         'reason': '止盈',
                         'leverage': leverage
@@ -322,14 +297,14 @@ def run_simple_backtest():
                 take_profit = entry_price * 0.96
                 
                 if current_price >= stop_loss:
-                    pnl = (entry_price - current_price) * position_size
+                    pnl = (entry_price - exit_price) * position_size
                     capital += pnl
                     trade_history.append({
                         'time': current_time,
                         'type': 'CLOSE',
                         'direction': 'SHORT',
                         'entry': entry_price,
-                        'exit': current_price,
+                        'exit': exit_price,
                         'pnl': pnl,
                         'reason': '止损',
                         'leverage': leverage
@@ -338,14 +313,14 @@ def run_simple_backtest():
                     daily_trades += 1
                     
                 elif current_price <= take_profit:
-                    pnl = (entry_price - current_price) * position_size
+                    pnl = (entry_price - exit_price) * position_size
                     capital += pnl
                     trade_history.append({
                         'time': current_time,
                         'type': 'CLOSE',
                         'direction': 'SHORT',
                         'entry': entry_price,
-                        'exit': current_price,
+                        'exit': exit_price,
                         'pnl': pnl,
                         'reason': '止盈',
                         'leverage': leverage
@@ -355,7 +330,7 @@ def run_simple_backtest():
         
         # 如果没有持仓且未达到每日限制，检查入场
         if not position and daily_trades < 3:
-            signal, confidence, reason = check_entry_signal(df_15m, df_1h, i)
+            signal, confidence, reason = check_entry_signal(df_15m, df_1h, i, alignment)
             
             if signal and confidence >= 0.8:
                 # 计算杠杆
@@ -373,7 +348,9 @@ def run_simple_backtest():
                 
                 # 开仓
                 position = signal
-                entry_price = df_15m['close'].iloc[i]
+                entry_side = 'buy' if signal == 'LONG' else 'sell'
+                entry_price = slippage.fill_price(current_ms, entry_side, position_size / CONTRACT_SIZE,
+                                                  df_15m['close'].iloc[i])
                 entry_idx = i
                 
                 trade_history.append({
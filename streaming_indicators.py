@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+流式增量指标 - 每根K线 O(1) 更新，不随回看周期变长而变慢
+每个指标有两种调用:
+    update(x)  K线收盘，提交状态
+    peek(x)    按未收盘K线的当前值估算指标，不改变状态 (同一根K线内可反复调用)
+
+EMA 默认与 pandas ewm(span=n).mean() (adjust=True) 逐点一致；RSI/ATR 支持 Wilder 平滑和简单均值两种。
+
+用法:
+    indicators = ClassicIndicators()              # EMA20/50、RSI、MACD、布林带、ATR
+    prev, latest = indicators.sync(ohlcv)         # 提交新收盘的K线，最后一根只 peek
+    if latest['macd'] > latest['macd_signal'] and prev['macd'] <= prev['macd_signal']:
+        ...
+"""
+
+import math
+import logging
+import numpy as np
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+NAN = float('nan')
+
+
+# ---------- 基础指标 ----------
+
+class EMA:
+    """指数移动平均，alpha = 2/(n+1)
+
+    adjust=True 时按 pandas 的加权平均定义 (分子分母分别递推)，与 ewm(span=n).mean() 一致；
+    adjust=False 时为普通递推 ema = ema + alpha·(x - ema)。
+    """
+
+    def __init__(self, period: int, adjust: bool = True, alpha: Optional[float] = None):
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2.0 / (period + 1)
+        self.adjust = adjust
+        self._num = 0.0
+        self._den = 0.0
+        self.value = NAN
+
+    def _next(self, x: float) -> Tuple[float, float, float]:
+        decay = 1.0 - self.alpha
+        if self._den == 0.0:
+            return x, 1.0, x
+        if self.adjust:
+            num = x + decay * self._num
+            den = 1.0 + decay * self._den
+            return num, den, num / den
+        value = self._num + self.alpha * (x - self._num)
+        return value, 1.0, value
+
+    def update(self, x: float) -> float:
+        self._num, self._den, self.value = self._next(x)
+        return self.value
+
+    def peek(self, x: float) -> float:
+        return self._next(x)[2]
+
+
+class RollingStats:
+    """滑动窗口均值/标准差 (Welford 增删)，ddof 与 pandas rolling().std() 的默认值 1 相同
+
+    窗口未满时返回 NaN (与 pandas rolling 的 min_periods=window 一致)；partial=True 时按已有数据计算。
+    增删累积的浮点误差每隔若干次按窗口内数据重算一次。
+    """
+
+    RESYNC_EVERY = 1000
+
+    def __init__(self, window: int, ddof: int = 1, partial: bool = False):
+        self.window = window
+        self.ddof = ddof
+        self.partial = partial
+        self._values = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._steps = 0
+
+    @staticmethod
+    def _add(n, mean, m2, x):
+        n += 1
+        delta = x - mean
+        mean += delta / n
+        return n, mean, m2 + delta * (x - mean)
+
+    @staticmethod
+    def _remove(n, mean, m2, x):
+        if n <= 1:
+            return 0, 0.0, 0.0
+        n -= 1
+        delta = x - mean
+        mean -= delta / n
+        return n, mean, m2 - delta * (x - mean)
+
+    def _next(self, x: float):
+        n, mean, m2 = len(self._values), self._mean, self._m2
+        if n == self.window:
+            n, mean, m2 = self._remove(n, mean, m2, self._values[0])
+        return self._add(n, mean, m2, x)
+
+    def _result(self, n, mean, m2) -> Tuple[float, float]:
+        if n == 0 or (n < self.window and not self.partial):
+            return NAN, NAN
+        std = math.sqrt(max(m2, 0.0) / (n - self.ddof)) if n > self.ddof else NAN
+        return mean, std
+
+    def update(self, x: float) -> Tuple[float, float]:
+        """提交一个值，返回 (均值, 标准差)"""
+        _, self._mean, self._m2 = self._next(x)
+        if len(self._values) == self.window:
+            self._values.popleft()
+        self._values.append(x)
+        self._steps += 1
+        if self._steps % self.RESYNC_EVERY == 0:
+            values = np.fromiter(self._values, dtype=np.float64)
+            self._mean = float(values.mean())
+            self._m2 = float(((values - self._mean) ** 2).sum())
+        return self.value
+
+    def peek(self, x: float) -> Tuple[float, float]:
+        return self._result(*self._next(x))
+
+    @property
+    def value(self) -> Tuple[float, float]:
+        return self._result(len(self._values), self._mean, self._m2)
+
+    @property
+    def mean(self) -> float:
+        return self.value[0]
+
+    @property
+    def std(self) -> float:
+        return self.value[1]
+
+
+class RollingSum:
+    """滑动窗口均值 (累加和增减)，用于简单均值版本的 RSI/ATR"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values = deque()
+        self._sum = 0.0
+
+    def _next(self, x: float) -> Tuple[int, float]:
+        n, total = len(self._values), self._sum + x
+        if n == self.window:
+            total -= self._values[0]
+        else:
+            n += 1
+        return n, total
+
+    def update(self, x: float) -> float:
+        n, self._sum = self._next(x)
+        if len(self._values) == self.window:
+            self._values.popleft()
+        self._values.append(x)
+        return self.value
+
+    def peek(self, x: float) -> float:
+        n, total = self._next(x)
+        return total / n if n == self.window else NAN
+
+    @property
+    def value(self) -> float:
+        n = len(self._values)
+        return self._sum / n if n == self.window else NAN
+
+
+class WilderAverage:
+    """Wilder 平滑: 前 n 个值取简单平均作为起点，之后 avg = avg + (x - avg)/n"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self._count = 0
+        self._sum = 0.0
+        self.value = NAN
+
+    def _next(self, x: float) -> float:
+        if self._count + 1 < self.period:
+            return NAN
+        if self._count + 1 == self.period:
+            return (self._sum + x) / self.period
+        return self.value + (x - self.value) / self.period
+
+    def update(self, x: float) -> float:
+        self.value = self._next(x)
+        self._count += 1
+        if self._count <= self.period:
+            self._sum += x
+        return self.value
+
+    def peek(self, x: float) -> float:
+        return self._next(x)
+
+
+class MultiWindowExtremum:
+    """同时维护多个窗口长度的滑动最大值/最小值，窗口未满时按已有数据计算
+
+    所有窗口共用一个单调队列 (按最长窗口保存候选值)，每个窗口只记一个队列位置:
+    每个值最多入队、出队一次，各窗口的位置只前进，update 与 peek 均摊 O(1)。
+    """
+
+    def __init__(self, windows, mode: str = 'max'):
+        if mode not in ('max', 'min'):
+            raise ValueError(f"不支持的模式: {mode}")
+        self.windows = tuple(sorted(set(int(w) for w in windows)))
+        self._sign = 1.0 if mode == 'max' else -1.0
+        self._index = []    # 候选值的序号 (递增)
+        self._keys = []     # 候选值·sign (递减)
+        self._positions = {w: 0 for w in self.windows}   # 各窗口第一个未过期候选值的位置
+        self._count = 0
+
+    def update(self, x: float) -> Dict[int, float]:
+        key = self._sign * x
+        index, keys = self._index, self._keys
+        longest = self._positions[self.windows[-1]]
+        while len(keys) > longest and keys[-1] <= key:
+            index.pop()
+            keys.pop()
+        index.append(self._count)
+        keys.append(key)
+        self._count += 1
+        last = len(keys) - 1
+        for window, position in self._positions.items():
+            # 指向的候选值被弹出时，新值就是该窗口的极值
+            position = min(position, last)
+            oldest = self._count - window
+            while index[position] < oldest:
+                position += 1
+            self._positions[window] = position
+        head = self._positions[self.windows[-1]]
+        if head > 256 and 2 * head > len(keys):
+            del index[:head], keys[:head]
+            self._positions = {w: p - head for w, p in self._positions.items()}
+        return self.values()
+
+    def _value(self, window: int) -> float:
+        return self._sign * self._keys[self._positions[window]] if self._keys else NAN
+
+    def _peek(self, window: int, key: float) -> float:
+        """最近 window-1 个已提交的值加上 key 的极值"""
+        position = self._positions[window]
+        if position < len(self._index) and self._index[position] <= self._count - window:
+            position += 1   # 加入 key 后这个候选值滑出窗口，单调性保证下一个就是剩余部分的极值
+        if position < len(self._keys):
+            return self._sign * max(self._keys[position], key)
+        return self._sign * key
+
+    def values(self) -> Dict[int, float]:
+        return {w: self._value(w) for w in self.windows}
+
+    def peek(self, x: float) -> Dict[int, float]:
+        key = self._sign * x
+        return {w: self._peek(w, key) for w in self.windows}
+
+
+class RollingExtremum(MultiWindowExtremum):
+    """滑动窗口最大值/最小值 (单调队列，均摊 O(1))，窗口未满时按已有数据计算"""
+
+    def __init__(self, window: int, mode: str = 'max'):
+        super().__init__((window,), mode)
+        self.window = window
+
+    def update(self, x: float) -> float:
+        super().update(x)
+        return self.value
+
+    def peek(self, x: float) -> float:
+        """最近 window-1 根已收盘数据加上 x 的极值"""
+        return self._peek(self.window, self._sign * x)
+
+    @property
+    def value(self) -> float:
+        return self._value(self.window)
+
+
+# ---------- K线级指标 ----------
+
+class RSI:
+    """RSI，method='wilder' 为标准 Wilder 平滑，'sma' 为涨跌幅简单均值 (与 rolling(n).mean() 版本一致)"""
+
+    def __init__(self, period: int = 14, method: str = 'wilder'):
+        average = WilderAverage if method == 'wilder' else RollingSum
+        self._gain = average(period)
+        self._loss = average(period)
+        self._last_close = None
+        self.value = NAN
+
+    @staticmethod
+    def _rsi(gain: float, loss: float) -> float:
+        if math.isnan(gain) or math.isnan(loss) or (gain == 0 and loss == 0):
+            return NAN
+        if loss == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+    def update(self, close: float) -> float:
+        if self._last_close is not None:
+            delta = close - self._last_close
+            self.value = self._rsi(self._gain.update(max(delta, 0.0)), self._loss.update(max(-delta, 0.0)))
+        self._last_close = close
+        return self.value
+
+    def peek(self, close: float) -> float:
+        if self._last_close is None:
+            return NAN
+        delta = close - self._last_close
+        return self._rsi(self._gain.peek(max(delta, 0.0)), self._loss.peek(max(-delta, 0.0)))
+
+
+class MACD:
+    """MACD = EMA(fast) - EMA(slow)，信号线为 MACD 的 EMA(signal)，返回 (macd, signal, histogram)"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9, adjust: bool = True):
+        self._fast = EMA(fast, adjust)
+        self._slow = EMA(slow, adjust)
+        self._signal = EMA(signal, adjust)
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        macd = self._fast.update(close) - self._slow.update(close)
+        signal = self._signal.update(macd)
+        return macd, signal, macd - signal
+
+    def peek(self, close: float) -> Tuple[float, float, float]:
+        macd = self._fast.peek(close) - self._slow.peek(close)
+        signal = self._signal.peek(macd)
+        return macd, signal, macd - signal
+
+
+class ATR:
+    """平均真实波幅，第一根K线的真实波幅为 high - low"""
+
+    def __init__(self, period: int = 14, method: str = 'sma'):
+        self._average = WilderAverage(period) if method == 'wilder' else RollingSum(period)
+        self._last_close = None
+
+    def _true_range(self, high: float, low: float) -> float:
+        if self._last_close is None:
+            return high - low
+        return max(high - low, abs(high - self._last_close), abs(low - self._last_close))
+
+    def update(self, high: float, low: float, close: float) -> float:
+        value = self._average.update(self._true_range(high, low))
+        self._last_close = close
+        return value
+
+    def peek(self, high: float, low: float, close: float) -> float:
+        return self._average.peek(self._true_range(high, low))
+
+
+# ---------- 按K线同步的指标组 ----------
+
+class CandleIndicators:
+    """一组按K线更新的指标
+
+    sync() 接收最近的K线 (ccxt 格式或 (N, 6) 数组，最后一根为未收盘K线)，
+    只提交时间戳比上次新的已收盘K线，最后一根用 peek 计算。
+    子类实现 _step(candle, commit) 返回指标字典。
+    """
+
+    def __init__(self):
+        self.last_timestamp = None
+        self.committed = {}
+        self.stats = {'committed': 0, 'peeks': 0, 'resets': 0}
+
+    def _step(self, candle, commit: bool) -> Dict[str, float]:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        self.__init__(**self._init_args)
+
+    def update(self, candle) -> Dict[str, float]:
+        """提交一根已收盘K线 [timestamp, open, high, low, close, volume]"""
+        self.committed = self._step(candle, True)
+        self.committed['close'] = float(candle[4])
+        self.last_timestamp = int(candle[0])
+        self.stats['committed'] += 1
+        return self.committed
+
+    def peek(self, candle) -> Dict[str, float]:
+        """按未收盘K线估算，不改变状态"""
+        self.stats['peeks'] += 1
+        values = self._step(candle, False)
+        values['close'] = float(candle[4])
+        return values
+
+    def sync(self, ohlcv) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """返回 (最后一根已收盘K线的指标, 未收盘K线的指标)"""
+        rows = np.asarray(ohlcv, dtype=np.float64)
+        timestamps = rows[:, 0]
+        if self.last_timestamp is not None and timestamps[0] > self.last_timestamp:
+            # 与已提交的K线没有重叠 (断档)，从这批数据重新开始
+            stats = self.stats
+            self.reset()
+            self.stats = stats
+            stats['resets'] += 1
+        start = 0 if self.last_timestamp is None else \
+            int(np.searchsorted(timestamps, self.last_timestamp, side='right'))
+        for candle in rows[start:-1]:
+            self.update(candle)
+        return self.committed, self.peek(rows[-1])
+
+    def sync_buffer(self, buffer) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """与 sync 相同，直接读取 CandleRingBuffer 的列 (只取需要的几行)"""
+        timestamps = buffer.timestamps
+        start = 0 if self.last_timestamp is None else \
+            max(int(np.searchsorted(timestamps, self.last_timestamp, side='left')), 0)
+        start = min(start, len(timestamps) - 1)
+        rows = np.column_stack([timestamps[start:], buffer.opens[start:], buffer.highs[start:],
+                                buffer.lows[start:], buffer.closes[start:], buffer.volumes[start:]])
+        return self.sync(rows)
+
+
+class ClassicIndicators(CandleIndicators):
+    """EMA、RSI、MACD、布林带、ATR，字段名与各交易器 DataFrame 的列名相同
+
+    默认参数下与 indicators.add_indicators(df, ema_periods=(20, 50)) 一致 (EMA 为 pandas adjust 定义，
+    RSI/ATR 为简单均值)；rsi_method='wilder' 时为标准 Wilder RSI。
+    """
+
+    def __init__(self, ema_periods=(20, 50), rsi_period: int = 14, rsi_method: str = 'sma',
+                 macd=(12, 26, 9), bb_period: int = 20, bb_std: float = 2.0,
+                 atr_period: int = 14, atr_method: str = 'sma'):
+        super().__init__()
+        self._init_args = dict(ema_periods=ema_periods, rsi_period=rsi_period, rsi_method=rsi_method,
+                               macd=macd, bb_period=bb_period, bb_std=bb_std,
+                               atr_period=atr_period, atr_method=atr_method)
+        self.emas = {p: EMA(p) for p in ema_periods}
+        self.rsi = RSI(rsi_period, rsi_method)
+        self.macd = MACD(*macd)
+        self.bollinger = RollingStats(bb_period)
+        self.bb_std = bb_std
+        self.atr = ATR(atr_period, atr_method)
+
+    def _step(self, candle, commit: bool) -> Dict[str, float]:
+        high, low, close = float(candle[2]), float(candle[3]), float(candle[4])
+        op = 'update' if commit else 'peek'
+        values = {f'ema_{p}': getattr(ema, op)(close) for p, ema in self.emas.items()}
+        values['rsi'] = getattr(self.rsi, op)(close)
+        values['macd'], values['macd_signal'], values['macd_hist'] = getattr(self.macd, op)(close)
+        mean, std = getattr(self.bollinger, op)(close)
+        values['bb_middle'] = mean
+        values['bb_upper'] = mean + self.bb_std * std
+        values['bb_lower'] = mean - self.bb_std * std
+        values['atr'] = getattr(self.atr, op)(high, low, close)
+        return values
+
+
+class RollingExtrema(CandleIndicators):
+    """多个窗口的收盘价最高/最低值 (high_<n>/low_<n>)，用于支撑阻力和突破位
+
+    prev (sync 的第一个返回值) 只含已收盘K线，latest 包含未收盘K线。
+    """
+
+    def __init__(self, windows=(20,)):
+        super().__init__()
+        self._init_args = dict(windows=windows)
+        self.highs = MultiWindowExtremum(windows, 'max')
+        self.lows = MultiWindowExtremum(windows, 'min')
+
+    def _step(self, candle, commit: bool) -> Dict[str, float]:
+        close = float(candle[4])
+        op = 'update' if commit else 'peek'
+        values = {f'high_{w}': v for w, v in getattr(self.highs, op)(close).items()}
+        values.update({f'low_{w}': v for w, v in getattr(self.lows, op)(close).items()})
+        return values
+
+
+class PriceStructureIndicators(CandleIndicators):
+    """UltraFastTrader 使用的均线、支撑阻力和年化波动率
+
+    sma_20/sma_50 为最近20/50根收盘价均值，support/resistance 为最近 sr_window 根的最低/最高收盘价，
+    volatility 为最近 vol_window 根收盘价收益率的标准差 (ddof=0) × √periods_per_year。
+    均包含未收盘K线，与原先对 closes[-n:] 切片计算的结果相同。
+    """
+
+    def __init__(self, sma_periods=(20, 50), sr_window: int = 15, vol_window: int = 20,
+                 periods_per_year: float = 365 * 24 * 4):
+        super().__init__()
+        self._init_args = dict(sma_periods=sma_periods, sr_window=sr_window, vol_window=vol_window,
+                               periods_per_year=periods_per_year)
+        self.smas = {p: RollingStats(p, partial=True) for p in sma_periods}
+        self.support = RollingExtremum(sr_window, 'min')
+        self.resistance = RollingExtremum(sr_window, 'max')
+        self.returns = RollingStats(vol_window - 1, ddof=0, partial=True)
+        self.annualize = math.sqrt(periods_per_year)
+        self._last_close = None
+
+    def _step(self, candle, commit: bool) -> Dict[str, float]:
+        close = float(candle[4])
+        op = 'update' if commit else 'peek'
+        values = {f'sma_{p}': getattr(sma, op)(close)[0] for p, sma in self.smas.items()}
+        values['support'] = getattr(self.support, op)(close)
+        values['resistance'] = getattr(self.resistance, op)(close)
+        if self._last_close is not None:
+            std = getattr(self.returns, op)((close - self._last_close) / self._last_close)[1]
+            values['volatility'] = 0.0 if math.isnan(std) else std * self.annualize
+        else:
+            values['volatility'] = 0.0
+        if commit:
+            self._last_close = close
+        return values
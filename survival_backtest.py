@@ -7,15 +7,59 @@
 import ccxt
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 import json
 import matplotlib.pyplot as plt
 from typing import Dict, List, Tuple
 import logging
 
+from candle_store import CandleStore
+from indicator_cache import add_indicators_cached
+from perp_history import PerpHistory
+from backtest_core import (run_backtest, PositionModel, EXIT_OPEN, EXIT_STOP, EXIT_TAKE,
+                           EXIT_LIQUIDATION)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# generate_signal 的各条规则，按置信度从高到低排列 (编号从 1 开始，与 generate_signals 的规则编号对应)
+SIGNAL_RULES = (
+    ('LONG', 0.7, 'EMA金叉(20>50)'),
+    ('SHORT', 0.7, 'EMA死叉(20<50)'),
+    ('LONG', 0.65, '触及布林带下轨'),
+    ('SHORT', 0.65, '触及布林带上轨'),
+    ('LONG', 0.6, 'MACD上穿信号线'),
+    ('SHORT', 0.6, 'MACD下穿信号线'),
+    ('LONG', 0.5, 'RSI超卖({:.1f})'),
+    ('SHORT', 0.5, 'RSI超买({:.1f})'),
+)
+
+
+class SurvivalPositionModel(PositionModel):
+    """生存策略的开仓规则: 按 ATR 波动率选杠杆，按 1.5 倍 ATR 止损计算仓位，固定 3%止损 6%止盈"""
+    
+    def __init__(self, backtest: 'SurvivalBacktest', atr: np.ndarray, confidence: np.ndarray):
+        super().__init__(stop_loss=0.03, take_profit=0.06)
+        self.backtest = backtest
+        self.atr = atr
+        self.confidence = confidence
+    
+    def open(self, i: int, side: int, price: float, capital: float) -> Tuple[float, float, float, float]:
+        leverage_config = self.backtest.config['trading']['leverage']
+        atr = self.atr[i]
+        volatility = atr / price
+        if volatility < 0.005:
+            leverage = min(15, leverage_config['max'])
+        elif volatility < 0.01:
+            leverage = min(10, leverage_config['max'])
+        else:
+            leverage = leverage_config['min']
+        
+        stop_loss_price = price - atr * 1.5 if side > 0 else price + atr * 1.5
+        size = self.backtest.calculate_position_size(capital, self.confidence[i], price, stop_loss_price, leverage)
+        _, _, stop, take = super().open(i, side, price, capital)
+        return size, leverage, stop, take
+
+
 class SurvivalBacktest:
     """生存策略回测引擎"""
     
@@ -51,43 +95,10 @@ class SurvivalBacktest:
         symbol = self.config['exchange']['symbol']
         timeframe = self.config['trading']['base_timeframe']
         
-        # 计算开始时间
-        end_time = datetime.now()
-        start_time = end_time - timedelta(days=days)
-        
-        # 获取数据
-        all_ohlcv = []
-        current_time = start_time
-        
-        while current_time < end_time:
-            try:
-                since = int(current_time.timestamp() * 1000)
-                ohlcv = self.exchange.fetch_ohlcv(
-                    symbol, 
-                    timeframe, 
-                    since=since, 
-                    limit=1000
-                )
-                
-                if not ohlcv:
-                    break
-                    
-                all_ohlcv.extend(ohlcv)
-                current_time = datetime.fromtimestamp(ohlcv[-1][0] / 1000)
-                
-                logger.info(f"  已获取: {len(all_ohlcv)} 根K线")
-                
-            except Exception as e:
-                logger.error(f"获取数据失败: {e}")
-                break
-        
-        # 转换为DataFrame
-        df = pd.DataFrame(
-            all_ohlcv, 
-            columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']
-        )
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
+        # 从本地K线仓库读取，只从交易所补齐缺失部分
+        df = CandleStore().sync_dataframe(self.exchange, symbol, timeframe, days)
+        # 同一时间范围的资金费率和标记价格，供 run_backtest 结算资金费用和强平
+        PerpHistory().sync(self.exchange, symbol, timeframe, days)
         
         logger.info(f"✅ 数据获取完成: {len(df)} 根K线")
         logger.info(f"  时间范围: {df.index[0]} 至 {df.index[-1]}")
@@ -99,36 +110,8 @@ class SurvivalBacktest:
         """计算技术指标"""
         logger.info("📈 计算技术指标...")
         
-        # 移动平均线
-        df['ema_20'] = df['close'].ewm(span=20).mean()
-        df['ema_50'] = df['close'].ewm(span=50).mean()
-        
-        # RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-        
-        # MACD
-        exp1 = df['close'].ewm(span=12).mean()
-        exp2 = df['close'].ewm(span=26).mean()
-        df['macd'] = exp1 - exp2
-        df['macd_signal'] = df['macd'].ewm(span=9).mean()
-        
-        # 布林带
-        df['bb_middle'] = df['close'].rolling(window=20).mean()
-        bb_std = df['close'].rolling(window=20).std()
-        df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-        df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
-        
-        # ATR (波动率)
-        high_low = df['high'] - df['low']
-        high_close = np.abs(df['high'] - df['close'].shift())
-        low_close = np.abs(df['low'] - df['close'].shift())
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        true_range = ranges.max(axis=1)
-        df['atr'] = true_range.rolling(window=14).mean()
+        # EMA 20/50、RSI、MACD、布林带、ATR 一次算完 (磁盘缓存，K线增加时只算新增部分)
+        add_indicators_cached(df, ema_periods=(20, 50))
         
         logger.info("✅ 指标计算完成")
         return df
@@ -169,6 +152,34 @@ class SurvivalBacktest:
         best_signal = max(signals, key=lambda x: x[1])
         return best_signal
     
+    def generate_signals(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """generate_signal 的整列版本，返回 (方向 1/-1/0, 置信度, SIGNAL_RULES 规则编号 0 为无信号)"""
+        def crosses(fast, slow):
+            fast, slow = df[fast].values, df[slow].values
+            prev_fast, prev_slow = np.roll(fast, 1), np.roll(slow, 1)
+            up = (fast > slow) & (prev_fast <= prev_slow)
+            down = ~up & (fast < slow) & (prev_fast >= prev_slow)
+            return up, down
+        
+        close, rsi = df['close'].values, df['rsi'].values
+        ema_up, ema_down = crosses('ema_20', 'ema_50')
+        macd_up, macd_down = crosses('macd', 'macd_signal')
+        bb_lower = close <= df['bb_lower'].values
+        bb_upper = ~bb_lower & (close >= df['bb_upper'].values)
+        
+        rule = np.select([ema_up, ema_down, bb_lower, bb_upper, macd_up, macd_down, rsi < 30, rsi > 70],
+                         np.arange(1, len(SIGNAL_RULES) + 1), 0)
+        rule[0] = 0
+        side = np.array([0] + [1 if d == 'LONG' else -1 for d, _, _ in SIGNAL_RULES], dtype=np.int8)[rule]
+        confidence = np.array([0] + [c for _, c, _ in SIGNAL_RULES])[rule]
+        return side, confidence, rule
+    
+    @staticmethod
+    def signal_reason(rule: int, rsi: float) -> str:
+        if rule == 0:
+            return '无信号'
+        return SIGNAL_RULES[rule - 1][2].format(rsi)
+    
     def calculate_position_size(self, capital: float, signal_conf: float, 
                                entry_price: float, stop_loss: float, 
                                leverage: int = 10) -> float:
@@ -193,118 +204,46 @@ class SurvivalBacktest:
         """运行回测"""
         logger.info("🚀 开始回测...")
         
-        position = None
-        entry_price = 0
-        entry_time = None
-        position_size = 0
-        direction = 'FLAT'
-        leverage = 10
-        
-        for i in range(1, len(df)):
-            current_row = df.iloc[i]
-            prev_row = df.iloc[i-1]
-            current_time = df.index[i]
-            
-            # 生成信号
-            signal, confidence, reason = self.generate_signal(current_row, prev_row)
-            
-            # 如果有持仓，检查止损止盈
-            if position:
-                current_price = current_row['close']
-                
-                # 计算止损止盈
-                if direction == 'LONG':
-                    stop_loss = entry_price * (1 - 0.03)  # 3%止损
-                    take_profit = entry_price * (1 + 0.06)  # 6%止盈
-                    
-                    # 检查止损
-                    if current_price <= stop_loss:
-                        pnl = (current_price - entry_price) * position_size
-                        self.close_position(current_time, current_price, pnl, '止损触发')
-                        position = None
-                    
-                    # 检查止盈
-                    elif current_price >= take_profit:
-                        pnl = (current_price - entry_price) * position_size
-                        self.close_position(current_time, current_price, pnl, '止盈触发')
-                        position = None
-                
-                else:  # SHORT
-                    stop_loss = entry_price * (1 + 0.03)
-                    take_profit = entry_price * (1 - 0.06)
-                    
-                    if current_price >= stop_loss:
-                        pnl = (entry_price - current_price) * position_size
-                        self.close_position(current_time, current_price, pnl, '止损触发')
-                        position = None
-                    
-                    elif current_price <= take_profit:
-                        pnl = (entry_price - current_price) * position_size
-                        self.close_position(current_time, current_price, pnl, '止盈触发')
-                        position = None
-            
-            # 如果没有持仓，检查开仓信号
-            if not position and signal != 'FLAT' and confidence > 0.6:
-                # 计算动态杠杆
-                volatility = current_row['atr'] / current_row['close']
-                if volatility < 0.005:
-                    leverage = min(15, self.config['trading']['leverage']['max'])
-                elif volatility < 0.01:
-                    leverage = min(10, self.config['trading']['leverage']['max'])
-                else:
-                    leverage = self.config['trading']['leverage']['min']
-                
-                # 计算止损
-                atr = current_row['atr']
-                if signal == 'LONG':
-                    stop_loss_price = current_row['close'] - (atr * 1.5)
-                else:
-                    stop_loss_price = current_row['close'] + (atr * 1.5)
-                
-                # 计算仓位
-                position_size = self.calculate_position_size(
-                    self.capital, confidence, 
-                    current_row['close'], stop_loss_price, 
-                    leverage
-                )
-                
-                # 开仓
-                position = {
-                    'direction': signal,
-                    'entry_price': current_row['close'],
-                    'entry_time': current_time,
-                    'position_size': position_size,
-                    'leverage': leverage,
-                    'stop_loss': stop_loss_price,
-                    'reason': reason
-                }
-                
+        # 资金费率与标记价格预先对齐到每根K线
+        bar_timestamps = df.index.values.astype('datetime64[ms]').astype(np.int64)
+        perp = PerpHistory().align_to_bars(
+            self.config['exchange']['symbol'], bar_timestamps, self.config['trading']['base_timeframe'],
+            closes=df['close'].values, highs=df['high'].values, lows=df['low'].values, opens=df['open'].values
+        )
+        
+        # 整列生成信号，只在置信度 > 0.6 时开仓；持仓期间结算资金费用、按标记价格强平、3%止损 6%止盈
+        side, confidence, rule = self.generate_signals(df)
+        entries = np.where(confidence > 0.6, side, 0)
+        model = SurvivalPositionModel(self, df['atr'].values, confidence)
+        result = run_backtest(df['close'].values, entries, model=model, initial_capital=self.capital,
+                              start=1, perp=perp)
+        self.capital = result.final_capital
+        
+        exit_reasons = {EXIT_STOP: '止损触发', EXIT_TAKE: '止盈触发', EXIT_LIQUIDATION: '标记价格强平'}
+        for t in range(len(result)):
+            entry_index = result.entry_index[t]
+            direction = 'LONG' if result.side[t] > 0 else 'SHORT'
+            self.trade_history.append({
+                'time': df.index[entry_index],
+                'type': 'OPEN',
+                'direction': direction,
+                'price': result.entry_price[t],
+                'size': result.size[t],
+                'leverage': result.leverage[t],
+                'reason': self.signal_reason(rule[entry_index], df['rsi'].iloc[entry_index])
+            })
+            if result.exit_reason[t] != EXIT_OPEN:
                 self.trade_history.append({
-                    'time': current_time,
-                    'type': 'OPEN',
-                    'direction': signal,
-                    'price': current_row['close'],
-                    'size': position_size,
-                    'leverage': leverage,
-                    'reason': reason
+                    'time': df.index[result.exit_index[t]],
+                    'type': 'CLOSE',
+                    'price': result.exit_price[t],
+                    'pnl': result.pnl[t],
+                    'reason': exit_reasons[result.exit_reason[t]]
                 })
-                
-                logger.debug(f"开仓: {signal} @ ${current_row['close']:,.0f} | 杠杆: {leverage}x | 理由: {reason}")
-            
-            # 记录资金曲线
-            if position:
-                # 计算浮动盈亏
-                if direction == 'LONG':
-                    unrealized_pnl = (current_row['close'] - entry_price) * position_size
-                else:
-                    unrealized_pnl = (entry_price - current_row['close']) * position_size
-                
-                current_equity = self.capital + unrealized_pnl
-            else:
-                current_equity = self.capital
-            
-            self.equity_curve.append(current_equity)
-            self.dates.append(current_time)
+        
+        # 资金曲线 (已实现资金 + 按标记价格计的浮动盈亏)
+        self.equity_curve.extend(result.equity.tolist())
+        self.dates.extend(df.index[1:])
         
         logger.info("✅ 回测完成")
     
@@ -10,14 +10,15 @@ import ccxt
 import json
 import time
 import asyncio
-import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import logging
 from dataclasses import dataclass
 from enum import Enum
 
+from markets_cache import load_markets_cached
+from streaming_indicators import ClassicIndicators
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -66,6 +67,8 @@ class SurvivalTrader:
     def __init__(self, config_path: str):
         self.config = self._load_config(config_path)
         self.exchange = self._init_exchange()
+        # 增量指标: 每轮只提交新收盘的K线，未收盘K线用 peek 计算
+        self.indicators = ClassicIndicators()
         self.positions: Dict[str, Position] = {}
         self.trade_history: List[Dict] = []
         self.capital = self.config['meta']['initial_capital']
@@ -108,7 +111,10 @@ class SurvivalTrader:
         if 'proxies' in self.config['exchange']:
             exchange_config['proxies'] = self.config['exchange']['proxies']
         
-        return ccxt.okx(exchange_config)
+        exchange = ccxt.okx(exchange_config)
+        # 合约规格从本地缓存读取，_get_contract_size 不必等待 load_markets
+        load_markets_cached(exchange)
+        return exchange
     
     def calculate_position_size(self, signal: TradeSignal) -> float:
         """基于凯利公式和风险限制计算仓位大小"""
@@ -152,14 +158,11 @@ class SurvivalTrader:
                 limit=100
             )
             
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            
-            # 计算技术指标
-            df = self._calculate_indicators(df)
+            # 计算技术指标 (最后一根为未收盘K线)
+            prev, latest = self.indicators.sync(ohlcv)
             
             # 生成信号
-            signal = self._generate_signal(df)
+            signal = self._generate_signal(latest, prev)
             
             if signal and signal.confidence > 0.6:  # 置信度阈值
                 logger.info(f"📡 生成交易信号: {signal.direction.value} | 置信度: {signal.confidence:.2f}")
@@ -172,45 +175,8 @@ class SurvivalTrader:
             logger.error(f"市场分析错误: {e}")
             return None
     
-    def _calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """计算技术指标"""
-        # 移动平均线
-        df['ema_20'] = df['close'].ewm(span=20).mean()
-        df['ema_50'] = df['close'].ewm(span=50).mean()
-        
-        # RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-        
-        # MACD
-        exp1 = df['close'].ewm(span=12).mean()
-        exp2 = df['close'].ewm(span=26).mean()
-        df['macd'] = exp1 - exp2
-        df['macd_signal'] = df['macd'].ewm(span=9).mean()
-        
-        # 布林带
-        df['bb_middle'] = df['close'].rolling(window=20).mean()
-        bb_std = df['close'].rolling(window=20).std()
-        df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-        df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
-        
-        # ATR (波动率)
-        high_low = df['high'] - df['low']
-        high_close = np.abs(df['high'] - df['close'].shift())
-        low_close = np.abs(df['low'] - df['close'].shift())
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        true_range = ranges.max(axis=1)
-        df['atr'] = true_range.rolling(window=14).mean()
-        
-        return df
-    
-    def _generate_signal(self, df: pd.DataFrame) -> Optional[TradeSignal]:
-        """基于指标生成交易信号"""
-        latest = df.iloc[-1]
-        prev = df.iloc[-2]
+    def _generate_signal(self, latest: Dict, prev: Dict) -> Optional[TradeSignal]:
+        """基于最新 (未收盘) 和上一根已收盘K线的指标生成交易信号"""
         
         # 趋势动量信号
         trend_signal = self._check_trend_momentum(latest, prev)
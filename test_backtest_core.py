@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+向量化回测核心的离场规则测试 (离线，不需要交易所)
+
+用法:
+    python test_backtest_core.py
+    python -m pytest -q test_backtest_core.py
+"""
+
+import numpy as np
+
+from backtest_core import (run_backtest, PositionModel, _first_exit, FIRST_BLOCK, EXIT_OPEN, EXIT_SIGNAL,
+                           EXIT_STOP, EXIT_TAKE, EXIT_LIQUIDATION)
+from perp_history import PerpBars, liquidation_prices
+
+
+def _perp(close: np.ndarray, low: np.ndarray = None, high: np.ndarray = None,
+          funding_rate: np.ndarray = None) -> PerpBars:
+    low = close if low is None else low
+    high = close if high is None else high
+    funding_rate = np.zeros(len(close)) if funding_rate is None else funding_rate
+    return PerpBars(funding_rate, close.copy(), high, low, close.copy())
+
+
+def test_first_exit_priority_within_bar():
+    # 多头: 开仓价100，止损97，止盈106，强平价90
+    close = np.array([100.0, 96.0, 96.0, 107.0, 100.0])
+    low = np.array([100.0, 89.0, 96.0, 107.0, 100.0])
+    signal = np.ones(5, dtype=bool)
+    args = (1, 97.0, 106.0, 90.0)
+    # 同一根K线同时触发时: 强平 > 止损 > 止盈 > 离场信号
+    assert _first_exit(close, signal, low, close, 1, 5, *args) == (1, EXIT_LIQUIDATION)
+    assert _first_exit(close, signal, low, close, 2, 5, *args) == (2, EXIT_STOP)
+    assert _first_exit(close, signal, low, close, 3, 5, *args) == (3, EXIT_TAKE)
+    assert _first_exit(close, signal, low, close, 4, 5, *args) == (4, EXIT_SIGNAL)
+
+    # 空头方向相反: 止损在上、止盈在下，强平看最高价
+    short_close = np.array([100.0, 104.0, 94.0])
+    high = np.array([100.0, 111.0, 94.0])
+    assert _first_exit(short_close, None, high, high, 1, 3, -1, 103.0, 95.0, 110.0) == (1, EXIT_LIQUIDATION)
+    assert _first_exit(short_close, None, high, high, 2, 3, -1, 103.0, 95.0, 110.0) == (2, EXIT_TAKE)
+
+
+def test_first_exit_across_blocks():
+    n = FIRST_BLOCK * 10
+    close = np.full(n, 100.0)
+    exits = np.zeros(n, dtype=bool)
+    nan = float('nan')
+    assert _first_exit(close, exits, None, None, 1, n, 1, nan, nan, nan) == (-1, EXIT_OPEN)
+    # 离场点落在第几块、是否在块边界上都要找到同一根K线
+    for k in (FIRST_BLOCK, FIRST_BLOCK + 1, 3 * FIRST_BLOCK - 1, n - 1):
+        exits[:] = False
+        exits[k] = True
+        close[k + 1:] = 90.0
+        assert _first_exit(close, exits, None, None, 1, n, 1, 95.0, nan, nan) == (k, EXIT_SIGNAL)
+        close[:] = 100.0
+
+
+def test_funding_settled_after_entry_through_exit_bar():
+    close = np.full(10, 100.0)
+    funding_rate = np.zeros(10)
+    funding_rate[[1, 3, 6, 8]] = 0.001
+    entries = np.zeros(10, dtype=np.int8)
+    exits = np.zeros(10, dtype=bool)
+    exits[6] = True
+    model = PositionModel(fraction=0.5, leverage=4)
+    for side in (1, -1):
+        entries[1] = side
+        result = run_backtest(close, entries, exits, model=model, initial_capital=1000.0,
+                              reenter_same_bar=False, perp=_perp(close, funding_rate=funding_rate))
+        # 开仓那根K线 (1) 的结算不计，平仓那根K线 (6) 的结算计入，之后 (8) 不计
+        notional = result.size[0] * 100.0
+        expected = -side * notional * 0.001 * 2
+        assert result.exit_index[0] == 6 and result.exit_reason[0] == EXIT_SIGNAL
+        np.testing.assert_allclose(result.funding[0], expected)
+        np.testing.assert_allclose(result.final_capital, 1000.0 + expected)
+        np.testing.assert_allclose(result.capital[[2, 3, 5, 6, 9]],
+                                   1000.0 + np.array([0, 1, 1, 2, 2]) * expected / 2)
+
+
+def test_liquidation_loses_full_margin():
+    close = np.full(10, 100.0)
+    low = close.copy()
+    low[4] = 80.0
+    entries = np.zeros(10, dtype=np.int8)
+    entries[1] = 1
+    model = PositionModel(fraction=0.5, leverage=10)
+    result = run_backtest(close, entries, model=model, initial_capital=1000.0, perp=_perp(close, low=low))
+
+    assert result.exit_reason[0] == EXIT_LIQUIDATION and result.exit_index[0] == 4
+    assert result.exit_price[0] == float(liquidation_prices(1, 100.0, 10))
+    margin = result.size[0] * result.entry_price[0] / result.leverage[0]
+    np.testing.assert_allclose(margin, 500.0)
+    np.testing.assert_allclose(result.pnl[0], -margin)
+    np.testing.assert_allclose(result.final_capital, 500.0)
+    np.testing.assert_allclose(result.capital[-1], 500.0)
+
+
+def main():
+    tests = [test_first_exit_priority_within_bar, test_first_exit_across_blocks,
+             test_funding_settled_after_entry_through_exit_bar, test_liquidation_loses_full_margin]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n全部 {len(tests)} 项通过")
+
+
+if __name__ == "__main__":
+    main()
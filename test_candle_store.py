@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+本地K线归档的同步与空洞记录测试 (离线，用内存中的假交易所)
+
+用法:
+    python test_candle_store.py
+    python -m pytest -q test_candle_store.py
+"""
+
+import tempfile
+
+from candle_store import CandleStore, HOLE_MAX_ATTEMPTS
+
+HOUR_MS = 3600 * 1000
+T0 = 1_700_000_000_000 // HOUR_MS * HOUR_MS      # 交易所最早一根K线 (上市时间)
+SYMBOL = 'BTC/USDT:USDT'
+
+
+class _FakeExchange:
+    """按 since/limit 返回 1h K线，hours 以外的时间没有数据"""
+
+    def __init__(self, hours):
+        self.enableRateLimit = True
+        self.hours = sorted(hours)
+
+    def fetch_ohlcv(self, symbol, timeframe='1h', since=None, limit=100):
+        rows = [[T0 + h * HOUR_MS, 100.0, 101.0, 99.0, 100.0, 1.0] for h in self.hours]
+        return [row for row in rows if row[0] >= since][:limit]
+
+
+def _maintenance_exchange():
+    # 第 40~49 小时交易所维护，没有K线
+    return _FakeExchange([h for h in range(100) if not 40 <= h < 50])
+
+
+def _sync(store, exchange):
+    return store.sync(exchange, SYMBOL, '1h', T0 - 20 * HOUR_MS, T0 + 100 * HOUR_MS, limit=1000)
+
+
+def test_interior_gap_recorded_once():
+    store = CandleStore(tempfile.mkdtemp())
+    exchange = _maintenance_exchange()
+    _sync(store, exchange)
+    assert len(store.load(SYMBOL, '1h')['timestamp']) == 90
+
+    stats = _sync(store, exchange)
+    holes = store._load_meta(SYMBOL, '1h')['holes']
+    # 上市前的一段不记录为空洞，只记录中间维护的一段
+    assert stats['holes'] == 1
+    assert [(h['start'], h['end'], h['attempts']) for h in holes] == \
+        [(T0 + 40 * HOUR_MS, T0 + 50 * HOUR_MS, 1)]
+
+    ranges = store.missing_ranges(SYMBOL, '1h', T0 - 20 * HOUR_MS, T0 + 100 * HOUR_MS)
+    assert (T0 + 40 * HOUR_MS, T0 + 50 * HOUR_MS) not in ranges
+    # 按覆盖范围扣除: 从空洞中间开始的请求也不再包含空洞
+    # (最后一根已存K线总会重新获取)
+    assert store.missing_ranges(SYMBOL, '1h', T0 + 45 * HOUR_MS, T0 + 60 * HOUR_MS) == \
+        [(T0 + 59 * HOUR_MS, T0 + 60 * HOUR_MS)]
+
+
+def test_expired_hole_retried_then_permanent():
+    store = CandleStore(tempfile.mkdtemp())
+    exchange = _maintenance_exchange()
+    _sync(store, exchange)
+    _sync(store, exchange)
+
+    for attempt in range(2, HOLE_MAX_ATTEMPTS + 1):
+        meta = store._load_meta(SYMBOL, '1h')
+        meta['holes'][0]['checked_ms'] = 0          # 让空洞过期
+        store._save_meta(SYMBOL, '1h', meta)
+        assert (T0 + 40 * HOUR_MS, T0 + 50 * HOUR_MS) in \
+            store.missing_ranges(SYMBOL, '1h', T0, T0 + 100 * HOUR_MS)
+        _sync(store, exchange)
+        holes = store._load_meta(SYMBOL, '1h')['holes']
+        assert len(holes) == 1 and holes[0]['attempts'] == attempt
+
+    # 达到最大重试次数后即使过期也不再请求
+    meta = store._load_meta(SYMBOL, '1h')
+    meta['holes'][0]['checked_ms'] = 0
+    store._save_meta(SYMBOL, '1h', meta)
+    assert (T0 + 40 * HOUR_MS, T0 + 50 * HOUR_MS) not in \
+        store.missing_ranges(SYMBOL, '1h', T0, T0 + 100 * HOUR_MS)
+
+
+def test_expired_hole_dropped_when_data_appears():
+    store = CandleStore(tempfile.mkdtemp())
+    _sync(store, _maintenance_exchange())
+    _sync(store, _maintenance_exchange())
+
+    meta = store._load_meta(SYMBOL, '1h')
+    meta['holes'][0]['checked_ms'] = 0
+    store._save_meta(SYMBOL, '1h', meta)
+    _sync(store, _FakeExchange(range(100)))
+    assert store._load_meta(SYMBOL, '1h')['holes'] == []
+    assert len(store.load(SYMBOL, '1h')['timestamp']) == 100
+
+
+def test_legacy_holes_are_retried():
+    store = CandleStore(tempfile.mkdtemp())
+    store._save_meta(SYMBOL, '1h', {'holes': [[T0, T0 + HOUR_MS]]})
+    assert store.missing_ranges(SYMBOL, '1h', T0, T0 + HOUR_MS) == [(T0, T0 + HOUR_MS)]
+
+
+def main():
+    tests = [test_interior_gap_recorded_once, test_expired_hole_retried_then_permanent,
+             test_expired_hole_dropped_when_data_appears, test_legacy_holes_are_retried]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n全部 {len(tests)} 项通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+指标库与 pandas 的一致性测试 (离线，不需要交易所)
+重点覆盖大数值输入: 成交量、成交额、小单位计价的序列可达 1e7 ~ 1e12，递推不能溢出
+
+用法:
+    python test_indicators.py
+    python -m pytest -q test_indicators.py
+"""
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+MAGNITUDES = (1.0, 2e5, 1e7, 1e9, 1e12)
+SPANS = (9, 20, 200)
+
+
+def _series(magnitude: float, n: int = 20000, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return magnitude * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+
+
+def _assert_close(actual: np.ndarray, expected: np.ndarray, rtol: float = 1e-10) -> None:
+    assert np.array_equal(np.isnan(actual), np.isnan(expected)), "NaN 位置不一致"
+    valid = ~np.isnan(expected)
+    assert np.isfinite(actual[valid]).all(), "出现 inf/NaN"
+    np.testing.assert_allclose(actual[valid], expected[valid], rtol=rtol)
+
+
+def test_ema_large_values():
+    for magnitude in MAGNITUDES:
+        x = _series(magnitude)
+        for span in SPANS:
+            for adjust in (True, False):
+                expected = pd.Series(x).ewm(span=span, adjust=adjust).mean().values
+                _assert_close(indicators.ema(x, span, adjust=adjust), expected)
+
+
+def test_wilder_large_values():
+    constant = np.full(5000, 2e5)
+    _assert_close(indicators.wilder(constant, 14)[13:], constant[13:])
+    for magnitude in MAGNITUDES:
+        x = _series(magnitude)
+        # wilder 以前 14 个值的均值为起点，pandas 对齐后从同一起点开始递推
+        seeded = np.concatenate([[x[:14].mean()], x[14:]])
+        expected = pd.Series(seeded).ewm(alpha=1 / 14, adjust=False).mean().values
+        _assert_close(indicators.wilder(x, 14)[13:], expected)
+
+
+def test_ema_resume_large_values():
+    x = _series(1e9)
+    full = indicators.ema(x, 20)
+    tail = indicators.ema(x[15000:], 20, prev=full[14999], start=15000)
+    _assert_close(tail, full[15000:])
+
+
+def main():
+    tests = [test_ema_large_values, test_wilder_large_values, test_ema_resume_large_values]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n全部 {len(tests)} 项通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+信息K线批量转换与流式生成器的一致性测试 (离线)
+固定阈值时 volume_bars/dollar_bars 的切分必须与 InfoBarBuilder.push_many 逐根输入完全一致
+
+用法:
+    python test_info_bars.py
+    python -m pytest -q test_info_bars.py
+"""
+
+import numpy as np
+
+from info_bars import InfoBarBuilder, volume_bars, dollar_bars
+
+# 流式生成器把每根1分钟K线当作收盘价上的一笔成交，只比较与 high/low 无关的列:
+# 开始时间、收盘价、成交量、成交额、输入笔数、结束时间
+COMPARED_COLUMNS = [0, 4, 5, 6, 7, 8]
+
+
+def _candles(n: int = 2000, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    timestamps = 1_700_000_000_000 + np.arange(n) * 60_000
+    close = 30000 + np.cumsum(rng.normal(0, 10, n))
+    volume = rng.exponential(2.5, n)
+    return np.column_stack([timestamps, close, close + 5, close - 5, close, volume])
+
+
+def _streamed(kind: str, candles: np.ndarray, threshold: float) -> np.ndarray:
+    builder = InfoBarBuilder(kind, threshold=threshold)
+    return builder.push_many(candles[:, 0].astype(np.int64), candles[:, 4], candles[:, 5])
+
+
+def _check_parity(kind: str, converter, threshold: float, flow_column: int) -> None:
+    candles = _candles()
+    batch = converter(candles, threshold=threshold)
+    streamed = _streamed(kind, candles, threshold)
+    # 批量结果多出最后一根未收盘的K线
+    assert len(batch) == len(streamed) + 1
+    np.testing.assert_allclose(batch[:-1][:, COMPARED_COLUMNS], streamed[:, COMPARED_COLUMNS], rtol=1e-12)
+    assert (batch[:-1, flow_column] >= threshold).all()
+    assert batch[-1, flow_column] < threshold
+    # 每一行恰好属于一根K线
+    assert batch[:, 7].sum() == len(candles)
+
+
+def test_volume_bars_match_streaming():
+    _check_parity('volume', volume_bars, 50.0, 5)
+
+
+def test_dollar_bars_match_streaming():
+    _check_parity('dollar', dollar_bars, 50.0 * 30000, 6)
+
+
+def test_adaptive_volume_bars_cover_all_rows():
+    candles = _candles(5 * 1440)
+    bars = volume_bars(candles, bars_per_day=50)
+    assert bars[:, 7].sum() == len(candles)
+    np.testing.assert_allclose(bars[:, 5].sum(), candles[:, 5].sum())
+    assert (bars[1:, 0] > bars[:-1, 8]).all()
+
+
+def main():
+    tests = [test_volume_bars_match_streaming, test_dollar_bars_match_streaming,
+             test_adaptive_volume_bars_cover_all_rows]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n全部 {len(tests)} 项通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+多周期K线的时间对齐 (as-of)
+按15分钟K线逐根回测时，用 df_1h.iloc[-1] 取到的是整段数据的最后一根1小时K线，
+既要每次构造 Series，又把未来数据带进了回测。这里预先用 searchsorted 算好对齐索引:
+基础周期第 i 根K线收盘时，每个高周期中最后一根已经收盘的K线位置 (还没有时为 -1)。
+    高周期K线 [T, T + 周期) 在 T + 周期 时收盘，基础K线 i 在 ts[i] + 基础周期 时收盘，
+    二者收盘时间相同 (如 15m 的 00:45 与 1h 的 00:00) 时该高周期K线视为已收盘。
+对齐后的高周期列按索引一次性取出，与基础周期的列一一对应，可以直接向量化判断。
+
+用法:
+    alignment = TimeframeAlignment.from_frame(df_15m, '15m')
+    alignment.add('1h', df_1h, '1h')
+    ema_20_1h = alignment.column('1h', 'ema_20')          # 长度与 df_15m 相同，尚无已收盘K线处为 NaN
+    row = alignment.row('1h', i)                           # 第 i 根15分钟K线收盘时已知的1小时K线
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence
+
+from candle_buffer import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+def frame_timestamps(df: pd.DataFrame) -> np.ndarray:
+    """DataFrame 的K线开盘时间 (timestamp 列或 DatetimeIndex)，int64 毫秒"""
+    if 'timestamp' in df.columns:
+        values = df['timestamp']
+        if pd.api.types.is_numeric_dtype(values):
+            return values.to_numpy(dtype=np.int64)
+        return pd.to_datetime(values).to_numpy().astype('datetime64[ms]').astype(np.int64)
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df.index.to_numpy().astype('datetime64[ms]').astype(np.int64)
+    raise ValueError("DataFrame 中没有 timestamp 列或时间索引")
+
+
+def asof_index(base_timestamps: np.ndarray, base_timeframe: str,
+               higher_timestamps: np.ndarray, higher_timeframe: str) -> np.ndarray:
+    """每根基础K线收盘时最后一根已收盘的高周期K线位置，没有时为 -1 (高周期时间戳须升序)"""
+    base_close = np.asarray(base_timestamps, dtype=np.int64) + timeframe_to_ms(base_timeframe)
+    higher_close = np.asarray(higher_timestamps, dtype=np.int64) + timeframe_to_ms(higher_timeframe)
+    return np.searchsorted(higher_close, base_close, side='right') - 1
+
+
+class TimeframeAlignment:
+    """基础周期与若干高周期之间的 as-of 对齐索引及对齐后的列"""
+
+    def __init__(self, base_timestamps: np.ndarray, base_timeframe: str):
+        self.base_timestamps = np.asarray(base_timestamps, dtype=np.int64)
+        self.base_timeframe = base_timeframe
+        self._indexes: Dict[str, np.ndarray] = {}
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._values: Dict[str, Dict[str, np.ndarray]] = {}
+        self._columns: Dict[tuple, np.ndarray] = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, timeframe: str) -> 'TimeframeAlignment':
+        return cls(frame_timestamps(df), timeframe)
+
+    def add(self, name: str, df: pd.DataFrame, timeframe: str) -> np.ndarray:
+        """登记一个高周期 DataFrame (指标列算好之后再登记)，返回对齐索引"""
+        index = asof_index(self.base_timestamps, self.base_timeframe, frame_timestamps(df), timeframe)
+        self._indexes[name] = index
+        self._frames[name] = df
+        self._values[name] = {c: df[c].to_numpy() for c in df.columns}
+        self._columns = {k: v for k, v in self._columns.items() if k[0] != name}
+        return index
+
+    def index(self, name: str) -> np.ndarray:
+        return self._indexes[name]
+
+    def column(self, name: str, column: str) -> np.ndarray:
+        """对齐到基础周期的高周期列 (只读，首次访问时按索引取一次并缓存)，没有已收盘K线处为 NaN"""
+        key = (name, column)
+        aligned = self._columns.get(key)
+        if aligned is None:
+            index = self._indexes[name]
+            values = np.asarray(self._values[name][column], dtype=np.float64)
+            aligned = np.take(values, np.maximum(index, 0)) if len(values) else np.full(len(index), np.nan)
+            aligned[index < 0] = np.nan
+            aligned.flags.writeable = False
+            self._columns[key] = aligned
+        return aligned
+
+    def columns(self, name: str, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        columns = self._frames[name].columns if columns is None else columns
+        return {c: self.column(name, c) for c in columns}
+
+    def row(self, name: str, i: int, offset: int = 0) -> Optional[Dict]:
+        """第 i 根基础K线收盘时已收盘的高周期K线 {列名: 值} (offset=-1 为再前一根)，没有时为 None"""
+        position = int(self._indexes[name][i]) + offset
+        if self._indexes[name][i] < 0 or position < 0:
+            return None
+        return {c: values[position] for c, values in self._values[name].items()}
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+逐笔成交聚合为秒级K线 (10s/30s)
+把公共成交流 (fetch_trades 轮询或推送) 聚合成 OHLCV + VWAP 秒级K线，存放在数组环形缓冲区中。
+重复的成交ID自动跳过，乱序到达的成交会合并进对应时间段的K线。
+
+用法:
+    bars = TradeBarAggregator(exchange, 'BTC/USDT:USDT', '10s', capacity=360)
+    bars.poll()                  # 每轮调用一次
+    closes = bars.buffer.closes  # 零拷贝视图
+"""
+
+import logging
+import numpy as np
+from collections import deque
+from typing import Dict, List, Optional
+
+from candle_buffer import CandleRingBuffer, timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+class TradeBarBuffer(CandleRingBuffer):
+    """带成交额、笔数和首末成交时间的秒级K线缓冲区"""
+
+    COLUMNS = ('open', 'high', 'low', 'close', 'volume',
+               'quote_volume', 'trades', 'first_trade', 'last_trade')
+
+    @property
+    def quote_volumes(self) -> np.ndarray:
+        return self._view(5)
+
+    @property
+    def trade_counts(self) -> np.ndarray:
+        return self._view(6)
+
+    @property
+    def vwaps(self) -> np.ndarray:
+        """成交量加权均价 (拷贝)，无成交的K线为收盘价"""
+        volumes = self.volumes
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vwap = self.quote_volumes / volumes
+        return np.where(volumes > 0, vwap, self.closes)
+
+    def row(self, index: int) -> np.ndarray:
+        """第 index 根K线 (支持负数下标) 的完整一行 [timestamp, 各列...]，拷贝"""
+        pos = self._start + (index % self._size)
+        return np.r_[self._timestamps[pos], self._values[:, pos]]
+
+    def write_row(self, index: int, row) -> None:
+        self._write((self._start + (index % self._size)) % self.capacity, row)
+
+
+class TradeBarAggregator:
+    """公共成交流 → 秒级K线
+
+    没有成交的时间段补一根平盘K线 (成交量为0)，保证K线在时间上连续。
+    早于缓冲区最旧K线的成交直接丢弃。
+    """
+
+    def __init__(self, exchange, symbol: str, interval: str = '10s',
+                 capacity: int = 360, fetch_limit: int = 500, id_memory: int = 5000):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.interval = interval
+        self.interval_ms = timeframe_to_ms(interval)
+        self.fetch_limit = fetch_limit
+        self.buffer = TradeBarBuffer(capacity)
+        self._seen = set()
+        self._seen_order = deque()
+        self._id_memory = id_memory
+        self.stats = {'requests': 0, 'trades': 0, 'duplicates': 0, 'late': 0, 'gaps': 0}
+
+    # ---------- 去重 ----------
+
+    def _remember(self, trade_id) -> bool:
+        """记录成交ID，已见过返回 False"""
+        if trade_id in self._seen:
+            return False
+        self._seen.add(trade_id)
+        self._seen_order.append(trade_id)
+        if len(self._seen_order) > self._id_memory:
+            self._seen.discard(self._seen_order.popleft())
+        return True
+
+    # ---------- 聚合 ----------
+
+    def add_trades(self, trades: List[Dict]) -> int:
+        """合并一批成交 (ccxt 格式)，返回实际新增的成交笔数"""
+        fresh = []
+        for trade in trades:
+            trade_id = trade.get('id')
+            if trade_id is not None and not self._remember(trade_id):
+                self.stats['duplicates'] += 1
+                continue
+            fresh.append((trade['timestamp'], trade['price'], trade['amount']))
+        if not fresh:
+            return 0
+
+        data = np.asarray(fresh, dtype=np.float64)
+        data = data[np.argsort(data[:, 0], kind='stable')]
+        timestamps = data[:, 0].astype(np.int64)
+        prices, amounts = data[:, 1], data[:, 2]
+
+        # 按时间段向量化聚合
+        buckets = timestamps // self.interval_ms * self.interval_ms
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)] - 1
+        rows = np.empty((len(starts), 10), dtype=np.float64)
+        rows[:, 0] = buckets[starts]
+        rows[:, 1] = prices[starts]
+        rows[:, 2] = np.maximum.reduceat(prices, starts)
+        rows[:, 3] = np.minimum.reduceat(prices, starts)
+        rows[:, 4] = prices[ends]
+        rows[:, 5] = np.add.reduceat(amounts, starts)
+        rows[:, 6] = np.add.reduceat(prices * amounts, starts)
+        rows[:, 7] = np.diff(np.r_[starts, len(buckets)])
+        rows[:, 8] = timestamps[starts]
+        rows[:, 9] = timestamps[ends]
+
+        for row in rows:
+            self._merge_bar(row)
+        self.stats['trades'] += len(data)
+        return len(data)
+
+    def _merge_bar(self, row: np.ndarray) -> None:
+        buffer = self.buffer
+        last_ts = buffer.last_timestamp
+        bucket = int(row[0])
+
+        if last_ts is None or bucket > last_ts:
+            if last_ts is not None:
+                # 无成交的时间段补平盘K线
+                close = buffer.closes[-1]
+                missing = min((bucket - last_ts) // self.interval_ms - 1, buffer.capacity)
+                for ts in range(bucket - missing * self.interval_ms, bucket, self.interval_ms):
+                    buffer.append([ts, close, close, close, close, 0.0, 0.0, 0.0, ts, ts])
+            buffer.append(row)
+            return
+
+        # 乱序: 落在已有K线内
+        index = int(np.searchsorted(buffer.timestamps, bucket))
+        if index >= len(buffer) or buffer.timestamps[index] != bucket:
+            self.stats['late'] += int(row[7])
+            return
+        old = buffer.row(index)
+        merged = old.copy()
+        if old[7] == 0:
+            merged[1:] = row[1:]
+        else:
+            merged[2] = max(old[2], row[2])
+            merged[3] = min(old[3], row[3])
+            merged[5:8] = old[5:8] + row[5:8]
+            if row[8] < old[8]:
+                merged[1], merged[8] = row[1], row[8]
+            if row[9] >= old[9]:
+                merged[4], merged[9] = row[4], row[9]
+        buffer.write_row(index, merged)
+
+    # ---------- 拉取 ----------
+
+    def _check_gap(self, trades: List[Dict]) -> None:
+        """这批成交与上一批之间可能漏掉了成交 (轮询间隔内成交笔数超过 fetch_limit)"""
+        if trades and self._seen and len(trades) >= self.fetch_limit \
+                and not any(t.get('id') in self._seen for t in trades):
+            self.stats['gaps'] += 1
+            logger.warning(f"{self.interval} 成交流可能有遗漏: 单次返回 {len(trades)} 笔均为新成交")
+
+    def poll(self) -> TradeBarBuffer:
+        """拉取最新成交并合并，失败时保留原有K线"""
+        try:
+            trades = self.exchange.fetch_trades(self.symbol, limit=self.fetch_limit)
+        except Exception as e:
+            logger.warning(f"获取成交失败: {e}")
+            return self.buffer
+        self.stats['requests'] += 1
+        self._check_gap(trades)
+        self.add_trades(trades)
+        return self.buffer
+
+    async def poll_async(self, exchange) -> TradeBarBuffer:
+        """与 poll 相同，使用 ccxt.async_support 客户端"""
+        try:
+            trades = await exchange.fetch_trades(self.symbol, limit=self.fetch_limit)
+        except Exception as e:
+            logger.warning(f"获取成交失败: {e}")
+            return self.buffer
+        self.stats['requests'] += 1
+        self._check_gap(trades)
+        self.add_trades(trades)
+        return self.buffer
+
+    @property
+    def last_price(self) -> Optional[float]:
+        return float(self.buffer.closes[-1]) if len(self.buffer) else None
@@ -7,7 +7,7 @@ import time
 import json
 import os
 from datetime import datetime
-import ccxt
+from market_data_hub import create_exchange
 from telegram_notify_config import send_telegram_message, get_telegram_config
 
 class TradeNotifier:
@@ -20,14 +20,7 @@ class TradeNotifier:
             self.config = json.load(f)
         
         # 初始化交易所
-        self.exchange = ccxt.okx({
-            'apiKey': self.config['exchange']['api_key'],
-            'secret': self.config['exchange']['secret'],
-            'password': self.config['exchange']['passphrase'],
-            'enableRateLimit': True,
-            'proxies': self.config['exchange']['proxies'],
-            'options': {'defaultType': 'swap'}
-        })
+        self.exchange = create_exchange(self.config)
         
         self.symbol = 'BTC/USDT:USDT'
         
@@ -3,14 +3,62 @@
 超快交易系统 - 10秒频率，实时响应
 """
 
-import ccxt
+import copy
 import json
 import time
-import numpy as np
 from datetime import datetime
 import logging
 import os
 
+from candle_resampler import ResampledCandleFeed
+from trade_bars import TradeBarAggregator
+from streaming_indicators import PriceStructureIndicators, RollingExtrema
+from indicator_memo import default_memo
+from market_data_hub import create_exchange
+
+# ⚡ 超快参数 (多币种扫描器 market_scanner 使用同一份参数)
+ULTRA_FAST_PARAMS = {
+    'check_interval': 10,  # 10秒检查一次！
+    'min_position_size': 0.01,
+    'max_position_size': 0.15,
+    'risk_per_trade': 0.015,
+    'max_daily_trades': 15,  # 提高交易次数
+    'consecutive_loss_limit': 5,
+    
+    # 超快信号条件
+    'trend_following': {
+        'long_support_threshold': 0.5,
+        'short_resistance_threshold': 0.5,
+        'confidence': 0.6
+    },
+    
+    'mean_reversion': {
+        'enabled': True,
+        'volatility_threshold': 0.2,  # 更低阈值
+        'long_support_threshold': 0.4,
+        'short_resistance_threshold': 0.6,
+        'confidence': 0.55
+    },
+    
+    'quick_breakout': {
+        'enabled': True,
+        'breakout_period': 10,  # 更短周期
+        'breakout_multiplier': 1.005,  # 0.5%突破
+        'confidence': 0.6,
+        'tick_bar_interval': '10s',  # 成交流聚合K线，与检查频率一致
+        'tick_breakout_period': 30  # 30根10秒K线 = 5分钟
+    },
+    
+    # 超快风险参数
+    'risk_reward_ratio_min': 1.2,
+    'volatility_adjustment': {
+        'low': {'threshold': 0.4, 'stop_loss': 0.8, 'take_profit': 1.6, 'leverage': 25},
+        'medium': {'threshold': 0.8, 'stop_loss': 1.2, 'take_profit': 2.4, 'leverage': 18},
+        'high': {'threshold': 1.2, 'stop_loss': 1.6, 'take_profit': 3.2, 'leverage': 10}
+    }
+}
+
+
 class UltraFastTrader:
     def __init__(self):
         """初始化超快交易系统"""
@@ -22,57 +70,21 @@ class UltraFastTrader:
             self.config = json.load(f)
         
         # 初始化交易所
-        self.exchange = ccxt.okx({
-            'apiKey': self.config['exchange']['api_key'],
-            'secret': self.config['exchange']['secret'],
-            'password': self.config['exchange']['passphrase'],
-            'enableRateLimit': True,
-            'proxies': self.config['exchange']['proxies'],
-            'options': {'defaultType': 'swap'}
-        })
+        self.exchange = create_exchange(self.config)
         
         self.symbol = 'BTC/USDT:USDT'
+        # 只拉取1分钟K线，本地合成5m/15m并原地更新未收盘K线
+        self.candles = ResampledCandleFeed(self.exchange, self.symbol, {'15m': 50, '5m': 30, '1m': 20})
         self.contract_multiplier = 0.01
+        # 15分钟K线的均线/支撑阻力/波动率按已收盘K线缓存，每轮只重算未收盘K线
+        self.indicator_memo = default_memo
         
         # ⚡ 超快参数
-        self.params = {
-            'check_interval': 10,  # 10秒检查一次！
-            'min_position_size': 0.01,
-            'max_position_size': 0.15,
-            'risk_per_trade': 0.015,
-            'max_daily_trades': 15,  # 提高交易次数
-            'consecutive_loss_limit': 5,
-            
-            # 超快信号条件
-            'trend_following': {
-                'long_support_threshold': 0.5,
-                'short_resistance_threshold': 0.5,
-                'confidence': 0.6
-            },
-            
-            'mean_reversion': {
-                'enabled': True,
-                'volatility_threshold': 0.2,  # 更低阈值
-                'long_support_threshold': 0.4,
-                'short_resistance_threshold': 0.6,
-                'confidence': 0.55
-            },
-            
-            'quick_breakout': {
-                'enabled': True,
-                'breakout_period': 10,  # 更短周期
-                'breakout_multiplier': 1.005,  # 0.5%突破
-                'confidence': 0.6
-            },
-            
-            # 超快风险参数
-            'risk_reward_ratio_min': 1.2,
-            'volatility_adjustment': {
-                'low': {'threshold': 0.4, 'stop_loss': 0.8, 'take_profit': 1.6, 'leverage': 25},
-                'medium': {'threshold': 0.8, 'stop_loss': 1.2, 'take_profit': 2.4, 'leverage': 18},
-                'high': {'threshold': 1.2, 'stop_loss': 1.6, 'take_profit': 3.2, 'leverage': 10}
-            }
-        }
+        self.params = copy.deepcopy(ULTRA_FAST_PARAMS)
+        
+        # 逐笔成交聚合的10秒K线，突破检测用它代替5分钟K线
+        self.trade_bars = TradeBarAggregator(self.exchange, self.symbol,
+                                             self.params['quick_breakout']['tick_bar_interval'], capacity=360)
         
         # 状态跟踪
         self.state = {
@@ -115,15 +127,23 @@ class UltraFastTrader:
         """超快市场分析"""
         try:
             # 获取多种时间框架数据
-            ohlcv_15m = self.exchange.fetch_ohlcv(self.symbol, '15m', limit=50)
-            ohlcv_5m = self.exchange.fetch_ohlcv(self.symbol, '5m', limit=30)
-            ohlcv_1m = self.exchange.fetch_ohlcv(self.symbol, '1m', limit=20)
+            candles = self.candles.refresh_all()
+            self.trade_bars.poll()
+            return self.analyze_candles(candles)
             
-            closes_15m = np.array([c[4] for c in ohlcv_15m])
-            closes_5m = np.array([c[4] for c in ohlcv_5m])
-            closes_1m = np.array([c[4] for c in ohlcv_1m])
+        except Exception as e:
+            self.logger.error(f"市场分析失败: {e}")
+            return None
+    
+    def analyze_candles(self, candles, last_price=None):
+        """基于K线缓冲区计算分析结果 (不访问交易所)"""
+        try:
+            closes_15m = candles['15m'].closes
+            closes_5m = candles['5m'].closes
+            closes_1m = candles['1m'].closes
             
-            current_price = closes_15m[-1]
+            tick_closes = self.trade_bars.buffer.closes
+            current_price = last_price or self.trade_bars.last_price or closes_15m[-1]
             
             # 记录价格变化 (用于动态调整)
             if len(self.state['last_prices']) >= 10:
@@ -137,18 +157,14 @@ class UltraFastTrader:
                     self.state['price_change_rates'].pop(0)
                 self.state['price_change_rates'].append(change_rate)
             
-            # 快速计算技术指标
-            sma_20 = np.mean(closes_15m[-20:]) if len(closes_15m) >= 20 else closes_15m[-1]
-            sma_50 = np.mean(closes_15m[-50:]) if len(closes_15m) >= 50 else closes_15m[-1]
-            
-            # 快速支撑阻力
-            support = np.min(closes_15m[-15:])  # 缩短周期
-            resistance = np.max(closes_15m[-15:])
+            # 均线、支撑阻力 (15根)、波动率: 已收盘K线的状态增量维护，这里只计入未收盘K线
+            _, structure = self.indicator_memo.get(self.symbol, '15m', candles['15m'], PriceStructureIndicators)
+            sma_20 = structure['sma_20']
+            sma_50 = structure['sma_50']
+            support = structure['support']
+            resistance = structure['resistance']
             price_position = (current_price - support) / (resistance - support) if resistance != support else 0.5
-            
-            # 快速波动率计算
-            returns_15m = np.diff(closes_15m[-20:]) / closes_15m[-20:-1] if len(closes_15m) >= 20 else np.array([0])
-            volatility = np.std(returns_15m) * np.sqrt(365 * 24 * 4) if len(returns_15m) > 1 else 0
+            volatility = structure['volatility']
             
             # 快速趋势判断
             if current_price > sma_20 > sma_50:
@@ -158,8 +174,20 @@ class UltraFastTrader:
             else:
                 trend = 'neutral'
             
-            # 检查突破
-            breakout_signal = self.check_quick_breakout(closes_5m, current_price)
+            # 检查突破: 10秒K线足够时用它 (只看已收盘的)，否则退回5分钟K线 (含未收盘K线)
+            breakout_signal = None
+            tick_period = self.params['quick_breakout']['tick_breakout_period']
+            period = self.params['quick_breakout']['breakout_period']
+            if len(tick_closes) > tick_period:
+                closed, _ = self.indicator_memo.get(self.symbol, self.trade_bars.interval, self.trade_bars.buffer,
+                                                    RollingExtrema, windows=(tick_period,))
+                breakout_signal = self.check_quick_breakout(
+                    closed[f'high_{tick_period}'], closed[f'low_{tick_period}'], current_price)
+            elif len(closes_5m) >= period:
+                _, levels = self.indicator_memo.get(self.symbol, '5m', candles['5m'],
+                                                    RollingExtrema, windows=(period,))
+                breakout_signal = self.check_quick_breakout(
+                    levels[f'high_{period}'], levels[f'low_{period}'], current_price)
             
             analysis = {
                 'timestamp': datetime.now().isoformat(),
@@ -181,20 +209,13 @@ class UltraFastTrader:
             self.logger.error(f"市场分析失败: {e}")
             return None
     
-    def check_quick_breakout(self, closes, current_price):
-        """检查快速突破"""
+    def check_quick_breakout(self, recent_high, recent_low, current_price):
+        """检查快速突破 (recent_high/recent_low 为突破周期内的最高/最低收盘价)"""
         if not self.params['quick_breakout']['enabled']:
             return None
         
-        period = self.params['quick_breakout']['breakout_period']
         multiplier = self.params['quick_breakout']['breakout_multiplier']
         
-        if len(closes) < period:
-            return None
-        
-        recent_high = np.max(closes[-period:])
-        recent_low = np.min(closes[-period:])
-        
         # 向上突破
         if current_price > recent_high * multiplier:
             return {
@@ -280,6 +301,54 @@ class UltraFastTrader:
         
         return signal
     
+    def print_analysis(self, analysis):
+        """显示实时市场分析"""
+        print(f'📈 实时市场:')
+        print(f'   价格: ${analysis["current_price"]:.2f}')
+        print(f'   趋势: {analysis["trend"]}')
+        print(f'   位置: {analysis["price_position"]:.1%}')
+        print(f'   波动率: {analysis["volatility"]:.2%}')
+        
+        if analysis.get('breakout_signal'):
+            print(f'   🚀 突破信号: {analysis["breakout_signal"]["type"]}')
+    
+    def report_positions_and_signal(self, analysis, positions):
+        """显示持仓，无持仓时生成交易信号"""
+        has_position = False
+        for pos in positions:
+            if pos['symbol'] == self.symbol:
+                contracts = float(pos.get('contracts', 0))
+                if contracts > 0:
+                    has_position = True
+                    entry_price = float(pos.get('entryPrice', 0))
+                    mark_price = float(pos.get('markPrice', 0))
+                    unrealized_pnl = float(pos.get('unrealizedPnl', 0))
+                    pnl_percent = (unrealized_pnl / (contracts * 0.01 * entry_price) * 100) if contracts > 0 and entry_price > 0 else 0
+                    
+                    print(f'📊 当前持仓:')
+                    print(f'   方向: {pos.get("side", "N/A")}')
+                    print(f'   数量: {contracts}张')
+                    print(f'   盈亏: ${unrealized_pnl:.4f} ({pnl_percent:.2f}%)')
+                    print(f'   入场: ${entry_price:.2f}')
+                    print(f'   当前: ${mark_price:.2f}')
+                    break
+        
+        if not has_position:
+            print('📊 当前持仓: 无')
+            
+            # 生成交易信号
+            signal = self.generate_signal(analysis)
+            if signal:
+                print(f'🎯 交易信号: {signal["direction"]}')
+                print(f'   策略: {signal.get("strategy", "N/A")}')
+                print(f'   原因: {signal["reason"]}')
+                print(f'   信心度: {signal["confidence"]*100:.0f}%')
+                
+                # 这里可以添加快速交易执行逻辑
+                # 暂时只显示信号
+            else:
+                print('🔄 等待合适机会...')
+    
     def run(self):
         """运行超快主循环"""
         print('\n🚀 启动超快交易系统...')
@@ -301,51 +370,11 @@ class UltraFastTrader:
                 analysis = self.analyze_market()
                 
                 if analysis:
-                    print(f'📈 实时市场:')
-                    print(f'   价格: ${analysis["current_price"]:.2f}')
-                    print(f'   趋势: {analysis["trend"]}')
-                    print(f'   位置: {analysis["price_position"]:.1%}')
-                    print(f'   波动率: {analysis["volatility"]:.2%}')
-                    
-                    if analysis.get('breakout_signal'):
-                        print(f'   🚀 突破信号: {analysis["breakout_signal"]["type"]}')
+                    self.print_analysis(analysis)
                     
                     # 检查持仓
                     positions = self.exchange.fetch_positions([self.symbol])
-                    has_position = False
-                    for pos in positions:
-                        if pos['symbol'] == self.symbol:
-                            contracts = float(pos.get('contracts', 0))
-                            if contracts > 0:
-                                has_position = True
-                                entry_price = float(pos.get('entryPrice', 0))
-                                mark_price = float(pos.get('markPrice', 0))
-                                unrealized_pnl = float(pos.get('unrealizedPnl', 0))
-                                pnl_percent = (unrealized_pnl / (contracts * 0.01 * entry_price) * 100) if contracts > 0 and entry_price > 0 else 0
-                                
-                                print(f'📊 当前持仓:')
-                                print(f'   方向: {pos.get("side", "N/A")}')
-                                print(f'   数量: {contracts}张')
-                                print(f'   盈亏: ${unrealized_pnl:.4f} ({pnl_percent:.2f}%)')
-                                print(f'   入场: ${entry_price:.2f}')
-                                print(f'   当前: ${mark_price:.2f}')
-                                break
-                    
-                    if not has_position:
-                        print('📊 当前持仓: 无')
-                        
-                        # 生成交易信号
-                        signal = self.generate_signal(analysis)
-                        if signal:
-                            print(f'🎯 交易信号: {signal["direction"]}')
-                            print(f'   策略: {signal.get("strategy", "N/A")}')
-                            print(f'   原因: {signal["reason"]}')
-                            print(f'   信心度: {signal["confidence"]*100:.0f}%')
-                            
-                            # 这里可以添加快速交易执行逻辑
-                            # 暂时只显示信号
-                        else:
-                            print('🔄 等待合适机会...')
+                    self.report_positions_and_signal(analysis, positions)
                 
                 # 计算执行时间
                 execution_time = time.time() - start_time
@@ -353,6 +382,8 @@ class UltraFastTrader:
                 
                 print(f'⏱️  执行时间: {execution_time:.2f}秒')
                 print(f'💤 下次检查: {sleep_time:.1f}秒后')
+                if iteration % 90 == 0:
+                    self.logger.info(self.indicator_memo.format_stats())
                 
                 time.sleep(sleep_time)
                 
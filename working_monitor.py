@@ -9,7 +9,7 @@ import time
 from datetime import datetime
 import threading
 import os
-import ccxt
+from market_data_hub import create_exchange
 
 app = Flask(__name__)
 
@@ -198,21 +198,16 @@ def get_trades_html():
 
 def update_data():
     """更新数据"""
+    exchange = None
     while True:
         try:
-            # 加载配置
-            with open('config/final_config.json', 'r') as f:
-                config = json.load(f)
-            
-            # 初始化交易所
-            exchange = ccxt.okx({
-                'apiKey': config['exchange']['api_key'],
-                'secret': config['exchange']['secret'],
-                'password': config['exchange']['passphrase'],
-                'enableRateLimit': True,
-                'proxies': config['exchange']['proxies'],
-                'options': {'defaultType': 'swap'}
-            })
+            if exchange is None:
+                # 加载配置
+                with open('config/final_config.json', 'r') as f:
+                    config = json.load(f)
+                
+                # 初始化交易所 (只创建一次，数据中心在线时共享其连接)
+                exchange = create_exchange(config)
             
             # 更新账户余额
             balance = exchange.fetch_balance()